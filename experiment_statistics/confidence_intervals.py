@@ -0,0 +1,168 @@
+import logging
+from typing import Dict, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .table_comparison import DEFAULT_CHUNK_SIZE, TableSource
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIDENCE = 0.95
+DEFAULT_RESAMPLES = 1000
+DEFAULT_SEED = 0
+
+# scenes per block of random draws; blocks draw from their own streams, so results depend
+# only on the seed, and the subset sums table of a block stays in the CPU cache
+BLOCK_SIZE = 4096
+_BOOTSTRAP_STREAM = 0
+_PERMUTATION_STREAM = 1
+# bit j of byte b -> whether scene j of an 8-scene group is drawn
+_BYTE_BITS = ((np.arange(256)[:, None] >> np.arange(8)) & 1).astype(np.float64)
+
+VERDICT_IMPROVEMENT = "improvement"
+VERDICT_REGRESSION = "regression"
+VERDICT_NOISE = "noise"
+
+
+class DeltaInterval(NamedTuple):
+    mean: float
+    low: float
+    high: float
+    confidence: float
+    scenes: int
+    p_value: Optional[float] = None
+
+    @property
+    def significant(self) -> bool:
+        return self.low > 0 or self.high < 0
+
+    def verdict(self, higher_is_better: bool = True) -> str:
+        if not self.significant:
+            return VERDICT_NOISE
+        return VERDICT_IMPROVEMENT if (self.mean > 0) == higher_is_better else VERDICT_REGRESSION
+
+    def to_dict(self) -> dict:
+        return dict(self._asdict(), significant=self.significant)
+
+
+def _random_subset_sums(values: np.ndarray, draws: int, seed: int, stream: int) -> np.ndarray:
+    """
+    Sums of `draws` random subsets of `values`, every value is taken with probability 1/2.
+
+    Values are processed in blocks of 8-value groups: a random byte picks a subset of a group,
+    and sums of all 256 subsets of each group are tabulated once per block, so a draw costs
+    one table lookup per 8 values instead of a random weight per value.
+    """
+    sums = np.zeros(draws)
+    for block_index, start in enumerate(range(0, len(values), BLOCK_SIZE)):
+        block = values[start : start + BLOCK_SIZE]
+        if len(block) % 8:
+            block = np.concatenate([block, np.zeros(8 - len(block) % 8)])
+        groups = len(block) // 8
+        subset_sums = (block.reshape(groups, 8) @ _BYTE_BITS.T).ravel()
+        rng = np.random.default_rng([seed, stream, block_index])
+        picks = rng.integers(0, 256, size=(draws, groups), dtype=np.uint8).astype(np.intp)
+        picks += np.arange(groups, dtype=np.intp) * 256
+        sums += np.take(subset_sums, picks).sum(axis=1)
+    return sums
+
+
+def _finite(deltas: Sequence[float]) -> np.ndarray:
+    deltas = np.asarray(deltas, dtype=np.float64).ravel()
+    return deltas[np.isfinite(deltas)]
+
+
+def bootstrap_mean_interval(
+    deltas: Sequence[float],
+    confidence: float = DEFAULT_CONFIDENCE,
+    resamples: int = DEFAULT_RESAMPLES,
+    seed: int = DEFAULT_SEED,
+) -> Tuple[float, float]:
+    """
+    Percentile bootstrap interval (low, high) of the mean of per-scene deltas.
+
+    Resamples are drawn as multiplier weights 0 or 2 with equal probability: they have the mean
+    and the variance of multinomial resampling counts, but are drawn 8 scenes per random byte.
+    """
+    if not 0 < confidence < 1:
+        raise ValueError("confidence must be in (0, 1)")
+    if resamples <= 0:
+        raise ValueError("resamples must be positive")
+    deltas = _finite(deltas)
+    if not len(deltas):
+        raise ValueError("No finite deltas")
+    mean = float(deltas.mean())
+    # resampled mean - mean = sum((w - 1) * d) / n = 2 * sum(d[w == 2] - mean) / n
+    means = mean + 2 * _random_subset_sums(deltas - mean, resamples, seed, _BOOTSTRAP_STREAM) / len(deltas)
+    alpha = 1 - confidence
+    low, high = np.quantile(means, [alpha / 2, 1 - alpha / 2])
+    return float(low), float(high)
+
+
+def sign_flip_p_value(
+    deltas: Sequence[float], permutations: int = DEFAULT_RESAMPLES, seed: int = DEFAULT_SEED
+) -> float:
+    """
+    Two-sided permutation p-value of "the mean delta is zero": under the null hypothesis the sign
+    of every paired delta is equally likely to be flipped.
+    """
+    if permutations <= 0:
+        raise ValueError("permutations must be positive")
+    deltas = _finite(deltas)
+    if not len(deltas):
+        raise ValueError("No finite deltas")
+    total = float(deltas.sum())
+    # sum(s * d) with random signs s = 2 * sum(d[s == 1]) - sum(d)
+    flipped = 2 * _random_subset_sums(deltas, permutations, seed, _PERMUTATION_STREAM) - total
+    # relative tolerance, so flips equal to the observed sum up to rounding count as extreme
+    extreme = np.count_nonzero(np.abs(flipped) >= abs(total) * (1 - 1e-9))
+    return float(extreme + 1) / (permutations + 1)
+
+
+def delta_interval(
+    deltas: Sequence[float],
+    confidence: float = DEFAULT_CONFIDENCE,
+    resamples: int = DEFAULT_RESAMPLES,
+    seed: int = DEFAULT_SEED,
+) -> Optional[DeltaInterval]:
+    """
+    Bootstrap interval and sign-flip p-value of the mean delta, None if there are no finite deltas.
+    """
+    deltas = _finite(deltas)
+    if not len(deltas):
+        return None
+    low, high = bootstrap_mean_interval(deltas, confidence=confidence, resamples=resamples, seed=seed)
+    return DeltaInterval(
+        mean=float(deltas.mean()),
+        low=low,
+        high=high,
+        confidence=confidence,
+        scenes=len(deltas),
+        p_value=sign_flip_p_value(deltas, permutations=resamples, seed=seed),
+    )
+
+
+def delta_intervals(
+    deltas_by_metric: Mapping[str, Sequence[float]],
+    confidence: float = DEFAULT_CONFIDENCE,
+    resamples: int = DEFAULT_RESAMPLES,
+    seed: int = DEFAULT_SEED,
+) -> Dict[str, Optional[DeltaInterval]]:
+    intervals = {}
+    for metric, deltas in deltas_by_metric.items():
+        intervals[metric] = delta_interval(deltas, confidence=confidence, resamples=resamples, seed=seed)
+        logger.info("Metric %s: %s", metric, intervals[metric])
+    return intervals
+
+
+def read_deltas(
+    source: TableSource, metrics: Sequence[str], chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Dict[str, np.ndarray]:
+    """
+    Per-scene deltas of `metrics` from a table with a column of deltas per metric.
+    """
+    chunks = {metric: [] for metric in metrics}
+    for chunk in source.iter_chunks(list(metrics), chunk_size):
+        for metric in metrics:
+            chunks[metric].append(chunk[metric].astype(np.float64, copy=False))
+    return {metric: np.concatenate(values) if values else np.empty(0) for metric, values in chunks.items()}
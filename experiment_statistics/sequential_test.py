@@ -0,0 +1,83 @@
+import math
+from typing import NamedTuple, Optional
+
+DEFAULT_ALPHA = 0.05
+DEFAULT_BETA = 0.05
+
+DECISION_ACCEPT = "accept"
+DECISION_REJECT = "reject"
+DECISION_CONTINUE = "continue"
+
+
+class SprtDecision(NamedTuple):
+    decision: str
+    log_likelihood_ratio: float
+    lower_bound: float
+    upper_bound: float
+    scenes: int
+    failures: int
+
+    @property
+    def failure_rate(self) -> Optional[float]:
+        return self.failures / self.scenes if self.scenes else None
+
+    @property
+    def final(self) -> bool:
+        return self.decision != DECISION_CONTINUE
+
+    def to_dict(self) -> dict:
+        return dict(self._asdict(), failure_rate=self.failure_rate)
+
+
+class FailureRateSprt(object):
+    """
+    Wald's sequential probability ratio test of the scene failure rate:
+    H0 "the rate is `acceptable_rate`" against H1 "the rate is `unacceptable_rate`".
+
+    Cumulative counts can be checked as often as they are reported: the candidate is rejected
+    once the log-likelihood ratio reaches ln((1 - beta) / alpha) and accepted once it falls to
+    ln(beta / (1 - alpha)), where alpha is the chance to reject an acceptable candidate and
+    beta the chance to accept an unacceptable one.
+    """
+
+    def __init__(
+        self,
+        acceptable_rate: float,
+        unacceptable_rate: float,
+        alpha: float = DEFAULT_ALPHA,
+        beta: float = DEFAULT_BETA,
+    ):
+        if not 0 < acceptable_rate < unacceptable_rate < 1:
+            raise ValueError("Expected 0 < acceptable_rate < unacceptable_rate < 1")
+        if not 0 < alpha < 0.5 or not 0 < beta < 0.5:
+            raise ValueError("alpha and beta must be in (0, 0.5)")
+        self.acceptable_rate = acceptable_rate
+        self.unacceptable_rate = unacceptable_rate
+        self.alpha = alpha
+        self.beta = beta
+        self.lower_bound = math.log(beta / (1 - alpha))
+        self.upper_bound = math.log((1 - beta) / alpha)
+        self._failure_weight = math.log(unacceptable_rate / acceptable_rate)
+        self._success_weight = math.log((1 - unacceptable_rate) / (1 - acceptable_rate))
+
+    def log_likelihood_ratio(self, failures: int, scenes: int) -> float:
+        if not 0 <= failures <= scenes:
+            raise ValueError(f"Expected 0 <= failures <= scenes, got {failures} of {scenes}")
+        return failures * self._failure_weight + (scenes - failures) * self._success_weight
+
+    def decide(self, failures: int, scenes: int) -> SprtDecision:
+        llr = self.log_likelihood_ratio(failures, scenes)
+        if llr >= self.upper_bound:
+            decision = DECISION_REJECT
+        elif llr <= self.lower_bound:
+            decision = DECISION_ACCEPT
+        else:
+            decision = DECISION_CONTINUE
+        return SprtDecision(
+            decision=decision,
+            log_likelihood_ratio=llr,
+            lower_bound=self.lower_bound,
+            upper_bound=self.upper_bound,
+            scenes=scenes,
+            failures=failures,
+        )
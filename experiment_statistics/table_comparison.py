@@ -0,0 +1,366 @@
+import heapq
+import json
+import logging
+import math
+import os
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_KEY = "scene_id"
+DEFAULT_CHUNK_SIZE = 100_000
+DEFAULT_TOP_REGRESSIONS = 20
+
+Chunk = Dict[str, np.ndarray]
+
+
+class MetricSpec(NamedTuple):
+    name: str
+    higher_is_better: bool = True
+
+
+def parse_metric_specs(metrics: Mapping[str, str]) -> List[MetricSpec]:
+    """
+    {"metric": "higher" | "lower"} -> metric specs (what is better for the metric).
+    """
+    specs = []
+    for name, direction in metrics.items():
+        direction = str(direction or "higher").strip().lower()
+        if direction not in ("higher", "lower"):
+            raise ValueError(f"Unknown direction {direction!r} of metric {name!r}, expected 'higher' or 'lower'")
+        specs.append(MetricSpec(name, direction == "higher"))
+    return specs
+
+
+class TableSource(ABC):
+    """
+    Result table read in chunks of columns. Rows must be sorted by the join key.
+    """
+
+    @abstractmethod
+    def iter_chunks(self, columns: Sequence[str], chunk_size: int) -> Iterator[Chunk]:
+        """Yield dicts column -> array of at most `chunk_size` rows."""
+
+
+class TableStore(ABC):
+    @abstractmethod
+    def open(self, cluster: str, table: str) -> TableSource:
+        """Source of the table, as referenced by `*_exec_info` outputs."""
+
+
+def _rows_to_chunk(rows: List[dict], columns: Sequence[str]) -> Chunk:
+    chunk = {}
+    for column in columns:
+        values = [row.get(column) for row in rows]
+        if column in rows[0] and isinstance(rows[0][column], str):
+            chunk[column] = np.asarray(values)
+        else:
+            chunk[column] = np.asarray([np.nan if v is None else v for v in values])
+    return chunk
+
+
+class InMemoryTableSource(TableSource):
+    def __init__(self, rows: Iterable[dict]):
+        self.rows = list(rows)
+
+    def iter_chunks(self, columns: Sequence[str], chunk_size: int) -> Iterator[Chunk]:
+        for start in range(0, len(self.rows), chunk_size):
+            yield _rows_to_chunk(self.rows[start : start + chunk_size], columns)
+
+
+class JsonLinesTableSource(TableSource):
+    """
+    Local export of a table in JSON lines (`yt read --format json`).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def iter_chunks(self, columns: Sequence[str], chunk_size: int) -> Iterator[Chunk]:
+        rows = []
+        with open(self.path) as fd:
+            for line in fd:
+                if not line.strip():
+                    continue
+                rows.append(json.loads(line))
+                if len(rows) == chunk_size:
+                    yield _rows_to_chunk(rows, columns)
+                    rows = []
+        if rows:
+            yield _rows_to_chunk(rows, columns)
+
+
+class InMemoryTableStore(TableStore):
+    """
+    Stand-in store for tests and dry runs.
+    """
+
+    def __init__(self, tables: Optional[Dict[Tuple[str, str], List[dict]]] = None):
+        self.tables = tables or {}
+
+    def open(self, cluster: str, table: str) -> TableSource:
+        try:
+            return InMemoryTableSource(self.tables[(cluster, table)])
+        except KeyError:
+            raise KeyError(f"No table {cluster}:{table} in the store")
+
+
+class LocalExportStore(TableStore):
+    """
+    Exports laid out as <root>/<cluster>/<table path without leading slashes>.jsonl
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, cluster: str, table: str) -> str:
+        return os.path.join(self.root, cluster, table.lstrip("/") + ".jsonl")
+
+    def open(self, cluster: str, table: str) -> TableSource:
+        path = self.path(cluster, table)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No local export of {cluster}:{table} ({path})")
+        return JsonLinesTableSource(path)
+
+
+class _SortedChunks(object):
+    """
+    Chunk iterator with a buffer of not yet joined rows; checks the key order.
+    """
+
+    def __init__(self, name: str, chunks: Iterator[Chunk], key: str):
+        self.name = name
+        self.chunks = chunks
+        self.key = key
+        self.buffer: Optional[Chunk] = None
+        self.exhausted = False
+        self.rows = 0
+        self._last_key = None
+
+    def __len__(self) -> int:
+        return 0 if self.buffer is None else len(self.buffer[self.key])
+
+    def pull(self) -> None:
+        try:
+            chunk = next(self.chunks)
+        except StopIteration:
+            self.exhausted = True
+            return
+        keys = chunk[self.key]
+        if len(keys) == 0:
+            return
+        if np.any(keys[1:] <= keys[:-1]) or (self._last_key is not None and keys[0] <= self._last_key):
+            raise ValueError(f"{self.name} table must be sorted by unique {self.key!r}")
+        self._last_key = keys[-1]
+        self.rows += len(keys)
+        if self.buffer is None or not len(self):
+            self.buffer = chunk
+        else:
+            self.buffer = {column: np.concatenate([self.buffer[column], chunk[column]]) for column in chunk}
+
+    def split(self, frontier) -> Chunk:
+        """
+        Take rows with keys up to `frontier` (all rows for None) out of the buffer.
+        """
+        if self.buffer is None:
+            return {}
+        end = len(self) if frontier is None else int(np.searchsorted(self.buffer[self.key], frontier, side="right"))
+        head = {column: values[:end] for column, values in self.buffer.items()}
+        self.buffer = {column: values[end:] for column, values in self.buffer.items()}
+        return head
+
+
+class MergeJoin(object):
+    """
+    Join of two key-sorted chunk streams; iterating yields aligned (baseline, competitor) chunks
+    of matched rows. Only unjoined tails of the last chunks are buffered, so memory is bounded
+    by the chunk size. Row counts of both tables are known after the iteration.
+    """
+
+    def __init__(self, baseline: Iterator[Chunk], competitor: Iterator[Chunk], key: str = DEFAULT_KEY):
+        self.key = key
+        self.baseline = _SortedChunks("Baseline", baseline, key)
+        self.competitor = _SortedChunks("Competitor", competitor, key)
+
+    @property
+    def baseline_rows(self) -> int:
+        return self.baseline.rows
+
+    @property
+    def competitor_rows(self) -> int:
+        return self.competitor.rows
+
+    def __iter__(self) -> Iterator[Tuple[Chunk, Chunk]]:
+        key, left, right = self.key, self.baseline, self.competitor
+        while True:
+            for side in (left, right):
+                while not len(side) and not side.exhausted:
+                    side.pull()
+            if not len(left) or not len(right):
+                # nothing to match with: drain the rest to count rows
+                for side in (left, right):
+                    while not side.exhausted:
+                        side.pull()
+                        side.split(None)
+                return
+
+            # the side which reaches the frontier is emptied and pulls its next chunk
+            frontier = min(left.buffer[key][-1], right.buffer[key][-1])
+            left_head, right_head = left.split(frontier), right.split(frontier)
+            _, left_index, right_index = np.intersect1d(
+                left_head[key], right_head[key], assume_unique=True, return_indices=True
+            )
+            if len(left_index):
+                yield (
+                    {column: values[left_index] for column, values in left_head.items()},
+                    {column: values[right_index] for column, values in right_head.items()},
+                )
+
+
+class _MetricAccumulator(object):
+    def __init__(self, spec: MetricSpec, top: int):
+        self.spec = spec
+        self.top = top
+        self.count = 0
+        self.skipped = 0
+        self.sum_baseline = 0.0
+        self.sum_competitor = 0.0
+        self.sum_delta = 0.0
+        self.sum_delta_sq = 0.0
+        self.regressions = 0
+        self.improvements = 0
+        self.worst: List[Tuple[float, str, float, float]] = []  # min-heap by regression score
+        self.deltas: List[np.ndarray] = []
+
+    def add(self, keys: np.ndarray, baseline: np.ndarray, competitor: np.ndarray, collect_deltas: bool) -> None:
+        baseline = baseline.astype(np.float64, copy=False)
+        competitor = competitor.astype(np.float64, copy=False)
+        finite = np.isfinite(baseline) & np.isfinite(competitor)
+        self.skipped += int(len(finite) - np.count_nonzero(finite))
+        keys, baseline, competitor = keys[finite], baseline[finite], competitor[finite]
+        delta = competitor - baseline
+
+        self.count += len(delta)
+        self.sum_baseline += float(baseline.sum())
+        self.sum_competitor += float(competitor.sum())
+        self.sum_delta += float(delta.sum())
+        self.sum_delta_sq += float(np.dot(delta, delta))
+        score = -delta if self.spec.higher_is_better else delta
+        self.regressions += int(np.count_nonzero(score > 0))
+        self.improvements += int(np.count_nonzero(score < 0))
+        if collect_deltas:
+            self.deltas.append(delta)
+
+        regressed = np.flatnonzero(score > 0)
+        if len(regressed) > self.top:
+            regressed = regressed[np.argpartition(score[regressed], -self.top)[-self.top :]]
+        for i in regressed:
+            item = (float(score[i]), str(keys[i]), float(baseline[i]), float(competitor[i]))
+            if len(self.worst) < self.top:
+                heapq.heappush(self.worst, item)
+            elif item > self.worst[0]:
+                heapq.heapreplace(self.worst, item)
+
+    def summary(self) -> dict:
+        count = self.count
+        mean_delta = self.sum_delta / count if count else None
+        variance = max(self.sum_delta_sq / count - mean_delta**2, 0.0) if count else None
+        mean_baseline = self.sum_baseline / count if count else None
+        mean_competitor = self.sum_competitor / count if count else None
+        relative = (mean_competitor - mean_baseline) / abs(mean_baseline) if count and mean_baseline else None
+        return {
+            "higher_is_better": self.spec.higher_is_better,
+            "scenes": count,
+            "skipped": self.skipped,
+            "mean_baseline": mean_baseline,
+            "mean_competitor": mean_competitor,
+            "mean_delta": mean_delta,
+            "std_delta": math.sqrt(variance) if variance is not None else None,
+            "relative_delta": relative,
+            "regressions": self.regressions,
+            "improvements": self.improvements,
+        }
+
+
+class ComparisonResult(NamedTuple):
+    key: str
+    baseline_rows: int
+    competitor_rows: int
+    matched_rows: int
+    metrics: Dict[str, dict]
+    worst_regressions: List[dict]
+    deltas: Dict[str, np.ndarray]
+
+    def summary(self) -> dict:
+        """
+        JSON-serializable summary (without per-scene deltas).
+        """
+        return {
+            "key": self.key,
+            "baseline_rows": self.baseline_rows,
+            "competitor_rows": self.competitor_rows,
+            "matched_rows": self.matched_rows,
+            "metrics": self.metrics,
+            "worst_regressions": self.worst_regressions,
+        }
+
+
+def compare_tables(
+    baseline: TableSource,
+    competitor: TableSource,
+    metrics: Sequence[MetricSpec],
+    key: str = DEFAULT_KEY,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    top_regressions: int = DEFAULT_TOP_REGRESSIONS,
+    collect_deltas: bool = False,
+) -> ComparisonResult:
+    """
+    Join baseline and competitor results by `key` and compute per-metric deltas (competitor - baseline).
+    With `collect_deltas` per-scene deltas of every metric are kept (e.g. for confidence intervals).
+    """
+    if not metrics:
+        raise ValueError("No metrics to compare")
+    columns = [key] + [spec.name for spec in metrics]
+    accumulators = [_MetricAccumulator(spec, top_regressions) for spec in metrics]
+
+    matched = 0
+    joined = MergeJoin(baseline.iter_chunks(columns, chunk_size), competitor.iter_chunks(columns, chunk_size), key=key)
+    for baseline_chunk, competitor_chunk in joined:
+        matched += len(baseline_chunk[key])
+        for accumulator in accumulators:
+            name = accumulator.spec.name
+            accumulator.add(baseline_chunk[key], baseline_chunk[name], competitor_chunk[name], collect_deltas)
+
+    worst = heapq.nlargest(
+        top_regressions,
+        (
+            (score, scene, accumulator.spec.name, baseline_value, competitor_value)
+            for accumulator in accumulators
+            for score, scene, baseline_value, competitor_value in accumulator.worst
+        ),
+    )
+    logger.info(
+        "Compared %s baseline and %s competitor rows, matched %s", joined.baseline_rows, joined.competitor_rows, matched
+    )
+    return ComparisonResult(
+        key=key,
+        baseline_rows=joined.baseline_rows,
+        competitor_rows=joined.competitor_rows,
+        matched_rows=matched,
+        metrics={accumulator.spec.name: accumulator.summary() for accumulator in accumulators},
+        worst_regressions=[
+            {"scene": scene, "metric": metric, "baseline": b, "competitor": c, "regression": score}
+            for score, scene, metric, b, c in worst
+        ],
+        deltas=(
+            {
+                accumulator.spec.name: np.concatenate(accumulator.deltas) if accumulator.deltas else np.empty(0)
+                for accumulator in accumulators
+            }
+            if collect_deltas
+            else {}
+        ),
+    )
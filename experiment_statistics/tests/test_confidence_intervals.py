@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from experiment_statistics.confidence_intervals import (
+    VERDICT_IMPROVEMENT,
+    VERDICT_NOISE,
+    VERDICT_REGRESSION,
+    DeltaInterval,
+    bootstrap_mean_interval,
+    delta_interval,
+    delta_intervals,
+    read_deltas,
+    sign_flip_p_value,
+)
+from experiment_statistics.table_comparison import InMemoryTableSource
+
+
+def test_deterministic_given_seed():
+    deltas = np.random.default_rng(1).normal(size=10_001)
+
+    assert bootstrap_mean_interval(deltas, seed=7) == bootstrap_mean_interval(deltas, seed=7)
+    assert bootstrap_mean_interval(deltas, seed=7) != bootstrap_mean_interval(deltas, seed=8)
+    assert sign_flip_p_value(deltas, seed=7) == sign_flip_p_value(deltas, seed=7)
+
+
+@pytest.mark.parametrize("scenes", [13, 5000, 100_000])
+def test_bootstrap_interval_matches_normal_approximation(scenes):
+    deltas = np.random.default_rng(scenes).exponential(size=scenes)
+    low, high = bootstrap_mean_interval(deltas, confidence=0.95, resamples=4000)
+
+    half_width = 1.96 * deltas.std() / np.sqrt(scenes)
+    assert low < deltas.mean() < high
+    assert (high - low) / 2 == pytest.approx(half_width, rel=0.1)
+
+
+def test_interval_coverage():
+    rng = np.random.default_rng(0)
+    covered = sum(
+        low <= 0.1 <= high
+        for low, high in (
+            bootstrap_mean_interval(rng.normal(0.1, 1, size=500), confidence=0.9, resamples=500, seed=seed)
+            for seed in range(200)
+        )
+    )
+
+    assert 0.84 <= covered / 200 <= 0.96
+
+
+def test_sign_flip_p_value():
+    rng = np.random.default_rng(3)
+
+    assert sign_flip_p_value(rng.normal(0.5, 1, size=1000), permutations=999) == pytest.approx(1 / 1000)
+    assert sign_flip_p_value(rng.normal(0, 1, size=1000), permutations=999) > 0.05
+    assert sign_flip_p_value(np.zeros(100)) == 1.0
+
+
+def test_delta_interval_verdicts():
+    rng = np.random.default_rng(5)
+    intervals = delta_intervals(
+        {
+            "up": rng.normal(0.3, 1, size=2000),
+            "down": np.append(rng.normal(-0.3, 1, size=2000), np.nan),
+            "flat": rng.normal(0, 1, size=2000),
+            "missing": [np.nan],
+        },
+        resamples=500,
+    )
+
+    assert intervals["up"].verdict(higher_is_better=True) == VERDICT_IMPROVEMENT
+    assert intervals["up"].verdict(higher_is_better=False) == VERDICT_REGRESSION
+    assert intervals["down"].scenes == 2000 and intervals["down"].verdict() == VERDICT_REGRESSION
+    assert intervals["flat"].verdict() == VERDICT_NOISE and not intervals["flat"].significant
+    assert intervals["missing"] is None
+    assert intervals["up"].to_dict()["significant"] is True
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        bootstrap_mean_interval([1.0, 2.0], confidence=95)
+    with pytest.raises(ValueError):
+        bootstrap_mean_interval([np.nan])
+    with pytest.raises(ValueError):
+        sign_flip_p_value([1.0], permutations=0)
+    assert delta_interval([]) is None
+
+
+def test_read_deltas():
+    rows = [{"scene_id": i, "progress": i / 10, "collisions": None if i == 3 else -i} for i in range(10)]
+    deltas = read_deltas(InMemoryTableSource(rows), ["progress", "collisions"], chunk_size=4)
+
+    np.testing.assert_allclose(deltas["progress"], np.arange(10) / 10)
+    assert np.isnan(deltas["collisions"][3]) and len(deltas["collisions"]) == 10
+    assert isinstance(delta_interval(deltas["collisions"], resamples=10), DeltaInterval)
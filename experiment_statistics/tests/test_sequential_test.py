@@ -0,0 +1,53 @@
+import random
+
+import pytest
+
+from experiment_statistics.sequential_test import (
+    DECISION_ACCEPT,
+    DECISION_CONTINUE,
+    DECISION_REJECT,
+    FailureRateSprt,
+)
+
+
+def test_decisions_on_clear_outcomes():
+    sprt = FailureRateSprt(acceptable_rate=0.01, unacceptable_rate=0.03)
+
+    assert sprt.decide(failures=0, scenes=0).decision == DECISION_CONTINUE
+    assert sprt.decide(failures=30, scenes=500).decision == DECISION_REJECT
+    assert sprt.decide(failures=2, scenes=500).decision == DECISION_ACCEPT
+    assert sprt.decide(failures=8, scenes=500).decision == DECISION_CONTINUE
+
+    decision = sprt.decide(failures=30, scenes=500)
+    assert decision.final and decision.to_dict()["failure_rate"] == pytest.approx(0.06)
+    assert decision.log_likelihood_ratio >= decision.upper_bound
+
+
+def _run_until_decision(sprt, rate, rnd, batch=50, limit=100_000):
+    failures = scenes = 0
+    while scenes < limit:
+        failures += sum(rnd.random() < rate for _ in range(batch))
+        scenes += batch
+        decision = sprt.decide(failures, scenes)
+        if decision.final:
+            return decision
+    return decision
+
+
+@pytest.mark.parametrize("rate, wrong_decision", [(0.01, DECISION_REJECT), (0.03, DECISION_ACCEPT)])
+def test_error_rates_are_bounded(rate, wrong_decision):
+    sprt = FailureRateSprt(acceptable_rate=0.01, unacceptable_rate=0.03, alpha=0.05, beta=0.05)
+    rnd = random.Random(42)
+    decisions = [_run_until_decision(sprt, rate, rnd) for _ in range(200)]
+
+    assert all(decision.final for decision in decisions)
+    assert sum(decision.decision == wrong_decision for decision in decisions) / len(decisions) <= 0.08
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        FailureRateSprt(acceptable_rate=0.05, unacceptable_rate=0.01)
+    with pytest.raises(ValueError):
+        FailureRateSprt(acceptable_rate=0.01, unacceptable_rate=0.05, alpha=0.7)
+    with pytest.raises(ValueError):
+        FailureRateSprt(acceptable_rate=0.01, unacceptable_rate=0.05).decide(failures=3, scenes=2)
@@ -0,0 +1,134 @@
+import json
+import random
+
+import numpy as np
+import pytest
+
+from experiment_statistics.table_comparison import (
+    InMemoryTableSource,
+    InMemoryTableStore,
+    LocalExportStore,
+    MergeJoin,
+    MetricSpec,
+    compare_tables,
+    parse_metric_specs,
+)
+
+METRICS = [MetricSpec("progress", higher_is_better=True), MetricSpec("collisions", higher_is_better=False)]
+
+
+def _tables(seed=0, scenes=500):
+    rnd = random.Random(seed)
+    ids = ["scene-{:06d}".format(i) for i in range(scenes)]
+    baseline = [
+        {"scene_id": scene, "progress": rnd.random(), "collisions": rnd.randrange(3)}
+        for scene in ids
+        if rnd.random() < 0.9
+    ]
+    competitor = [
+        {"scene_id": scene, "progress": rnd.random(), "collisions": rnd.randrange(3)}
+        for scene in ids
+        if rnd.random() < 0.9
+    ]
+    return baseline, competitor
+
+
+def _expected(baseline, competitor, metric):
+    competitor_by_id = {row["scene_id"]: row for row in competitor}
+    return [
+        (row["scene_id"], competitor_by_id[row["scene_id"]][metric] - row[metric])
+        for row in baseline
+        if row["scene_id"] in competitor_by_id
+    ]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 10_000])
+def test_chunked_comparison_matches_full_join(chunk_size):
+    baseline, competitor = _tables()
+    result = compare_tables(
+        InMemoryTableSource(baseline),
+        InMemoryTableSource(competitor),
+        METRICS,
+        chunk_size=chunk_size,
+        top_regressions=5,
+        collect_deltas=True,
+    )
+
+    expected = _expected(baseline, competitor, "progress")
+    assert result.baseline_rows == len(baseline) and result.competitor_rows == len(competitor)
+    assert result.matched_rows == len(expected)
+    np.testing.assert_allclose(result.deltas["progress"], [delta for _, delta in expected])
+
+    progress = result.metrics["progress"]
+    assert progress["mean_delta"] == pytest.approx(np.mean([delta for _, delta in expected]))
+    assert progress["std_delta"] == pytest.approx(np.std([delta for _, delta in expected]))
+    assert progress["regressions"] == sum(1 for _, delta in expected if delta < 0)
+
+    collisions = _expected(baseline, competitor, "collisions")
+    assert result.metrics["collisions"]["regressions"] == sum(1 for _, delta in collisions if delta > 0)
+
+
+def test_worst_regressions_across_metrics():
+    baseline = [{"scene_id": i, "progress": 1.0, "collisions": 0} for i in range(100)]
+    competitor = [{"scene_id": i, "progress": 1.0 - i / 100, "collisions": 5 if i == 3 else 0} for i in range(100)]
+    result = compare_tables(
+        InMemoryTableSource(baseline), InMemoryTableSource(competitor), METRICS, chunk_size=16, top_regressions=3
+    )
+
+    assert [(r["metric"], r["scene"]) for r in result.worst_regressions] == [
+        ("collisions", "3"),
+        ("progress", "99"),
+        ("progress", "98"),
+    ]
+    assert json.loads(json.dumps(result.summary()))["matched_rows"] == 100
+
+
+def test_missing_values_are_skipped():
+    baseline = [{"scene_id": "a", "progress": 1.0}, {"scene_id": "b", "progress": None}]
+    competitor = [{"scene_id": "a", "progress": 0.5}, {"scene_id": "b", "progress": 1.0}]
+    result = compare_tables(InMemoryTableSource(baseline), InMemoryTableSource(competitor), [MetricSpec("progress")])
+
+    assert result.metrics["progress"]["scenes"] == 1
+    assert result.metrics["progress"]["skipped"] == 1
+
+
+def test_unsorted_table_is_rejected():
+    baseline = [{"scene_id": "b", "progress": 1.0}, {"scene_id": "a", "progress": 1.0}]
+    with pytest.raises(ValueError, match="sorted"):
+        list(
+            MergeJoin(
+                InMemoryTableSource(baseline).iter_chunks(["scene_id"], 1),
+                InMemoryTableSource(baseline).iter_chunks(["scene_id"], 1),
+            )
+        )
+
+
+def test_local_export_store(tmp_path):
+    baseline, competitor = _tables(scenes=50)
+    store = LocalExportStore(str(tmp_path))
+    for table, rows in (("//home/ci/baseline", baseline), ("//home/ci/competitor", competitor)):
+        path = tmp_path / "hahn" / table.lstrip("/")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.with_suffix(".jsonl").write_text("\n".join(json.dumps(row) for row in rows) + "\n")
+    store_result = compare_tables(
+        store.open("hahn", "//home/ci/baseline"), store.open("hahn", "//home/ci/competitor"), METRICS, chunk_size=8
+    )
+    memory_store = InMemoryTableStore(
+        {("hahn", "//home/ci/baseline"): baseline, ("hahn", "//home/ci/competitor"): competitor}
+    )
+    memory_result = compare_tables(
+        memory_store.open("hahn", "//home/ci/baseline"),
+        memory_store.open("hahn", "//home/ci/competitor"),
+        METRICS,
+        chunk_size=8,
+    )
+
+    assert store_result.summary() == memory_result.summary()
+    with pytest.raises(FileNotFoundError):
+        store.open("hahn", "//home/ci/missing")
+
+
+def test_parse_metric_specs():
+    assert parse_metric_specs({"progress": "higher", "collisions": "Lower "}) == METRICS
+    with pytest.raises(ValueError):
+        parse_metric_specs({"progress": "sideways"})
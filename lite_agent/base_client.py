@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Dict
+from typing import Dict, List
 
 from .task_state import TaskState
 from .task_steps_data import TaskStepsData
@@ -27,6 +27,10 @@ class BaseLiteAgentClient(ABC):
     def get_steps_result(self, task_id: str) -> TaskStepsData:
         """Get the steps/resources of the task (for reports/links)."""
 
+    @abstractmethod
+    def get_steps_payload(self, task_id: str) -> List[dict]:
+        """Get the raw steps payload of the task (available while the task is still running)."""
+
     @abstractmethod
     def change_agent_availability(self, fqdn: str, availability: str) -> bool:
         """Change the agent's availability (for a real API, there may be a no-op in dry-run)."""
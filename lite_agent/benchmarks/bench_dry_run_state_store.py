@@ -0,0 +1,81 @@
+"""
+Throughput of LiteAgentDryRunClient state stores.
+
+    python bench_dry_run_state_store.py --tasks 100000 --workers 4
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+from sandbox.projects.sdc.common.lite_agent_api.dry_run_client import LiteAgentDryRunClient
+from sandbox.projects.sdc.common.lite_agent_api.dry_run_state_store import (
+    DryRunStateStore,
+    InMemoryLruStateStore,
+    SqliteStateStore,
+)
+
+BASE_URL = "https://dry-run.local"
+
+
+def simulate_tasks(store: DryRunStateStore, count: int) -> None:
+    """Full dry-run task lifecycle: spawn, poll, finalize, collect steps."""
+    # the client of the first task iteration, and the one of the iteration the task is finalized on
+    spawning = LiteAgentDryRunClient(
+        base_url=BASE_URL, current_iteration=0, finalize_on_iteration=1, state_store=store
+    )
+    finalizing = LiteAgentDryRunClient(
+        base_url=BASE_URL, current_iteration=1, finalize_on_iteration=1, state_store=store
+    )
+    for _ in range(count):
+        task_id = spawning.create_task({}).get_task_id()
+        spawning.get_task_state(task_id)
+        finalizing.get_task_state(task_id)
+        finalizing.get_steps_payload(task_id)
+
+
+def _report(name: str, tasks: int, elapsed: float) -> None:
+    print(f"{name:<24} tasks={tasks:<8} elapsed={elapsed:8.2f}s  throughput={tasks / elapsed:10.0f} tasks/s")
+
+
+def bench_lru(tasks: int) -> None:
+    store = InMemoryLruStateStore(max_tasks=tasks)
+    started = time.perf_counter()
+    simulate_tasks(store, tasks)
+    _report("in-process lru", tasks, time.perf_counter() - started)
+
+
+def _sqlite_worker(path: str, tasks: int) -> None:
+    simulate_tasks(SqliteStateStore(path, base_url=BASE_URL), tasks)
+
+
+def bench_sqlite(tasks: int, workers: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "dry_run_state.db")
+        SqliteStateStore(path, base_url=BASE_URL)
+        per_worker = tasks // workers
+        processes = [
+            multiprocessing.Process(target=_sqlite_worker, args=(path, per_worker)) for _ in range(workers)
+        ]
+        started = time.perf_counter()
+        for p in processes:
+            p.start()
+        for p in processes:
+            p.join()
+        _report(f"sqlite x{workers} processes", per_worker * workers, time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    bench_lru(args.tasks)
+    bench_sqlite(args.tasks, 1)
+    bench_sqlite(args.tasks, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Time and memory of LiteAgent result handling on synthetic steps payloads.
+
+    python bench_steps_payload.py --output results.json
+    python bench_steps_payload.py --baseline results.json --tolerance 0.2
+
+With --baseline the harness exits with non-zero code if any operation got slower
+or allocates more memory than the baseline allows.
+"""
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Callable, Dict
+
+from sandbox.projects.sdc.common.lite_agent_api import steps_payload_generator
+from sandbox.projects.sdc.common.lite_agent_api.lite_agent_urls import STABLE_URL
+from sandbox.projects.sdc.common.lite_agent_api.task_state import TaskState
+from sandbox.projects.sdc.common.lite_agent_api.task_steps_data import TaskStepsData
+from sandbox.projects.sdc.lite_agent.sdc_lite_agent_task import SdcLiteAgentTask
+
+SHAPES = {
+    "small": steps_payload_generator.SMALL,
+    "large": steps_payload_generator.LARGE,
+    "huge": steps_payload_generator.HUGE,
+}
+
+
+def _task_stand_in():
+    """Just enough of SdcLiteAgentTask for get_links/setup_out_parameters."""
+    stand_in = SimpleNamespace(Parameters=SimpleNamespace(), agentr=SimpleNamespace(iteration=1))
+    stand_in.get_extra_runtime_parameters = lambda task_info: SdcLiteAgentTask.get_extra_runtime_parameters(
+        stand_in, task_info
+    )
+    return stand_in
+
+
+def _task_state(task_id: str) -> TaskState:
+    now = datetime.now(tz=timezone.utc)
+    return TaskState(
+        task_id=task_id,
+        status="success",
+        agent_fqdn="bench-agent.local",
+        api_url=STABLE_URL,
+        creation_time=now,
+        start_time=now,
+        finish_time=now,
+    )
+
+
+def measure(fn: Callable[[], object], repeat: int) -> Dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": min(timings), "peak_bytes": peak}
+
+
+def run(repeat: int) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for shape_name, shape in SHAPES.items():
+        task_id = f"BENCH-{shape_name}"
+        payload = steps_payload_generator.generate_steps_payload(STABLE_URL, task_id, shape)
+        steps_data = TaskStepsData.from_json(payload)
+        task_info = _task_state(task_id)
+        stand_in = _task_stand_in()
+
+        operations = {
+            "from_json": lambda: TaskStepsData.from_json(payload),
+            "get_links": lambda: SdcLiteAgentTask.get_links(stand_in, task_info, steps_data),
+            "setup_out_parameters": lambda: SdcLiteAgentTask.setup_out_parameters(stand_in, task_info, steps_data),
+        }
+        for op_name, fn in operations.items():
+            key = f"{shape_name}.{op_name}"
+            results[key] = measure(fn, repeat)
+            print(
+                f"{key:<36} {results[key]['seconds'] * 1000:10.1f} ms  {results[key]['peak_bytes'] / 2 ** 20:8.1f} MiB"
+            )
+    return results
+
+
+def find_regressions(results: Dict, baseline: Dict, tolerance: float) -> list[str]:
+    regressions = []
+    for key, base in baseline.items():
+        current = results.get(key)
+        if current is None:
+            continue
+        for metric in ("seconds", "peak_bytes"):
+            if current[metric] > base[metric] * (1 + tolerance):
+                regressions.append(f"{key}.{metric}: {base[metric]:.4g} -> {current[metric]:.4g}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Save results as json")
+    parser.add_argument("--baseline", help="Compare results with previously saved ones")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown/memory growth")
+    args = parser.parse_args()
+
+    results = run(args.repeat)
+
+    if args.output:
+        with open(args.output, "w") as fd:
+            json.dump(results, fd, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as fd:
+            regressions = find_regressions(results, json.load(fd), args.tolerance)
+        if regressions:
+            print("Regressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -54,12 +54,18 @@ class LiteAgentClient(BaseLiteAgentClient):
         :type task_id: str
         :rtype TaskResult
         """
+        return TaskStepsData.from_json(self.get_steps_payload(task_id))
+
+    def get_steps_payload(self, task_id):
+        """
+        :type task_id: str
+        :rtype list
+        """
         api_url = urljoin(self.base_url, "tasks/{}/steps".format(task_id))
         response = self.session.get(api_url, headers=self.authorization_header)
         log_helper.log_response(response)
         response.raise_for_status()
-        json_data = response.json()  # actual data type is list, not dict
-        return TaskStepsData.from_json(json_data)
+        return response.json()  # actual data type is list, not dict
 
     def change_agent_availability(self, fqdn, availability):
         """
@@ -1,11 +1,13 @@
 import time
 import uuid
 from datetime import datetime, timedelta, timezone
-from typing import Dict, List
+from typing import List, Optional
 
 from .task_state import TaskState
 from .task_steps_data import TaskStepsData, UPLOAD_ARTIFACTS_TO_SANDBOX_STEP_NAME
 from .base_client import BaseLiteAgentClient
+from .dry_run_state_store import DryRunStateStore, InMemoryLruStateStore
+from .steps_payload_generator import StepsPayloadShape, generate_steps_payload
 
 
 class LiteAgentDryRunClient(BaseLiteAgentClient):
@@ -15,9 +17,13 @@ class LiteAgentDryRunClient(BaseLiteAgentClient):
       - while current_iteration < finalize_on_iteration -> `in_progress`
       - as soon as current_iteration >= finalize_on_iteration -> final status (`_default_status`)
 
-    Task/Step status storage — class (divided by base_url),
-    so that different client instances within the same process can see the overall state.
-    and at the same time, stable/prestable/unstable did not interfere with each other.
+    Task/Step status storage — pluggable `DryRunStateStore`. By default it is the in-process
+    LRU store shared per base_url, so that different client instances within the same process
+    can see the overall state, and at the same time stable/prestable/unstable did not interfere
+    with each other. Pass `SqliteStateStore` to share the state between worker processes.
+
+    `steps_payload_shape` switches the fake steps payload to a synthetic one of the given shape
+    (for stress-testing result handling on production-sized payloads).
     """
 
     def __init__(
@@ -26,13 +32,15 @@ class LiteAgentDryRunClient(BaseLiteAgentClient):
         default_status: str = "success",
         finalize_on_iteration: int = 2,
         current_iteration: int = 0,
+        state_store: Optional[DryRunStateStore] = None,
+        steps_payload_shape: Optional[StepsPayloadShape] = None,
     ):
         self.base_url = base_url
         self._default_status = default_status
         self._finalize_on_iter = int(finalize_on_iteration)
         self._iter = int(current_iteration)
-        self._tasks: Dict[str, TaskState] = {}
-        self._steps: Dict[str, List[dict]] = {}
+        self._steps_payload_shape = steps_payload_shape
+        self._store = state_store if state_store is not None else InMemoryLruStateStore.for_base_url(base_url)
 
     def cancel_task(self, task_id: str) -> bool:
         """
@@ -41,7 +49,7 @@ class LiteAgentDryRunClient(BaseLiteAgentClient):
         """
         key = str(task_id)
 
-        state = self._tasks.get(key)
+        state = self._store.get_task(key)
         now = time.time()
         if not state:
             t_create = datetime.fromtimestamp(now - 2, tz=timezone.utc)
@@ -65,9 +73,9 @@ class LiteAgentDryRunClient(BaseLiteAgentClient):
             start_time=state.start_time,
             finish_time=datetime.fromtimestamp(now, tz=timezone.utc),
         )
-        self._tasks[key] = finished
-        if key not in self._steps:
-            self._steps[key] = self._build_fake_steps_payload(key)
+        self._store.put_task(finished)
+        if self._store.get_steps(key) is None:
+            self._store.put_steps(key, self._build_fake_steps_payload(key))
         return True
 
     def create_task(self, dict_params: dict) -> TaskState:
@@ -90,12 +98,12 @@ class LiteAgentDryRunClient(BaseLiteAgentClient):
             start_time=t_start,
             finish_time=None,
         )
-        self._tasks[state.get_task_id()] = state
+        self._store.put_task(state)
         return state
 
     def get_task_state(self, task_id: str) -> TaskState:
         key = str(task_id)
-        state = self._tasks.get(key)
+        state = self._store.get_task(key)
         if not state:
             now = time.time()
             state = TaskState(
@@ -107,7 +115,7 @@ class LiteAgentDryRunClient(BaseLiteAgentClient):
                 start_time=datetime.fromtimestamp(now - 1, tz=timezone.utc),
                 finish_time=None,
             )
-            self._tasks[key] = state
+            self._store.put_task(state)
 
         if state.finish_time is not None or state.status in {"success", "fail", "cancel"}:
             return state
@@ -124,19 +132,37 @@ class LiteAgentDryRunClient(BaseLiteAgentClient):
             start_time=state.start_time,
             finish_time=datetime.fromtimestamp(time.time(), tz=timezone.utc),
         )
-        self._tasks[key] = finished
+        self._store.put_task(finished)
 
-        if key not in self._steps:
-            self._steps[key] = self._build_fake_steps_payload(key)
+        if self._store.get_steps(key) is None:
+            self._store.put_steps(key, self._build_fake_steps_payload(key))
         return finished
 
     def get_steps_result(self, task_id: str) -> TaskStepsData:
+        return TaskStepsData.from_json(self._get_steps_result_payload(task_id))
+
+    def get_steps_payload(self, task_id: str) -> List[dict]:
+        """
+        While the task is in progress only the first step is reported as finished,
+        the rest are `in_progress` without parameters/statistics (as the real API does).
+        """
+        key = str(task_id)
+        state = self._store.get_task(key)
+        if state is None or state.finish_time is not None or self._store.get_steps(key) is not None:
+            return self._get_steps_result_payload(key)
+
+        payload = self._build_fake_steps_payload(key)
+        for step in payload[1:]:
+            step.update({"status": "in_progress", "parameters": {}, "statistics": {}})
+        return payload
+
+    def _get_steps_result_payload(self, task_id: str) -> List[dict]:
         key = str(task_id)
-        payload = self._steps.get(key)
+        payload = self._store.get_steps(key)
         if not payload:
             payload = self._build_fake_steps_payload(key)
-            self._steps[key] = payload
-        return TaskStepsData.from_json(payload)
+            self._store.put_steps(key, payload)
+        return payload
 
     def change_agent_availability(self, fqdn: str, availability: str) -> bool:
         return True
@@ -152,6 +178,8 @@ class LiteAgentDryRunClient(BaseLiteAgentClient):
             and a direct artifact 'ci_report.html';
         - parameters/statistics/issues.
         """
+        if self._steps_payload_shape is not None:
+            return generate_steps_payload(self.base_url, task_id, self._steps_payload_shape)
 
         def _dur(ms: int) -> str:
             td = timedelta(milliseconds=ms)
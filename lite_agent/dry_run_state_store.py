@@ -0,0 +1,209 @@
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from .task_state import TaskState
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_TASKS = 10_000
+
+
+def task_state_to_dict(state: TaskState) -> dict:
+    def _ts(value: Optional[datetime]) -> Optional[float]:
+        return value.timestamp() if value is not None else None
+
+    return {
+        "task_id": state.task_id,
+        "status": state.status,
+        "agent_fqdn": state.agent_fqdn,
+        "api_url": state.api_url,
+        "creation_time": _ts(state.creation_time),
+        "start_time": _ts(state.start_time),
+        "finish_time": _ts(state.finish_time),
+    }
+
+
+def task_state_from_dict(data: dict) -> TaskState:
+    def _dt(value: Optional[float]) -> Optional[datetime]:
+        return datetime.fromtimestamp(value, tz=timezone.utc) if value is not None else None
+
+    return TaskState(
+        task_id=data["task_id"],
+        status=data["status"],
+        agent_fqdn=data["agent_fqdn"],
+        api_url=data["api_url"],
+        creation_time=_dt(data["creation_time"]),
+        start_time=_dt(data["start_time"]),
+        finish_time=_dt(data["finish_time"]),
+    )
+
+
+class DryRunStateStore(ABC):
+    """
+    Storage of task states and steps payloads for LiteAgentDryRunClient.
+    """
+
+    @abstractmethod
+    def get_task(self, task_id: str) -> Optional[TaskState]:
+        """Return the stored task state or None."""
+
+    @abstractmethod
+    def put_task(self, state: TaskState) -> None:
+        """Store (or replace) the task state."""
+
+    @abstractmethod
+    def get_steps(self, task_id: str) -> Optional[List[dict]]:
+        """Return the stored steps payload or None."""
+
+    @abstractmethod
+    def put_steps(self, task_id: str, payload: List[dict]) -> None:
+        """Store (or replace) the steps payload."""
+
+
+class InMemoryLruStateStore(DryRunStateStore):
+    """
+    In-process store shared by all dry-run clients with the same base_url.
+    The least recently used finished tasks are evicted when `max_tasks` is exceeded. Running tasks
+    are never evicted (the store grows over `max_tasks` if they are all running): the dry-run client
+    would re-create an evicted running task as a new one.
+    """
+
+    _shared: Dict[str, "InMemoryLruStateStore"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, max_tasks: int = DEFAULT_MAX_TASKS):
+        if max_tasks <= 0:
+            raise ValueError("max_tasks can't be non-positive")
+        self.max_tasks = int(max_tasks)
+        self._tasks: "OrderedDict[str, TaskState]" = OrderedDict()
+        self._steps: "OrderedDict[str, List[dict]]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    @classmethod
+    def for_base_url(cls, base_url: str, max_tasks: int = DEFAULT_MAX_TASKS) -> "InMemoryLruStateStore":
+        with cls._shared_lock:
+            store = cls._shared.get(base_url)
+            if store is None:
+                store = cls._shared[base_url] = cls(max_tasks=max_tasks)
+            return store
+
+    @classmethod
+    def reset_shared(cls) -> None:
+        with cls._shared_lock:
+            cls._shared.clear()
+
+    def _get(self, items: OrderedDict, key: str):
+        with self._lock:
+            value = items.get(key)
+            if value is not None:
+                items.move_to_end(key)
+            return value
+
+    def _put(self, items: OrderedDict, key: str, value) -> None:
+        with self._lock:
+            items[key] = value
+            items.move_to_end(key)
+            while len(items) > self.max_tasks:
+                items.popitem(last=False)
+
+    def get_task(self, task_id: str) -> Optional[TaskState]:
+        return self._get(self._tasks, task_id)
+
+    def put_task(self, state: TaskState) -> None:
+        with self._lock:
+            self._tasks[state.get_task_id()] = state
+            self._tasks.move_to_end(state.get_task_id())
+            excess = len(self._tasks) - self.max_tasks
+            if excess <= 0:
+                return
+            finished = (task_id for task_id, task in self._tasks.items() if task.finish_time is not None)
+            evicted = list(itertools.islice(finished, excess))
+            for task_id in evicted:
+                del self._tasks[task_id]
+        if len(evicted) < excess:
+            logger.warning("Dry-run state store exceeds %s tasks, running tasks are not evicted", self.max_tasks)
+
+    def get_steps(self, task_id: str) -> Optional[List[dict]]:
+        return self._get(self._steps, task_id)
+
+    def put_steps(self, task_id: str, payload: List[dict]) -> None:
+        self._put(self._steps, task_id, payload)
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+
+class SqliteStateStore(DryRunStateStore):
+    """
+    SQLite store which can be shared by several worker processes (WAL journal, busy timeout).
+    Connections are opened lazily per process and thread.
+    """
+
+    def __init__(self, path: str, base_url: str, timeout: float = 30.0):
+        self.path = path
+        self.base_url = base_url
+        self.timeout = timeout
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS tasks ("
+                "base_url TEXT NOT NULL, task_id TEXT NOT NULL, state TEXT NOT NULL, "
+                "PRIMARY KEY (base_url, task_id))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS steps ("
+                "base_url TEXT NOT NULL, task_id TEXT NOT NULL, payload TEXT NOT NULL, "
+                "PRIMARY KEY (base_url, task_id))"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _select(self, table: str, column: str, task_id: str) -> Optional[str]:
+        row = (
+            self._connection()
+            .execute(f"SELECT {column} FROM {table} WHERE base_url = ? AND task_id = ?", (self.base_url, task_id))
+            .fetchone()
+        )
+        return row[0] if row else None
+
+    def _upsert(self, table: str, column: str, task_id: str, value: str) -> None:
+        self._connection().execute(
+            f"INSERT OR REPLACE INTO {table} (base_url, task_id, {column}) VALUES (?, ?, ?)",
+            (self.base_url, task_id, value),
+        )
+
+    def get_task(self, task_id: str) -> Optional[TaskState]:
+        raw = self._select("tasks", "state", task_id)
+        return task_state_from_dict(json.loads(raw)) if raw is not None else None
+
+    def put_task(self, state: TaskState) -> None:
+        self._upsert("tasks", "state", state.get_task_id(), json.dumps(task_state_to_dict(state)))
+
+    def get_steps(self, task_id: str) -> Optional[List[dict]]:
+        raw = self._select("steps", "payload", task_id)
+        return json.loads(raw) if raw is not None else None
+
+    def put_steps(self, task_id: str, payload: List[dict]) -> None:
+        self._upsert("steps", "payload", task_id, json.dumps(payload))
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,16 @@
+from typing import List
+
+FINISHED_STEP_STATUSES = frozenset({"success", "fail", "failed", "failure", "cancel", "skipped"})
+
+
+def completed_steps(steps_payload: List[dict]) -> List[dict]:
+    """
+    Steps of a (possibly still running) task which have already finished.
+    The order of the steps is preserved, so the result is a prefix-compatible view
+    of the final payload for the sequential LiteAgent pipeline.
+    """
+    return [step for step in steps_payload or [] if step.get("status") in FINISHED_STEP_STATUSES]
+
+
+def completed_step_names(steps_payload: List[dict]) -> List[str]:
+    return [step.get("name") for step in completed_steps(steps_payload)]
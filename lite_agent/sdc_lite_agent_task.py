@@ -1,48 +1,46 @@
 import re
 import sys
 import time
+import typing
 
 import logging
 
 
+# Every WaitTime wake-up restarts the task process, so only the modules required on a poll tick
+# are imported here. Spawn-only, finalize-only and restart-only dependencies are imported
+# on demand in the methods using them (see tests/test_import_time.py).
 from sandbox import sdk2
 from sandbox.common import errors
 from sandbox.common.types import misc as ctm
 from sandbox.projects.common.task_env import TinyRequirements
-from sandbox.projects.common.vcs.arc import Arc
-from sandbox.projects.sdc.common import pr_helper
 from sandbox.projects.sdc.common.component_handlers.general_component_handler import GeneralComponentHandler
 from sandbox.projects.sdc.common.lite_agent_api.client import LiteAgentClient
 from sandbox.projects.sdc.common.lite_agent_api.dry_run_client import LiteAgentDryRunClient
 from sandbox.projects.sdc.common.lite_agent_api.lite_agent_urls import resolve_base_url, STABLE_URL
-from sandbox.projects.sdc.common.lite_agent_api.spawn_task import SpawnTask, ArtifactDirectLink
+from sandbox.projects.sdc.common.lite_agent_api.partial_steps import completed_step_names, completed_steps
 from sandbox.projects.sdc.common.lite_agent_api.task_state import TaskState
 from sandbox.projects.sdc.common.lite_agent_api.task_steps_data import TaskStepsData
-from sandbox.projects.sdc.common.sdc_task_report.link_dto import LinkDTO
-from sandbox.projects.sdc.common.sdc_task_report.sdc_task_report_helper import SdcTaskReportHelper
-from sandbox.projects.sdc.common.support_link_helper import SupportLinkHelper
 from sandbox.projects.sdc.common_tasks.EventbusStatisticsMixin import EventbusStatisticsMixin
-from sandbox.projects.sdc.common_tasks.base_sdc_task import runtime_parameters_helper
 from sandbox.projects.sdc.resource_types import SdcBuildScriptArtifacts
 
-from sdg.ci.common.utils.restart_task_manager.providers.log_providers.file_log_provider import FileLogProvider
-from sdg.ci.common.utils.restart_task_manager.restarters.arcadia_ci_restarter import ArcadiaCIRestarter
-from sdg.ci.common.utils.restart_task_manager.rules.base_rule import BaseRestartRule
-from sdg.ci.common.utils.restart_task_manager.restart_manager_context import RestartManagerContext
-from sdg.ci.common.utils.restart_task_manager.restart_task_manager import RestartTaskManager
-from sdg.ci.common.utils.restart_task_manager.rules.log_rule import LogRestartRule
 from sdg.ci.sandbox.utils.poll_frequency_manager.poll_frequency_manager import PollFrequencyManager
 from sandbox.projects.sdc.common.lite_agent_api.base_client import BaseLiteAgentClient
 from sdg.ci.sandbox.utils.poll_frequency_manager import poll_frequency_profile
+from sdg.ci.sandbox.utils.result_snapshot.resource_types import SdcTaskResultSnapshot
 
-from infra.ci.app.ci_stat_crawler.ch_helper import to_ch_datetime_str
-
-from .lite_agent_resource_helper import LiteAgentResourceHelper
+if typing.TYPE_CHECKING:
+    from sdg.ci.common.utils.restart_task_manager.rules.base_rule import BaseRestartRule
+    from sdg.ci.common.utils.restart_task_manager.restart_task_manager import RestartTaskManager
+    from sdg.ci.common.utils.restart_task_manager.rules.log_rule import LogRestartRule
 
 LITE_AGENT_TASK_URL_ORDER = 100
 
 PROFILE_CHOICES = tuple(poll_frequency_profile.PollProfile.names())
 
+# Downstream tasks can read early results of running task, e.g.:
+#   raise sdk2.WaitOutput({task_id: PARTIAL_OUTPUT_PARAMETERS}, wait_all=True)
+PARTIAL_OUTPUT_PARAMETERS = ("partial_completed_steps", "partial_runtime_parameters", "partial_runtime_statistics")
+
 
 class SdcLiteAgentTask(EventbusStatisticsMixin, sdk2.Task):
     SUPPORT_COMPONENT = GeneralComponentHandler()
@@ -85,6 +83,9 @@ class SdcLiteAgentTask(EventbusStatisticsMixin, sdk2.Task):
             wait_for_cancel = sdk2.parameters.Integer(
                 "Time to wait cancel of underlying build after poll duration exceed", default=300
             )
+            publish_partial_output = sdk2.parameters.Bool(
+                "Publish runtime parameters/statistics of completed steps while polling", default=False
+            )
 
         with sdk2.parameters.Group("Config") as config_block:
             api_type = sdk2.parameters.String("LiteAgent api type", default="stable")
@@ -111,6 +112,9 @@ class SdcLiteAgentTask(EventbusStatisticsMixin, sdk2.Task):
             artifact_zip_type = sdk2.parameters.String(
                 "Type of sandbox resource for artifacts.zip", default="SDC_BUILD_SCRIPT_ARTIFACTS"
             )
+            publish_result_snapshot = sdk2.parameters.Bool(
+                "Publish binary snapshot of the result as resource (for linked tasks)", default=False
+            )
 
         # Resulting parameters
         with sdk2.parameters.Output(reset_on_restart=True):
@@ -129,6 +133,15 @@ class SdcLiteAgentTask(EventbusStatisticsMixin, sdk2.Task):
             runtime_build_problems = sdk2.parameters.JSON("Collected runtime build problems")
 
             lite_agent_step_resource_ids = sdk2.parameters.List("Step resource ids")
+            result_snapshot = sdk2.parameters.Resource(
+                "Result snapshot resource",
+                resource_type=SdcTaskResultSnapshot,
+                required=False,
+            )
+
+            partial_completed_steps = sdk2.parameters.List("Completed steps of running task")
+            partial_runtime_parameters = sdk2.parameters.JSON("Runtime parameters of completed steps")
+            partial_runtime_statistics = sdk2.parameters.Dict("Runtime statistics of completed steps")
 
             _vcs_info = sdk2.parameters.Dict("VCS info")
 
@@ -146,6 +159,8 @@ class SdcLiteAgentTask(EventbusStatisticsMixin, sdk2.Task):
 
     @property
     def pr_id(self):
+        from sandbox.projects.sdc.common import pr_helper
+
         return pr_helper.pr_id_from_branch_name(self.branch)
 
     @property
@@ -187,6 +202,8 @@ class SdcLiteAgentTask(EventbusStatisticsMixin, sdk2.Task):
         )
 
     def artifact_with_task_info(self, name, wildcard, ttl, resource_type, description):
+        from sandbox.projects.sdc.common.lite_agent_api.spawn_task import ArtifactDirectLink
+
         return ArtifactDirectLink(
             name,
             wildcard,
@@ -197,6 +214,8 @@ class SdcLiteAgentTask(EventbusStatisticsMixin, sdk2.Task):
         )
 
     def resolve_commit(self, branch):
+        from sandbox.projects.common.vcs.arc import Arc
+
         tokens = self.Parameters.secret_identifier.data()
         arc_token = tokens["token.arc"]
 
@@ -231,6 +250,8 @@ class SdcLiteAgentTask(EventbusStatisticsMixin, sdk2.Task):
         return LiteAgentClient(base_url=base_url, token=api_token)
 
     def cancel_underlying_task(self):
+        from sdg.ci.common.utils.restart_task_manager.restart_manager_context import RestartManagerContext
+
         # Task was restarted. because we have failed task.
         if RestartManagerContext(self).is_task_restarted():
             return
@@ -255,6 +276,9 @@ class SdcLiteAgentTask(EventbusStatisticsMixin, sdk2.Task):
         self.setup_output(la_task_id, api)
 
     def get_links(self, task_info: TaskState, task_steps_result: TaskStepsData):
+        from sandbox.projects.sdc.common.sdc_task_report.link_dto import LinkDTO
+        from sandbox.projects.sdc.common_tasks.base_sdc_task import runtime_parameters_helper
+
         links = []
 
         # Add common links
@@ -300,6 +324,9 @@ class SdcLiteAgentTask(EventbusStatisticsMixin, sdk2.Task):
         if not task_info:
             return
 
+        from sandbox.projects.sdc.common.sdc_task_report.sdc_task_report_helper import SdcTaskReportHelper
+        from sandbox.projects.sdc.common.support_link_helper import SupportLinkHelper
+
         links = self.get_links(task_info, task_steps_result)
 
         all_problems = task_steps_result.get_build_problems_text_only()
@@ -327,6 +354,8 @@ class SdcLiteAgentTask(EventbusStatisticsMixin, sdk2.Task):
             return
 
         with self.memoize_stage.report_spawned_build():
+            from sandbox.projects.sdc.common.sdc_task_report.link_dto import LinkDTO
+
             link = LinkDTO(
                 placeholder="Spawned task url", url=build_url, css_class="yc-link_view_normal log-links__link"
             )
@@ -377,6 +406,9 @@ class SdcLiteAgentTask(EventbusStatisticsMixin, sdk2.Task):
                         self.cancel_underlying_task()
                         raise sdk2.WaitTime(self.Parameters.wait_for_cancel)
 
+                if self.Parameters.publish_partial_output:
+                    self.publish_partial_output(la_task_id, api)
+
                 if str(self.Parameters.api_type).strip().lower() == "dry-run":
                     profile = poll_frequency_profile.PollProfile.DRY_RUN.value
                 else:
@@ -416,24 +448,73 @@ class SdcLiteAgentTask(EventbusStatisticsMixin, sdk2.Task):
                 raise errors.TaskFailure("Lite agent task failed")
 
     def get_restarter(self):
+        from sdg.ci.common.utils.restart_task_manager.restarters.arcadia_ci_restarter import ArcadiaCIRestarter
+
         return ArcadiaCIRestarter(self)
 
     def get_max_restarts(self) -> int:
         return 0
 
-    def get_restart_task_manager(self) -> RestartTaskManager:
+    def get_restart_task_manager(self) -> "RestartTaskManager":
+        from sdg.ci.common.utils.restart_task_manager.restart_task_manager import RestartTaskManager
+
         return RestartTaskManager(self, self.get_restart_rules(), self.get_restarter(), self.get_max_restarts())
 
-    def get_restart_rules(self) -> list[BaseRestartRule]:
+    def get_restart_rules(self) -> "list[BaseRestartRule]":
         return []
 
     def setup_output(self, la_task_id: str, api: BaseLiteAgentClient):
         task_info = api.get_task_state(la_task_id)
         task_steps_result = api.get_steps_result(la_task_id)
         self.setup_out_parameters(task_info, task_steps_result)
+        if self.Parameters.publish_result_snapshot:
+            self.setup_result_snapshot()
         self.update_task_info(task_info, task_steps_result)
 
+    def setup_result_snapshot(self):
+        from sdg.ci.sandbox.utils.result_snapshot.resource_types import publish_snapshot_resource
+
+        sections = {
+            "task": {
+                "task_id": self.Parameters.out_task_id,
+                "task_url": self.Parameters.out_task_url,
+                "task_status": self.Parameters.out_task_status,
+                "agent_fqdn": self.Parameters.out_agent_fqdn,
+            },
+            "runtime_parameters": self.Parameters.runtime_parameters,
+            "runtime_statistics": self.Parameters.runtime_statistics,
+            "runtime_build_problems": self.Parameters.runtime_build_problems,
+            "lite_agent_step_resource_ids": self.Parameters.lite_agent_step_resource_ids,
+        }
+        self.Parameters.result_snapshot = publish_snapshot_resource(
+            self, sections, "LiteAgent task {} result snapshot".format(self.Parameters.out_task_id)
+        )
+
+    def publish_partial_output(self, la_task_id: str, api: BaseLiteAgentClient):
+        """
+        Publish outputs of already completed steps (see PARTIAL_OUTPUT_PARAMETERS).
+        Outputs are rewritten only when new steps have been completed since the previous poll.
+        """
+        try:
+            steps = completed_steps(api.get_steps_payload(la_task_id))
+        except Exception as exc:
+            logging.warning("Failed to get steps of running task %s: %s", la_task_id, exc)
+            return
+
+        published_steps = self.Context.partial_completed_steps_count
+        if published_steps is not ctm.NotExists and len(steps) <= published_steps:
+            return
+
+        partial_result = TaskStepsData.from_json(steps)
+        self.Parameters.partial_runtime_parameters = partial_result.get_runtime_parameters()
+        self.Parameters.partial_runtime_statistics = partial_result.get_runtime_statistics()
+        self.Parameters.partial_completed_steps = completed_step_names(steps)
+        self.Context.partial_completed_steps_count = len(steps)
+        logging.info("Published partial output of %s completed steps", len(steps))
+
     def get_extra_runtime_parameters(self, task_info):
+        from infra.ci.app.ci_stat_crawler.ch_helper import to_ch_datetime_str
+
         extra_runtime_parameters = {
             "sdc_ci_metadata.lite_agent_task_creation_time": to_ch_datetime_str(task_info.get_creation_time()),
             "sdc_ci_metadata.lite_agent_task_start_time": to_ch_datetime_str(task_info.get_start_time()),
@@ -470,6 +551,7 @@ class SdcLiteAgentTask(EventbusStatisticsMixin, sdk2.Task):
         """
         :type api: LiteAgentClient
         """
+        from sandbox.projects.sdc.common.lite_agent_api.spawn_task import SpawnTask
 
         # Use existing task or spawn new
         task_id = self.Parameters.existing_task_id
@@ -574,7 +656,12 @@ class SdcLiteAgentTask(EventbusStatisticsMixin, sdk2.Task):
         step_name: str,
         patterns_to_search: list[str],
         alias_error: str,
-    ) -> LogRestartRule:
+    ) -> "LogRestartRule":
+        from sdg.ci.common.utils.restart_task_manager.providers.log_providers.file_log_provider import FileLogProvider
+        from sdg.ci.common.utils.restart_task_manager.rules.log_rule import LogRestartRule
+
+        from .lite_agent_resource_helper import LiteAgentResourceHelper
+
         resource_path = LiteAgentResourceHelper(la_api, la_task_id, step_name).get_log_path()
         log_provider = FileLogProvider(resource_path)
 
@@ -0,0 +1,102 @@
+import random
+from typing import List, NamedTuple
+
+from .task_steps_data import UPLOAD_ARTIFACTS_TO_SANDBOX_STEP_NAME
+
+
+class StepsPayloadShape(NamedTuple):
+    """
+    Shape of a synthetic `tasks/{id}/steps` payload.
+    The last step is always the upload step with artifacts.zip and direct-link artifacts.
+    """
+
+    steps: int = 3
+    parameters_per_step: int = 1
+    statistics_per_step: int = 1
+    problems_per_step: int = 0
+    failed_steps: int = 0
+    direct_link_artifacts: int = 1
+    value_size: int = 16
+
+
+SMALL = StepsPayloadShape()
+LARGE = StepsPayloadShape(
+    steps=1000, parameters_per_step=50, statistics_per_step=50, problems_per_step=2, failed_steps=20
+)
+HUGE = StepsPayloadShape(
+    steps=5000,
+    parameters_per_step=200,
+    statistics_per_step=200,
+    problems_per_step=5,
+    failed_steps=500,
+    direct_link_artifacts=100,
+    value_size=64,
+)
+
+
+def _duration(ms: int) -> str:
+    sec, ms = divmod(ms, 1000)
+    minute, sec = divmod(sec, 60)
+    hour, minute = divmod(minute, 60)
+    return f"{hour:02d}:{minute:02d}:{sec:02d}.{ms:03d}"
+
+
+def generate_steps_payload(base_url: str, task_id: str, shape: StepsPayloadShape, seed: int = 0) -> List[dict]:
+    """
+    Deterministic (for the given seed) steps payload compatible with TaskStepsData.
+    Failed steps are spread evenly over the pipeline.
+    """
+    if shape.steps < 1:
+        raise ValueError("steps can't be non-positive")
+    if not 0 <= shape.failed_steps < shape.steps:
+        raise ValueError("failed_steps must be less than steps (the upload step never fails)")
+
+    rnd = random.Random(seed)
+    base = base_url.rstrip("/")
+    filler = "x" * max(shape.value_size - 8, 0)
+    # the upload step never fails, so failed steps are spread over the first steps - 1 steps
+    failed_indices = {(k + 1) * (shape.steps - 1) // shape.failed_steps - 1 for k in range(shape.failed_steps)}
+
+    payload = []
+    for i in range(shape.steps - 1):
+        name = f"step-{i:05d}"
+        failed = i in failed_indices
+        payload.append(
+            {
+                "name": name,
+                "status": "fail" if failed else "success",
+                "duration": _duration(rnd.randrange(1, 3_600_000)),
+                "resources": {
+                    "logs": {"link": f"{base}/tasks/{task_id}/steps/{name}/logs"},
+                },
+                "parameters": {
+                    f"{name}.param.{j}": f"{rnd.getrandbits(32):08x}{filler}" for j in range(shape.parameters_per_step)
+                },
+                "statistics": {f"{name}.stat.{j}": rnd.random() * 1000 for j in range(shape.statistics_per_step)},
+                "problems": [
+                    {"identity": f"{name}.problem.{j}", "description": f"Problem {j} of {name}: {filler}"}
+                    for j in range(shape.problems_per_step)
+                ],
+            }
+        )
+
+    resources = {
+        "artifacts": {"link": f"https://<INTERNAL_DOMAIN>/task/{task_id}/artifact/artifacts.zip"},
+        "logs": {"link": f"{base}/tasks/{task_id}/steps/{UPLOAD_ARTIFACTS_TO_SANDBOX_STEP_NAME}/logs"},
+    }
+    for j in range(shape.direct_link_artifacts):
+        artifact = "ci_report.html" if j == 0 else f"artifact_{j}.html"
+        resources[artifact] = {"link": f"https://<INTERNAL_DOMAIN>/task/{task_id}/artifact/{artifact}"}
+
+    payload.append(
+        {
+            "name": UPLOAD_ARTIFACTS_TO_SANDBOX_STEP_NAME,
+            "status": "success",
+            "duration": _duration(rnd.randrange(1, 600_000)),
+            "resources": resources,
+            "parameters": {"report.available": "true"},
+            "statistics": {"upload.ms": rnd.random() * 1000},
+            "problems": [],
+        }
+    )
+    return payload
@@ -0,0 +1,100 @@
+import multiprocessing
+
+import pytest
+
+from sandbox.projects.sdc.common.lite_agent_api.dry_run_client import LiteAgentDryRunClient
+from sandbox.projects.sdc.common.lite_agent_api.dry_run_state_store import (
+    InMemoryLruStateStore,
+    SqliteStateStore,
+)
+
+
+@pytest.fixture(autouse=True)
+def reset_shared_stores():
+    InMemoryLruStateStore.reset_shared()
+    yield
+    InMemoryLruStateStore.reset_shared()
+
+
+def test_state_is_shared_between_instances_with_same_base_url():
+    c1 = LiteAgentDryRunClient(base_url="https://a", current_iteration=0, finalize_on_iteration=1)
+    st = c1.create_task({"fqdn": "agent1"})
+
+    c2 = LiteAgentDryRunClient(base_url="https://a", current_iteration=1, finalize_on_iteration=1)
+    got = c2.get_task_state(st.get_task_id())
+    assert got.get_agent_fqdn() == "agent1"
+    assert got.get_status() == "success"
+
+    c3 = LiteAgentDryRunClient(base_url="https://b", current_iteration=0, finalize_on_iteration=1)
+    assert c3.get_task_state(st.get_task_id()).get_agent_fqdn() == "dryrun-agent.local"
+
+
+def test_lru_store_evicts_least_recently_used():
+    store = InMemoryLruStateStore(max_tasks=2)
+    client = LiteAgentDryRunClient(base_url="https://a", current_iteration=2, state_store=store)
+    t1 = client.get_task_state(client.create_task({}).get_task_id())
+    t2 = client.get_task_state(client.create_task({}).get_task_id())
+    assert store.get_task(t1.get_task_id()) is not None  # t1 is the most recently used now
+    t3 = client.get_task_state(client.create_task({}).get_task_id())
+
+    assert len(store) == 2
+    assert store.get_task(t2.get_task_id()) is None
+    assert store.get_task(t1.get_task_id()) is not None
+    assert store.get_task(t3.get_task_id()) is not None
+
+
+def test_lru_store_does_not_evict_running_tasks():
+    store = InMemoryLruStateStore(max_tasks=2)
+    running = LiteAgentDryRunClient(base_url="https://a", current_iteration=0, state_store=store)
+    finishing = LiteAgentDryRunClient(base_url="https://a", current_iteration=2, state_store=store)
+    t1 = running.create_task({})
+    t2 = finishing.get_task_state(finishing.create_task({}).get_task_id())
+    t3 = running.create_task({})
+
+    assert store.get_task(t2.get_task_id()) is None
+    t4 = running.create_task({})
+    assert len(store) == 3
+    assert all(store.get_task(t.get_task_id()) is not None for t in (t1, t3, t4))
+    assert running.get_task_state(t1.get_task_id()).get_creation_time() == t1.get_creation_time()
+
+
+def test_lru_store_rejects_non_positive_size():
+    with pytest.raises(ValueError):
+        InMemoryLruStateStore(max_tasks=0)
+
+
+def test_sqlite_store_roundtrip(tmp_path):
+    store = SqliteStateStore(str(tmp_path / "state.db"), base_url="https://a")
+    client = LiteAgentDryRunClient(base_url="https://a", current_iteration=2, state_store=store)
+    st = client.create_task({"fqdn": "agent1"})
+    finished = client.get_task_state(st.get_task_id())
+
+    other = LiteAgentDryRunClient(
+        base_url="https://a", state_store=SqliteStateStore(str(tmp_path / "state.db"), base_url="https://a")
+    )
+    got = other.get_task_state(st.get_task_id())
+    assert got.get_status() == "success"
+    assert got.get_agent_fqdn() == "agent1"
+    assert got.get_finish_time() == finished.get_finish_time()
+    assert store.get_steps(st.get_task_id()) == other._store.get_steps(st.get_task_id())
+
+
+def _create_tasks(path, count, queue):
+    client = LiteAgentDryRunClient(base_url="https://a", state_store=SqliteStateStore(path, base_url="https://a"))
+    queue.put([client.create_task({}).get_task_id() for _ in range(count)])
+
+
+def test_sqlite_store_is_shared_between_processes(tmp_path):
+    path = str(tmp_path / "state.db")
+    SqliteStateStore(path, base_url="https://a")
+    queue = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=_create_tasks, args=(path, 50, queue)) for _ in range(4)]
+    for w in workers:
+        w.start()
+    task_ids = [task_id for _ in workers for task_id in queue.get(timeout=60)]
+    for w in workers:
+        w.join(timeout=60)
+
+    store = SqliteStateStore(path, base_url="https://a")
+    assert len(set(task_ids)) == 200
+    assert all(store.get_task(task_id) is not None for task_id in task_ids)
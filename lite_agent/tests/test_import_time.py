@@ -0,0 +1,53 @@
+import subprocess
+import sys
+from typing import Dict, Tuple
+
+import pytest
+
+TASK_MODULE = "sandbox.projects.sdc.lite_agent.sdc_lite_agent_task"
+
+# Spawn-only, finalize-only and restart-only dependencies
+DEFERRED_MODULES = (
+    "sandbox.projects.common.vcs.arc",
+    "sandbox.projects.sdc.common.lite_agent_api.spawn_task",
+    "sandbox.projects.sdc.common.pr_helper",
+    "sandbox.projects.sdc.common.sdc_task_report.link_dto",
+    "sandbox.projects.sdc.common.sdc_task_report.sdc_task_report_helper",
+    "sandbox.projects.sdc.common.support_link_helper",
+    "sandbox.projects.sdc.common_tasks.base_sdc_task.runtime_parameters_helper",
+    "sdg.ci.common.utils.restart_task_manager.restart_task_manager",
+    "sdg.ci.common.utils.restart_task_manager.restarters.arcadia_ci_restarter",
+    "sdg.ci.common.utils.restart_task_manager.rules.log_rule",
+    "infra.ci.app.ci_stat_crawler.ch_helper",
+)
+
+
+def _import_times(module: str) -> Dict[str, Tuple[int, int]]:
+    """
+    Parse `python -X importtime` report: {module: (self_us, cumulative_us)}.
+    Only the set of imported modules is checked, timings depend on the machine.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+@pytest.fixture(scope="module")
+def import_times():
+    return _import_times(TASK_MODULE)
+
+
+@pytest.mark.parametrize("deferred_module", DEFERRED_MODULES)
+def test_deferred_modules_are_not_imported(import_times, deferred_module):
+    assert deferred_module not in import_times
+
@@ -0,0 +1,41 @@
+from sandbox.projects.sdc.common.lite_agent_api.dry_run_client import LiteAgentDryRunClient
+from sandbox.projects.sdc.common.lite_agent_api.lite_agent_urls import STABLE_URL
+from sandbox.projects.sdc.common.lite_agent_api.partial_steps import completed_steps, completed_step_names
+
+
+def _mk_client(iteration=0, finalize_on=2):
+    return LiteAgentDryRunClient(base_url=STABLE_URL, current_iteration=iteration, finalize_on_iteration=finalize_on)
+
+
+def test_completed_steps_filters_running_steps():
+    payload = [
+        {"name": "a", "status": "success"},
+        {"name": "b", "status": "fail"},
+        {"name": "c", "status": "in_progress"},
+        {"name": "d"},
+    ]
+    assert [s["name"] for s in completed_steps(payload)] == ["a", "b"]
+
+
+def test_completed_steps_empty_payload():
+    assert completed_steps(None) == []
+    assert completed_steps([]) == []
+
+
+def test_dry_run_running_task_reports_only_first_step():
+    c = _mk_client(iteration=0, finalize_on=2)
+    st = c.create_task({})
+    c.get_task_state(st.get_task_id())
+
+    payload = c.get_steps_payload(st.get_task_id())
+    assert completed_step_names(payload) == ["prepare-environment"]
+    assert all(not s["statistics"] for s in payload[1:])
+
+
+def test_dry_run_finished_task_reports_all_steps():
+    c = _mk_client(iteration=2, finalize_on=2)
+    st = c.create_task({})
+    c.get_task_state(st.get_task_id())
+
+    payload = c.get_steps_payload(st.get_task_id())
+    assert len(completed_steps(payload)) == len(payload) == 3
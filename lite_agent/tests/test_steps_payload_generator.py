@@ -0,0 +1,63 @@
+import pytest
+
+from sandbox.projects.sdc.common.lite_agent_api.dry_run_client import LiteAgentDryRunClient
+from sandbox.projects.sdc.common.lite_agent_api.steps_payload_generator import (
+    StepsPayloadShape,
+    generate_steps_payload,
+)
+from sandbox.projects.sdc.common.lite_agent_api.task_steps_data import (
+    TaskStepsData,
+    UPLOAD_ARTIFACTS_TO_SANDBOX_STEP_NAME,
+)
+
+BASE_URL = "https://example.local"
+
+
+def test_payload_has_requested_shape():
+    shape = StepsPayloadShape(
+        steps=100, parameters_per_step=7, statistics_per_step=5, problems_per_step=2, failed_steps=10
+    )
+    payload = generate_steps_payload(BASE_URL, "T1", shape)
+
+    assert len(payload) == 100
+    assert payload[-1]["name"] == UPLOAD_ARTIFACTS_TO_SANDBOX_STEP_NAME
+    assert len([s for s in payload if s["status"] == "fail"]) == 10
+    assert all(len(s["parameters"]) == 7 for s in payload[:-1])
+    assert all(len(s["statistics"]) == 5 for s in payload[:-1])
+    assert all(len(s["problems"]) == 2 for s in payload[:-1])
+
+
+def test_payload_is_deterministic_for_seed():
+    shape = StepsPayloadShape(steps=20)
+    assert generate_steps_payload(BASE_URL, "T1", shape, seed=1) == generate_steps_payload(
+        BASE_URL, "T1", shape, seed=1
+    )
+    assert generate_steps_payload(BASE_URL, "T1", shape, seed=1) != generate_steps_payload(
+        BASE_URL, "T1", shape, seed=2
+    )
+
+
+@pytest.mark.parametrize("shape", [StepsPayloadShape(steps=0), StepsPayloadShape(steps=5, failed_steps=5)])
+def test_invalid_shape(shape):
+    with pytest.raises(ValueError):
+        generate_steps_payload(BASE_URL, "T1", shape)
+
+
+def test_payload_is_parsed_by_task_steps_data():
+    shape = StepsPayloadShape(
+        steps=50, parameters_per_step=3, statistics_per_step=2, problems_per_step=1, failed_steps=5
+    )
+    obj = TaskStepsData.from_json(generate_steps_payload(BASE_URL, "T1", shape))
+
+    assert len(obj.get_runtime_parameters()) >= 49 * 3
+    assert len(obj.get_step_log_links()) == 50
+    assert len([link for link in obj.get_step_log_links() if link.from_failed_step]) == 5
+
+
+def test_dry_run_client_uses_shape():
+    client = LiteAgentDryRunClient(
+        base_url=BASE_URL, current_iteration=5, steps_payload_shape=StepsPayloadShape(steps=300)
+    )
+    task_id = client.create_task({}).get_task_id()
+    client.get_task_state(task_id)
+    assert len(client.get_steps_payload(task_id)) == 300
@@ -0,0 +1,56 @@
+from typing import List, Optional, Sequence, Tuple
+
+DEFAULT_WINDOW = 8
+
+
+class CompletionEstimator:
+    """
+    Online estimate of the remaining time of a job from (timestamp, progress fraction) samples.
+
+    The progress rate is fitted by least squares over the last `window` samples, so the estimate
+    follows changes of speed between stages. Samples are plain lists to be stored in the task context.
+    """
+
+    def __init__(self, samples: Optional[Sequence[Sequence[float]]] = None, window: int = DEFAULT_WINDOW):
+        if window < 2:
+            raise ValueError("window can't be less than 2")
+        self.window = window
+        self.samples: List[Tuple[float, float]] = [(float(t), float(p)) for t, p in samples or []]
+
+    def add(self, timestamp: float, progress: float) -> None:
+        progress = min(max(float(progress), 0.0), 1.0)
+        if self.samples and timestamp <= self.samples[-1][0]:
+            return
+        if self.samples and progress < self.samples[-1][1]:
+            # progress went back (e.g. restarted block): the previous rate is meaningless
+            self.samples = []
+        self.samples.append((float(timestamp), progress))
+        del self.samples[: -self.window]
+
+    def rate(self) -> Optional[float]:
+        """
+        Progress per second, None until it can be estimated.
+        """
+        if len(self.samples) < 2:
+            return None
+        mean_t = sum(t for t, _ in self.samples) / len(self.samples)
+        mean_p = sum(p for _, p in self.samples) / len(self.samples)
+        var_t = sum((t - mean_t) ** 2 for t, _ in self.samples)
+        if var_t == 0:
+            return None
+        rate = sum((t - mean_t) * (p - mean_p) for t, p in self.samples) / var_t
+        return rate if rate > 0 else None
+
+    def remaining_time(self, now: Optional[float] = None) -> Optional[float]:
+        """
+        Seconds left (after `now` or the last sample), None if there is no progress yet.
+        """
+        rate = self.rate()
+        if rate is None:
+            return None
+        last_timestamp, last_progress = self.samples[-1]
+        elapsed = max(now - last_timestamp, 0.0) if now is not None else 0.0
+        return max((1.0 - last_progress) / rate - elapsed, 0.0)
+
+    def to_list(self) -> List[List[float]]:
+        return [[t, p] for t, p in self.samples]
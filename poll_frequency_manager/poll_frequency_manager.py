@@ -36,3 +36,23 @@ class PollFrequencyManager:
 
         return current_poll_freq
 
+    @staticmethod
+    def calculate_eta_await_time(
+        remaining_time: float,
+        min_poll_freq: int,
+        max_poll_freq: int,
+        lead: float = 0.8,
+    ) -> int:
+        """
+        Wait a `lead` share of the predicted remaining time: rare polls far from the end,
+        shrinking down to `min_poll_freq` as the estimate converges.
+        """
+        if min_poll_freq <= 0:
+            raise ValueError("min_poll_freq can't be non-positive")
+        if max_poll_freq < min_poll_freq:
+            raise ValueError("max_poll_freq can't be less than min_poll_freq")
+        if not 0 < lead <= 1:
+            raise ValueError("lead must be in (0, 1]")
+
+        return int(min(max(remaining_time * lead, min_poll_freq), max_poll_freq))
+
@@ -0,0 +1,69 @@
+import pytest
+
+from poll_frequency_manager.completion_estimator import CompletionEstimator
+from poll_frequency_manager.poll_frequency_manager import PollFrequencyManager
+
+
+def test_no_estimate_until_progress_moves():
+    estimator = CompletionEstimator()
+    assert estimator.remaining_time() is None
+    estimator.add(0, 0.1)
+    assert estimator.remaining_time() is None
+    estimator.add(100, 0.1)
+    assert estimator.remaining_time() is None
+
+
+def test_linear_progress_estimate():
+    estimator = CompletionEstimator()
+    for t in range(0, 500, 100):
+        estimator.add(t, t / 1000)
+
+    assert estimator.rate() == pytest.approx(0.001)
+    assert estimator.remaining_time() == pytest.approx(600)
+    assert estimator.remaining_time(now=700) == pytest.approx(300)
+    assert estimator.remaining_time(now=5000) == 0
+
+
+def test_window_follows_speed_change():
+    estimator = CompletionEstimator(window=3)
+    for t, p in [(0, 0.0), (100, 0.1), (200, 0.2), (300, 0.5), (400, 0.8)]:
+        estimator.add(t, p)
+
+    assert len(estimator.samples) == 3
+    assert estimator.rate() == pytest.approx(0.003)
+
+
+def test_progress_going_back_resets_samples():
+    estimator = CompletionEstimator()
+    estimator.add(0, 0.4)
+    estimator.add(100, 0.5)
+    estimator.add(200, 0.1)
+    assert estimator.samples == [(200.0, 0.1)]
+
+
+def test_samples_round_trip():
+    estimator = CompletionEstimator()
+    estimator.add(0, 0.2)
+    estimator.add(60, 0.5)
+    restored = CompletionEstimator(estimator.to_list())
+    assert restored.remaining_time() == estimator.remaining_time()
+
+
+@pytest.mark.parametrize(
+    "remaining_time, expected",
+    [
+        (100_000, 3600),
+        (1000, 800),
+        (30, 60),
+        (0, 60),
+    ],
+)
+def test_eta_await_time(remaining_time, expected):
+    assert PollFrequencyManager.calculate_eta_await_time(remaining_time, 60, 3600) == expected
+
+
+def test_eta_await_time_invalid_bounds():
+    with pytest.raises(ValueError):
+        PollFrequencyManager.calculate_eta_await_time(100, 0, 3600)
+    with pytest.raises(ValueError):
+        PollFrequencyManager.calculate_eta_await_time(100, 600, 60)
@@ -0,0 +1,26 @@
+from typing import Any, Mapping
+
+from sandbox import sdk2
+
+from .result_snapshot import SNAPSHOT_FILE_NAME, SNAPSHOT_VERSION, ResultSnapshotReader, write_result_snapshot
+
+
+class SdcTaskResultSnapshot(sdk2.Resource):
+    """
+    Versioned binary snapshot of the final task result, read it with `open_snapshot_resource`.
+    """
+
+    ttl = 14
+    snapshot_version = sdk2.Attributes.Integer("Snapshot format version", default=SNAPSHOT_VERSION)
+
+
+def publish_snapshot_resource(task, sections: Mapping[str, Any], description: str) -> SdcTaskResultSnapshot:
+    resource = SdcTaskResultSnapshot(task, description, SNAPSHOT_FILE_NAME, snapshot_version=SNAPSHOT_VERSION)
+    resource_data = sdk2.ResourceData(resource)
+    write_result_snapshot(str(resource_data.path), sections)
+    resource_data.ready()
+    return resource
+
+
+def open_snapshot_resource(resource) -> ResultSnapshotReader:
+    return ResultSnapshotReader(str(sdk2.ResourceData(resource).path))
@@ -0,0 +1,154 @@
+import json
+import mmap
+import struct
+import zlib
+from typing import Any, Dict, Iterable, Mapping, NamedTuple
+
+SNAPSHOT_MAGIC = b"SDCRSNP\0"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_FILE_NAME = "result_snapshot.bin"
+
+CODEC_JSON = "json"
+CODEC_ZLIB_JSON = "zlib+json"
+
+DEFAULT_COMPRESS_THRESHOLD = 64 * 1024
+
+# magic, version, reserved flags, sections count, index length
+_HEADER = struct.Struct("<8sHHII")
+
+
+class SnapshotSection(NamedTuple):
+    name: str
+    offset: int
+    length: int
+    codec: str
+
+
+def _encode(value: Any, compress_threshold: int) -> tuple[bytes, str]:
+    data = json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+    if len(data) >= compress_threshold:
+        compressed = zlib.compress(data, 6)
+        if len(compressed) < len(data):
+            return compressed, CODEC_ZLIB_JSON
+    return data, CODEC_JSON
+
+
+def write_result_snapshot(
+    path: str,
+    sections: Mapping[str, Any],
+    compress_threshold: int = DEFAULT_COMPRESS_THRESHOLD,
+) -> int:
+    """
+    Write sections (JSON-serializable values) into a versioned binary snapshot.
+
+    Layout: fixed header, JSON index of sections, then section payloads one after another.
+    Every section is encoded separately, so a reader decodes only sections it needs.
+    Returns the size of the written file.
+    """
+    payloads = []
+    for name, value in sections.items():
+        data, codec = _encode(value, compress_threshold)
+        payloads.append((str(name), data, codec))
+
+    # Offsets depend on the index length, and the index length depends on offsets:
+    # stabilise it with fixed-width offsets.
+    def build_index(base: int) -> bytes:
+        index = []
+        offset = base
+        for name, data, codec in payloads:
+            index.append({"name": name, "offset": f"{offset:016d}", "length": len(data), "codec": codec})
+            offset += len(data)
+        return json.dumps(index, separators=(",", ":")).encode("utf-8")
+
+    index = build_index(0)
+    index = build_index(_HEADER.size + len(index))
+
+    with open(path, "wb") as fd:
+        fd.write(_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, 0, len(payloads), len(index)))
+        fd.write(index)
+        for _, data, _ in payloads:
+            fd.write(data)
+        return fd.tell()
+
+
+class ResultSnapshotReader:
+    """
+    Memory-mapped snapshot reader.
+
+    `raw()` returns a zero-copy view into the mapped file; `load()` decodes a single section.
+    Views returned by `raw()` must be released before `close()`.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = open(path, "rb")
+        try:
+            self._mmap = mmap.mmap(self._fd.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._fd.close()
+            raise ValueError(f"Result snapshot {path!r} is empty")
+        self._view = memoryview(self._mmap)
+        self.version, self._sections = self._read_index()
+
+    def _read_index(self) -> tuple[int, Dict[str, SnapshotSection]]:
+        if len(self._view) < _HEADER.size:
+            raise ValueError(f"Result snapshot {self.path!r} is truncated")
+        magic, version, _, count, index_length = _HEADER.unpack_from(self._view, 0)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f"{self.path!r} is not a result snapshot")
+        if version > SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported result snapshot version {version} (max supported: {SNAPSHOT_VERSION})")
+
+        index = json.loads(bytes(self._view[_HEADER.size : _HEADER.size + index_length]))
+        if len(index) != count:
+            raise ValueError(f"Result snapshot {self.path!r} has corrupted index")
+
+        sections = {}
+        for item in index:
+            section = SnapshotSection(item["name"], int(item["offset"]), int(item["length"]), item["codec"])
+            if section.offset + section.length > len(self._view):
+                raise ValueError(f"Result snapshot {self.path!r} is truncated")
+            sections[section.name] = section
+        return version, sections
+
+    def names(self) -> Iterable[str]:
+        return tuple(self._sections)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._sections
+
+    def section(self, name: str) -> SnapshotSection:
+        try:
+            return self._sections[name]
+        except KeyError:
+            raise KeyError(f"Result snapshot has no section {name!r}. Available: {', '.join(self._sections)}")
+
+    def raw(self, name: str) -> memoryview:
+        section = self.section(name)
+        return self._view[section.offset : section.offset + section.length]
+
+    def load(self, name: str) -> Any:
+        section = self.section(name)
+        raw = self.raw(name)
+        try:
+            if section.codec == CODEC_ZLIB_JSON:
+                return json.loads(zlib.decompress(raw))
+            if section.codec == CODEC_JSON:
+                return json.loads(raw.tobytes())
+            raise ValueError(f"Unknown codec {section.codec!r} of section {name!r}")
+        finally:
+            raw.release()
+
+    def load_all(self) -> Dict[str, Any]:
+        return {name: self.load(name) for name in self._sections}
+
+    def close(self) -> None:
+        self._view.release()
+        self._mmap.close()
+        self._fd.close()
+
+    def __enter__(self) -> "ResultSnapshotReader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
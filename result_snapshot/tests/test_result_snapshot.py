@@ -0,0 +1,78 @@
+import struct
+
+import pytest
+
+from result_snapshot.result_snapshot import (
+    CODEC_JSON,
+    CODEC_ZLIB_JSON,
+    SNAPSHOT_VERSION,
+    ResultSnapshotReader,
+    write_result_snapshot,
+)
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    return str(tmp_path / "snapshot.bin")
+
+
+def test_roundtrip(snapshot_path):
+    sections = {
+        "runtime_parameters": {"a": "1", "b": [1, 2, 3]},
+        "runtime_statistics": {"build.ms": 2150.0},
+        "runtime_build_problems": [],
+        "nirvana_results": {"result": "passed"},
+    }
+    write_result_snapshot(snapshot_path, sections)
+
+    with ResultSnapshotReader(snapshot_path) as reader:
+        assert reader.version == SNAPSHOT_VERSION
+        assert tuple(reader.names()) == tuple(sections)
+        assert reader.load_all() == sections
+
+
+def test_large_sections_are_compressed(snapshot_path):
+    big = {f"param.{i}": "value" * 10 for i in range(5000)}
+    write_result_snapshot(snapshot_path, {"big": big, "small": {"x": 1}}, compress_threshold=1024)
+
+    with ResultSnapshotReader(snapshot_path) as reader:
+        assert reader.section("big").codec == CODEC_ZLIB_JSON
+        assert reader.section("small").codec == CODEC_JSON
+        assert reader.load("big") == big
+
+
+def test_raw_is_zero_copy_view(snapshot_path):
+    write_result_snapshot(snapshot_path, {"s": "text"})
+
+    with ResultSnapshotReader(snapshot_path) as reader:
+        raw = reader.raw("s")
+        assert isinstance(raw, memoryview)
+        assert raw.tobytes() == b'"text"'
+        raw.release()
+
+
+def test_unknown_section(snapshot_path):
+    write_result_snapshot(snapshot_path, {"s": 1})
+
+    with ResultSnapshotReader(snapshot_path) as reader:
+        assert "s" in reader
+        with pytest.raises(KeyError):
+            reader.load("missing")
+
+
+def test_newer_version_is_rejected(snapshot_path):
+    write_result_snapshot(snapshot_path, {"s": 1})
+    with open(snapshot_path, "r+b") as fd:
+        fd.seek(8)
+        fd.write(struct.pack("<H", SNAPSHOT_VERSION + 1))
+
+    with pytest.raises(ValueError, match="Unsupported result snapshot version"):
+        ResultSnapshotReader(snapshot_path)
+
+
+def test_not_a_snapshot(snapshot_path):
+    with open(snapshot_path, "wb") as fd:
+        fd.write(b"{}" * 20)
+
+    with pytest.raises(ValueError, match="not a result snapshot"):
+        ResultSnapshotReader(snapshot_path)
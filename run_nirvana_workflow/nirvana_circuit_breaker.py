@@ -0,0 +1,200 @@
+import logging
+import time
+import uuid
+from typing import Callable, Optional, TypeVar
+
+from .nirvana_shared_state import InMemoryStateStore, JsonFileStateStore, SharedStateStore
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_SLOW_CALL_THRESHOLD = 30.0
+DEFAULT_RECOVERY_INTERVAL = 600
+DEFAULT_PROBE_TIMEOUT = 300
+
+
+class CircuitBreakerOpen(Exception):
+    def __init__(self, name: str, retry_after: float):
+        super().__init__("Circuit breaker {} is open, retry after {:.0f} s".format(name, retry_after))
+        self.retry_after = retry_after
+
+
+class _FailedBatch(Exception):
+    def __init__(self, results):
+        super().__init__("Every call of the batch has failed")
+        self.results = results
+
+
+class NirvanaCircuitBreaker(object):
+    """
+    Circuit breaker whose state is shared by all tasks using the same store.
+
+    Opens after `failure_threshold` consecutive failed or slow (longer than `slow_call_threshold`
+    seconds) calls. After `recovery_interval` seconds a single caller is let through as a probe:
+    its success closes the breaker, its failure opens it again. Other callers are rejected meanwhile;
+    a probe which has not reported within `probe_timeout` is taken over by the next caller.
+    """
+
+    def __init__(
+        self,
+        store: SharedStateStore,
+        name: str = "nirvana",
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        slow_call_threshold: float = DEFAULT_SLOW_CALL_THRESHOLD,
+        recovery_interval: float = DEFAULT_RECOVERY_INTERVAL,
+        probe_timeout: float = DEFAULT_PROBE_TIMEOUT,
+        clock: Callable[[], float] = time.time,
+    ):
+        if failure_threshold <= 0:
+            raise ValueError("failure_threshold can't be non-positive")
+        self.store = store
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.slow_call_threshold = slow_call_threshold
+        self.recovery_interval = recovery_interval
+        self.probe_timeout = probe_timeout
+        self.clock = clock
+        self._probe_id = None
+
+    def _breaker(self, state: dict) -> dict:
+        breakers = state.setdefault("circuit_breakers", {})
+        return breakers.setdefault(
+            self.name, {"state": STATE_CLOSED, "failures": 0, "opened_at": None, "probe_id": None, "probe_at": None}
+        )
+
+    @property
+    def state(self) -> str:
+        return self.store.update(lambda state: self._breaker(state)["state"])
+
+    def retry_after(self) -> float:
+        """
+        Seconds until the next probe is allowed, 0 if the breaker is closed.
+        """
+
+        def _retry_after(state: dict) -> float:
+            breaker = self._breaker(state)
+            if breaker["state"] == STATE_CLOSED:
+                return 0.0
+            now = self.clock()
+            if breaker["state"] == STATE_HALF_OPEN:
+                return max(breaker["probe_at"] + self.probe_timeout - now, 0.0)
+            return max(breaker["opened_at"] + self.recovery_interval - now, 0.0)
+
+        return self.store.update(_retry_after)
+
+    def allow_request(self) -> bool:
+        probe_id = uuid.uuid4().hex
+
+        def _allow(state: dict) -> Optional[str]:
+            breaker = self._breaker(state)
+            now = self.clock()
+            if breaker["state"] == STATE_CLOSED:
+                return None
+            if breaker["state"] == STATE_OPEN and now < breaker["opened_at"] + self.recovery_interval:
+                return STATE_OPEN
+            if breaker["state"] == STATE_HALF_OPEN and now < breaker["probe_at"] + self.probe_timeout:
+                return STATE_OPEN
+            breaker.update(state=STATE_HALF_OPEN, probe_id=probe_id, probe_at=now)
+            return STATE_HALF_OPEN
+
+        verdict = self.store.update(_allow)
+        self._probe_id = probe_id if verdict == STATE_HALF_OPEN else None
+        if self._probe_id:
+            logger.info("Circuit breaker %s: probing recovery", self.name)
+        return verdict != STATE_OPEN
+
+    def record_success(self, latency: float) -> None:
+        if latency > self.slow_call_threshold:
+            logger.warning("Circuit breaker %s: slow call (%.1f s)", self.name, latency)
+            self.record_failure()
+            return
+
+        def _success(state: dict) -> None:
+            breaker = self._breaker(state)
+            if breaker["state"] == STATE_HALF_OPEN and breaker["probe_id"] != self._probe_id:
+                return
+            if breaker["state"] != STATE_CLOSED:
+                logger.info("Circuit breaker %s: closed", self.name)
+            breaker.update(state=STATE_CLOSED, failures=0, opened_at=None, probe_id=None, probe_at=None)
+
+        self.store.update(_success)
+        self._probe_id = None
+
+    def record_failure(self) -> None:
+        def _failure(state: dict) -> None:
+            breaker = self._breaker(state)
+            now = self.clock()
+            if breaker["state"] == STATE_HALF_OPEN:
+                if breaker["probe_id"] == self._probe_id:
+                    logger.warning("Circuit breaker %s: recovery probe failed", self.name)
+                    breaker.update(state=STATE_OPEN, opened_at=now, probe_id=None, probe_at=None)
+                return
+            breaker["failures"] += 1
+            if breaker["state"] == STATE_CLOSED and breaker["failures"] >= self.failure_threshold:
+                logger.warning("Circuit breaker %s: opened after %s failures", self.name, breaker["failures"])
+                breaker.update(state=STATE_OPEN, opened_at=now)
+
+        self.store.update(_failure)
+        self._probe_id = None
+
+    def call(self, fn: Callable[[], T]) -> T:
+        if not self.allow_request():
+            raise CircuitBreakerOpen(self.name, self.retry_after())
+        started = time.monotonic()
+        try:
+            result = fn()
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success(time.monotonic() - started)
+        return result
+
+    def guard(self, client) -> "CircuitBreakerClient":
+        return CircuitBreakerClient(client, self)
+
+
+class CircuitBreakerClient(object):
+    """
+    Nirvana client proxy sending requests through the circuit breaker.
+    """
+
+    def __init__(self, client, circuit_breaker: NirvanaCircuitBreaker):
+        self.client = client
+        self.circuit_breaker = circuit_breaker
+
+    def make_request(self, url, params):
+        return self.circuit_breaker.call(lambda: self.client.make_request(url, params))
+
+    def make_batch_request(self, calls):
+        """
+        Batch errors are reported per call, so a batch whose calls have all failed is recorded
+        as a failure of the breaker; the results are returned as is.
+        """
+
+        def _batch():
+            results = self.client.make_batch_request(calls)
+            if results and not any(result.ok for result in results):
+                raise _FailedBatch(results)
+            return results
+
+        try:
+            return self.circuit_breaker.call(_batch)
+        except _FailedBatch as exc:
+            return exc.results
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+def open_circuit_breaker(path: Optional[str], **kwargs) -> NirvanaCircuitBreaker:
+    """
+    Breaker shared through the state file at `path`, or a process-local one if `path` is empty.
+    """
+    store = JsonFileStateStore(path) if path else InMemoryStateStore()
+    return NirvanaCircuitBreaker(store, **kwargs)
@@ -0,0 +1,70 @@
+import fnmatch
+import logging
+from typing import List, NamedTuple, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+STATUS_COMPLETED = "completed"
+RESULT_SUCCESS = "success"
+
+
+class CriticalBlockFailure(NamedTuple):
+    block_guid: Optional[str]
+    block_code: Optional[str]
+    block_name: Optional[str]
+    result: Optional[str]
+
+    @property
+    def title(self) -> str:
+        return self.block_name or self.block_code or self.block_guid or "unknown block"
+
+    def to_dict(self) -> dict:
+        return self._asdict()
+
+
+def _execution_state(block: dict) -> dict:
+    state = block.get("executionState")
+    if isinstance(state, dict):
+        return state
+    return {"status": block.get("status"), "result": block.get("result")}
+
+
+class CriticalBlocks(object):
+    """
+    Blocks whose failure fails the whole run. Patterns are shell-style (`fnmatch`) and are matched
+    against the name, the code and the guid of a block summary of `getWorkflowSummary`.
+    """
+
+    def __init__(self, patterns: Sequence[str]):
+        self.patterns = [str(pattern).strip() for pattern in patterns if str(pattern or "").strip()]
+
+    def __bool__(self) -> bool:
+        return bool(self.patterns)
+
+    def matches(self, block: dict) -> bool:
+        names = [block.get(field) for field in ("blockName", "blockCode", "blockGuid")]
+        return any(
+            fnmatch.fnmatchcase(name, pattern) for name in names if isinstance(name, str) for pattern in self.patterns
+        )
+
+    def find_failed(self, summary: Optional[dict]) -> List[CriticalBlockFailure]:
+        """
+        Critical blocks of the summary completed with a non-success result.
+        """
+        failed = []
+        for block in (summary or {}).get("blockSummaries") or []:
+            if not self.matches(block):
+                continue
+            state = _execution_state(block)
+            if state.get("status") == STATUS_COMPLETED and state.get("result") != RESULT_SUCCESS:
+                failed.append(
+                    CriticalBlockFailure(
+                        block_guid=block.get("blockGuid"),
+                        block_code=block.get("blockCode"),
+                        block_name=block.get("blockName"),
+                        result=state.get("result"),
+                    )
+                )
+        if failed:
+            logger.warning("Critical blocks failed: %s", [failure.title for failure in failed])
+        return failed
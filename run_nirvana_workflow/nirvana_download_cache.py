@@ -0,0 +1,160 @@
+import errno
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+BLOB_SUFFIX = ".blob"
+META_SUFFIX = ".meta"
+LOCK_FILE_NAME = ".lock"
+
+
+def _copy_with_sha256(src_path: str, dest_path: str) -> str:
+    sha256 = hashlib.sha256()
+    with open(src_path, "rb") as src, open(dest_path, "wb") as dst:
+        for chunk in iter(lambda: src.read(1024 * 1024), b""):
+            sha256.update(chunk)
+            dst.write(chunk)
+    return sha256.hexdigest()
+
+
+class NirvanaDownloadCache(object):
+    """
+    On-disk cache of Nirvana storage downloads, shared by processes of one host.
+
+    Entries are keyed by the storage path plus a validator (ETag if the storage returns one).
+    Without a validator an entry is keyed by the path alone, which relies on storage paths being
+    immutable (Nirvana writes every block output to a new path). The sha256 of a blob is checked
+    on every read, a corrupted entry is removed and treated as a miss. Entries are published
+    atomically (write to a temporary file + rename), the least recently used ones are evicted
+    when the cache exceeds `max_bytes`.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        if max_bytes <= 0:
+            raise ValueError("max_bytes can't be non-positive")
+        self.root = root
+        self.max_bytes = int(max_bytes)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._stats_lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def key(storage_path: str, validator: Optional[str] = None) -> str:
+        return hashlib.sha256("{}\n{}".format(storage_path, validator or "").encode("utf-8")).hexdigest()
+
+    def _blob_path(self, key: str) -> str:
+        return os.path.join(self.root, key + BLOB_SUFFIX)
+
+    def _meta_path(self, key: str) -> str:
+        return os.path.join(self.root, key + META_SUFFIX)
+
+    def _count(self, counter: str) -> None:
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    def get(self, storage_path: str, dest_path: str, validator: Optional[str] = None) -> Optional[int]:
+        """
+        Copy the cached blob to `dest_path` and return its size, or None on miss.
+        """
+        key = self.key(storage_path, validator)
+        blob_path = self._blob_path(key)
+        try:
+            with open(self._meta_path(key)) as fd:
+                meta = json.load(fd)
+            if os.path.getsize(blob_path) != meta["size"]:
+                raise ValueError("size mismatch")
+            if _copy_with_sha256(blob_path, dest_path) != meta["sha256"]:
+                raise ValueError("sha256 mismatch")
+            os.utime(blob_path)
+        except (OSError, ValueError, KeyError) as exc:
+            if not isinstance(exc, FileNotFoundError):
+                logger.warning("Broken download cache entry for %s: %s", storage_path, exc)
+                self._remove(key)
+            self._count("misses")
+            return None
+        self._count("hits")
+        return meta["size"]
+
+    def _remove(self, key: str) -> None:
+        for path in (self._meta_path(key), self._blob_path(key)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def put(self, storage_path: str, src_path: str, validator: Optional[str] = None) -> None:
+        key = self.key(storage_path, validator)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        os.close(fd)
+        try:
+            sha256 = _copy_with_sha256(src_path, tmp_path)
+            size = os.path.getsize(tmp_path)
+            meta = {"storage_path": storage_path, "validator": validator, "size": size, "sha256": sha256}
+            with open(tmp_path + META_SUFFIX, "w") as meta_fd:
+                json.dump(meta, meta_fd)
+            # blob first: a meta file always points to a complete blob
+            os.replace(tmp_path, self._blob_path(key))
+            os.replace(tmp_path + META_SUFFIX, self._meta_path(key))
+        finally:
+            for path in (tmp_path, tmp_path + META_SUFFIX):
+                try:
+                    os.remove(path)
+                except OSError as exc:
+                    if exc.errno != errno.ENOENT:
+                        raise
+        self.evict()
+
+    def fetch_to_file(
+        self,
+        storage_path: str,
+        dest_path: str,
+        download_to_file: Callable[[str, str], int],
+        validator: Optional[str] = None,
+    ) -> int:
+        size = self.get(storage_path, dest_path, validator)
+        if size is not None:
+            return size
+        size = download_to_file(storage_path, dest_path)
+        try:
+            self.put(storage_path, dest_path, validator)
+        except OSError as exc:
+            logger.warning("Failed to cache download of %s: %s", storage_path, exc)
+        return size
+
+    def evict(self) -> None:
+        with open(os.path.join(self.root, LOCK_FILE_NAME), "w") as lock_fd:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX)
+            try:
+                entries = []
+                total = 0
+                for entry in os.scandir(self.root):
+                    if not entry.name.endswith(BLOB_SUFFIX):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.name[: -len(BLOB_SUFFIX)]))
+                    total += stat.st_size
+
+                for _, size, key in sorted(entries):
+                    if total <= self.max_bytes:
+                        break
+                    self._remove(key)
+                    total -= size
+                    self._count("evictions")
+            finally:
+                fcntl.flock(lock_fd, fcntl.LOCK_UN)
@@ -0,0 +1,121 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+STATUS_SPAWN_FAILED = "spawn_failed"
+STATUS_RUNNING = "running"
+STATUS_COMPLETED = "completed"
+
+RESULT_SUCCESS = "success"
+RESULT_TIMEOUT = "timeout"
+
+
+class FanOutInstance(NamedTuple):
+    """
+    One workflow instance of the fan-out. Stored in the task context as dict between poll ticks.
+    """
+
+    index: int
+    global_options: dict
+    workflow_instance_id: Optional[str] = None
+    status: str = STATUS_RUNNING
+    result: Optional[str] = None
+    error: Optional[str] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status != STATUS_RUNNING
+
+    @property
+    def succeeded(self) -> bool:
+        return self.status == STATUS_COMPLETED and self.result == RESULT_SUCCESS
+
+    def to_dict(self) -> dict:
+        return self._asdict()
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "FanOutInstance":
+        return cls(**data)
+
+
+def spawn_instances(
+    option_sets: List[dict],
+    spawn_one: Callable[[dict], str],
+    max_workers: int,
+) -> List[FanOutInstance]:
+    """
+    Clone and start one workflow instance per option set concurrently.
+    `spawn_one` returns the started instance id; its failures are recorded, not raised.
+    """
+    if max_workers <= 0:
+        raise ValueError("max_workers can't be non-positive")
+
+    def _spawn(index: int) -> FanOutInstance:
+        options = option_sets[index] or {}
+        try:
+            instance_id = spawn_one(options)
+        except Exception as exc:
+            logger.warning("Failed to spawn fan-out instance #%s (%s): %s", index, options, exc)
+            return FanOutInstance(index, options, status=STATUS_SPAWN_FAILED, error=str(exc))
+        logger.info("Fan-out instance #%s started: %s", index, instance_id)
+        return FanOutInstance(index, options, workflow_instance_id=instance_id)
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, max(len(option_sets), 1))) as executor:
+        return list(executor.map(_spawn, range(len(option_sets))))
+
+
+def sweep_execution_states(client, instances: List[FanOutInstance]) -> List[FanOutInstance]:
+    """
+    Request execution states of all running instances in one batch.
+    Instances whose state could not be fetched stay running and are asked again on the next tick.
+    """
+    running = [instance for instance in instances if not instance.finished]
+    if not running:
+        return list(instances)
+
+    calls = [("getExecutionState", dict(workflowInstanceId=i.workflow_instance_id)) for i in running]
+    try:
+        call_results = client.make_batch_request(calls)
+    except Exception as exc:
+        logger.warning("Failed to execute GetExecutionState sweep: %s", exc)
+        return list(instances)
+
+    updated: Dict[int, FanOutInstance] = {}
+    for instance, call_result in zip(running, call_results):
+        if not call_result.ok:
+            logger.warning("Failed to get state of %s: %s", instance.workflow_instance_id, call_result.error)
+            continue
+        progress = dict(call_result.result)
+        logger.info("Workflow instance %s progress info: %s", instance.workflow_instance_id, progress)
+        if progress.get("status") == STATUS_COMPLETED:
+            updated[instance.index] = instance._replace(status=STATUS_COMPLETED, result=progress.get("result"))
+    return [updated.get(instance.index, instance) for instance in instances]
+
+
+def mark_timed_out(instances: List[FanOutInstance]) -> List[FanOutInstance]:
+    return [
+        instance._replace(status=STATUS_COMPLETED, result=RESULT_TIMEOUT) if not instance.finished else instance
+        for instance in instances
+    ]
+
+
+def summarize(instances: List[FanOutInstance]) -> dict:
+    failed = [instance for instance in instances if instance.finished and not instance.succeeded]
+    return {
+        "total": len(instances),
+        "succeeded": sum(1 for instance in instances if instance.succeeded),
+        "failed": len(failed),
+        "running": sum(1 for instance in instances if not instance.finished),
+        "failures": [
+            {
+                "index": instance.index,
+                "workflow_instance_id": instance.workflow_instance_id,
+                "status": instance.status,
+                "result": instance.result,
+                "error": instance.error,
+            }
+            for instance in failed
+        ],
+    }
@@ -0,0 +1,163 @@
+import logging
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# read-only JSON-RPC methods: a duplicated call has no side effects
+HEDGEABLE_METHODS = frozenset(("getExecutionState", "getWorkflowResults", "getWorkflowSummary", "getBlockResults"))
+
+DEFAULT_PERCENTILE = 95.0
+DEFAULT_MAX_HEDGE_RATIO = 0.1
+DEFAULT_INITIAL_DELAY = 2.0
+DEFAULT_MIN_SAMPLES = 10
+DEFAULT_WINDOW = 200
+# upper bound of a hedged call, attempts of NirvanaClient are also bounded by it
+DEFAULT_TIMEOUT = 120.0
+
+
+def percentile(values, q: float) -> Optional[float]:
+    """
+    Nearest-rank percentile, None for no values.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(int(math.ceil(q / 100.0 * len(ordered))), 1)
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class HedgedRequestExecutor(object):
+    """
+    Sends a second attempt of an idempotent read request if the first one is slower than the
+    `percentile` of observed latencies; the first successful answer wins.
+
+    Hedges are limited to `max_hedge_ratio` of requests (zero disables hedging), a call fails with TimeoutError if no
+    attempt has answered within `timeout` seconds. Latencies and counters can be saved with
+    `to_state()` and restored via `state`, so the statistics survive between task executions.
+    """
+
+    def __init__(
+        self,
+        percentile: float = DEFAULT_PERCENTILE,
+        max_hedge_ratio: float = DEFAULT_MAX_HEDGE_RATIO,
+        initial_delay: float = DEFAULT_INITIAL_DELAY,
+        min_samples: int = DEFAULT_MIN_SAMPLES,
+        window: int = DEFAULT_WINDOW,
+        state: Optional[dict] = None,
+        max_workers: int = 4,
+        timeout: float = DEFAULT_TIMEOUT,
+    ):
+        if not 0 < percentile < 100:
+            raise ValueError("percentile must be in (0, 100)")
+        if not 0 <= max_hedge_ratio <= 1:
+            raise ValueError("max_hedge_ratio must be in [0, 1]")
+        if timeout <= 0:
+            raise ValueError("timeout must be positive")
+        self.percentile = percentile
+        self.max_hedge_ratio = max_hedge_ratio
+        self.initial_delay = initial_delay
+        self.min_samples = min_samples
+        self.timeout = timeout
+        state = state or {}
+        self.latencies = deque(state.get("latencies", []), maxlen=window)
+        self.requests = int(state.get("requests", 0))
+        self.hedged = int(state.get("hedged", 0))
+        self.hedge_wins = int(state.get("hedge_wins", 0))
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="nirvana-hedge")
+
+    def delay(self) -> float:
+        with self._lock:
+            if len(self.latencies) < self.min_samples:
+                return self.initial_delay
+            return percentile(self.latencies, self.percentile)
+
+    def _hedge_allowed(self) -> bool:
+        # zero ratio disables hedging; otherwise at least one hedge is allowed,
+        # so a stalled first poll is hedged as well
+        if self.max_hedge_ratio == 0:
+            return False
+        with self._lock:
+            if self.hedged < max(1.0, self.max_hedge_ratio * self.requests):
+                self.hedged += 1
+                return True
+            return False
+
+    def _submit(self, fn: Callable[[], T]) -> "Future[T]":
+        started = time.monotonic()
+
+        def _record(future: Future) -> None:
+            if not future.cancelled() and future.exception() is None:
+                with self._lock:
+                    self.latencies.append(round(time.monotonic() - started, 4))
+
+        future = self._executor.submit(fn)
+        future.add_done_callback(_record)
+        return future
+
+    def call(self, method: str, fn: Callable[[], T]) -> T:
+        if method not in HEDGEABLE_METHODS:
+            return fn()
+
+        with self._lock:
+            self.requests += 1
+        deadline = time.monotonic() + self.timeout
+        primary = self._submit(fn)
+        done, _ = wait([primary], timeout=min(self.delay(), self.timeout))
+        pending = {primary}
+        if not done and self._hedge_allowed():
+            logger.info("%s is slower than %.2f s, sending hedged request", method, self.delay())
+            pending.add(self._submit(fn))
+
+        first_error = None
+        while pending:
+            done, pending = wait(pending, timeout=max(deadline - time.monotonic(), 0), return_when=FIRST_COMPLETED)
+            if not done:
+                raise TimeoutError("{} has not answered in {} s".format(method, self.timeout))
+            for future in done:
+                if future.exception() is None:
+                    if future is not primary:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return future.result()
+                first_error = first_error or future.exception()
+        raise first_error
+
+    @property
+    def stats(self) -> Dict[str, Optional[float]]:
+        with self._lock:
+            latencies = list(self.latencies)
+            return {
+                "requests": self.requests,
+                "hedged": self.hedged,
+                "hedge_wins": self.hedge_wins,
+                "p50": percentile(latencies, 50),
+                "p95": percentile(latencies, 95),
+                "p99": percentile(latencies, 99),
+            }
+
+    def to_state(self) -> dict:
+        with self._lock:
+            return {
+                "latencies": list(self.latencies),
+                "requests": self.requests,
+                "hedged": self.hedged,
+                "hedge_wins": self.hedge_wins,
+            }
+
+    def __enter__(self) -> "HedgedRequestExecutor":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        # losing attempts are not waited for, queued ones are not started
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,27 @@
+from numbers import Number
+from typing import Optional
+
+# (completed, total) counters of blocks reported by getExecutionState
+BLOCK_COUNTER_KEYS = (
+    ("completedBlocks", "totalBlocks"),
+    ("completedBlocksCount", "blocksCount"),
+)
+
+
+def extract_execution_progress(progress: dict) -> Optional[float]:
+    """
+    Progress fraction in [0, 1] from a getExecutionState payload, None if it reports no progress.
+    The `progress` field is used if present (fraction or percent), block counters otherwise.
+    """
+    value = progress.get("progress")
+    if isinstance(value, Number) and not isinstance(value, bool):
+        value = float(value)
+        if value > 1:
+            value /= 100.0
+        return min(max(value, 0.0), 1.0)
+
+    for completed_key, total_key in BLOCK_COUNTER_KEYS:
+        completed, total = progress.get(completed_key), progress.get(total_key)
+        if isinstance(completed, int) and isinstance(total, int) and total > 0:
+            return min(max(completed / total, 0.0), 1.0)
+    return None
@@ -0,0 +1,11 @@
+from sandbox import sdk2
+
+
+class SdcNirvanaWorkflowOutput(sdk2.Resource):
+    """
+    Nirvana workflow output too big to be published inline in `nirvana_results`.
+    """
+
+    ttl = 14
+    endpoint = sdk2.Attributes.String("Workflow output endpoint")
+    workflow_instance_id = sdk2.Attributes.String("Workflow instance id")
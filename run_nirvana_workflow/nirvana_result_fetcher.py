@@ -0,0 +1,113 @@
+import json
+import logging
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 4
+
+RESOURCE_REFERENCE_TYPE = "sandbox_resource"
+
+_UNSAFE_FILE_NAME_RE = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+class LargeOutput(NamedTuple):
+    """Output streamed to disk because it exceeds the inline size limit."""
+
+    endpoint: str
+    path: str
+    size: int
+
+
+def make_resource_reference(endpoint: str, resource_id: int, size: int) -> dict:
+    return {"type": RESOURCE_REFERENCE_TYPE, "endpoint": endpoint, "resource_id": resource_id, "size": size}
+
+
+def is_resource_reference(value: Any) -> bool:
+    return isinstance(value, dict) and value.get("type") == RESOURCE_REFERENCE_TYPE and "resource_id" in value
+
+
+def load_output_file(path: str) -> Any:
+    """Same decoding as NirvanaClient.download_resource: json if possible, text otherwise."""
+    with open(path, encoding="utf-8", errors="replace") as fd:
+        text = fd.read()
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+class NirvanaResultFetcher(object):
+    """
+    Downloads `getWorkflowResults` outputs concurrently (bounded by `max_workers`).
+    If `endpoints` is given, only these endpoints are downloaded.
+    Download duration of every endpoint is kept in `timings` (seconds).
+
+    If `inline_size_limit` is set, outputs are streamed to `download_dir`: outputs up to the limit
+    are loaded back and returned inline, bigger ones are returned as `LargeOutput` (left on disk).
+    """
+
+    def __init__(
+        self,
+        client,
+        endpoints: Optional[Iterable[str]] = None,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        inline_size_limit: Optional[int] = None,
+        download_dir: str = "nirvana_outputs",
+    ):
+        if max_workers <= 0:
+            raise ValueError("max_workers can't be non-positive")
+        self.client = client
+        self.endpoints = frozenset(endpoints) if endpoints else None
+        self.max_workers = int(max_workers)
+        self.inline_size_limit = inline_size_limit
+        self.download_dir = download_dir
+        self.timings: Dict[str, float] = {}
+
+    def select(self, result_params: List[dict]) -> List[dict]:
+        if self.endpoints is None:
+            return list(result_params)
+
+        selected = [param for param in result_params if param["endpoint"] in self.endpoints]
+        missing = self.endpoints - {param["endpoint"] for param in selected}
+        if missing:
+            logger.warning("Workflow has no requested output endpoints: %s", ", ".join(sorted(missing)))
+        return selected
+
+    def _download(self, result_param: dict) -> Any:
+        started = time.monotonic()
+        try:
+            if self.inline_size_limit is None:
+                return self.client.download_resource(result_param["directStoragePath"])
+            return self._stream(result_param["endpoint"], result_param["directStoragePath"])
+        finally:
+            elapsed = time.monotonic() - started
+            self.timings[result_param["endpoint"]] = elapsed
+            logger.info("Downloaded output %s in %.2fs", result_param["endpoint"], elapsed)
+
+    def _stream(self, endpoint: str, url: str) -> Any:
+        path = os.path.join(self.download_dir, _UNSAFE_FILE_NAME_RE.sub("_", endpoint))
+        size = self.client.download_resource_to_file(url, path)
+        if size > self.inline_size_limit:
+            logger.info("Output %s (%s bytes) exceeds inline size limit", endpoint, size)
+            return LargeOutput(endpoint, path, size)
+
+        try:
+            return load_output_file(path)
+        finally:
+            os.remove(path)
+
+    def fetch(self, result_params: List[dict]) -> Dict[str, Any]:
+        selected = self.select(result_params)
+        if not selected:
+            return {}
+        if self.inline_size_limit is not None:
+            os.makedirs(self.download_dir, exist_ok=True)
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(selected))) as executor:
+            downloaded = list(executor.map(self._download, selected))
+        return {param["endpoint"]: data for param, data in zip(selected, downloaded)}
@@ -0,0 +1,205 @@
+import hashlib
+import json
+import logging
+import time
+from typing import Callable, List, Optional
+
+from .nirvana_shared_state import InMemoryStateStore, JsonFileStateStore, SharedStateStore
+
+logger = logging.getLogger(__name__)
+
+RUN_SPAWNING = "spawning"
+RUN_RUNNING = "running"
+RUN_SUCCEEDED = "succeeded"
+
+DEFAULT_FRESHNESS = 24 * 3600
+# a reservation of a run being spawned expires if its spawner died
+DEFAULT_RESERVATION_TIMEOUT = 600
+
+
+def canonical_run_key(
+    template_workflow_id: str,
+    template_workflow_instance_id: Optional[str],
+    global_options: Optional[dict],
+    salt: Optional[str] = None,
+) -> str:
+    """
+    Hash of the run inputs; `global_options` values are expected to be parsed (as sent to setGlobalParameters),
+    so "1" and "1.0" or differently ordered keys give the same key. `salt` carries inputs outside of the options
+    (e.g. the commit hash).
+    """
+    payload = {
+        "template_workflow_id": template_workflow_id,
+        "template_workflow_instance_id": template_workflow_instance_id or None,
+        "global_options": {str(key).strip(): value for key, value in (global_options or {}).items()},
+        "salt": salt or None,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class NirvanaRunMemo(object):
+    """
+    Running and succeeded workflow instances by run key. A task with a matching fresh entry attaches to
+    the instance instead of starting a new one. Failed runs are forgotten, so they are recomputed.
+
+    A missing key is reserved in the same update as the lookup (see `lookup`), so concurrent tasks
+    with the same inputs do not spawn duplicate instances. Tasks attached to a running instance are
+    listed in its entry, so the task which has started it does not stop it under them; the run is then
+    left to them and the last one to detach stops it (see `release` and `detach`).
+    """
+
+    def __init__(
+        self,
+        store: SharedStateStore,
+        freshness: float = DEFAULT_FRESHNESS,
+        clock: Callable[[], float] = time.time,
+        reservation_timeout: float = DEFAULT_RESERVATION_TIMEOUT,
+    ):
+        self.store = store
+        self.freshness = freshness
+        self.clock = clock
+        self.reservation_timeout = reservation_timeout
+
+    def lookup(self, run_key: str, attach: Optional[str] = None, reserve: Optional[str] = None) -> Optional[dict]:
+        """
+        Fresh entry of the run key, None if there is none. A running instance found is attached to
+        by `attach` (e.g. the task id) in the same update.
+
+        If there is no entry and `reserve` is given, the key is reserved by it: None is returned, the caller
+        spawns the instance and calls `record_started`. While the key is reserved by another spawner,
+        the entry with RUN_SPAWNING status is returned and the caller should look it up again later.
+        """
+
+        def _lookup(state: dict) -> Optional[dict]:
+            runs = state.setdefault("memoized_runs", {})
+            entry = runs.get(run_key)
+            now = self.clock()
+            if entry is not None and entry["status"] == RUN_SPAWNING:
+                if entry["owner"] != reserve and now - entry["started_at"] < self.reservation_timeout:
+                    return dict(entry)
+                del runs[run_key]
+                entry = None
+            if entry is not None and now - (entry["finished_at"] or entry["started_at"]) >= self.freshness:
+                del runs[run_key]
+                entry = None
+            if entry is None:
+                if reserve is not None:
+                    runs[run_key] = {
+                        "workflow_id": None,
+                        "workflow_instance_id": None,
+                        "status": RUN_SPAWNING,
+                        "started_at": now,
+                        "finished_at": None,
+                        "owner": reserve,
+                        "attached": [],
+                    }
+                return None
+            attached = entry.setdefault("attached", [])
+            if attach is not None and entry["status"] == RUN_RUNNING and attach not in attached:
+                attached.append(attach)
+            return dict(entry, attached=list(attached))
+
+        return self.store.update(_lookup)
+
+    def record_started(
+        self, run_key: str, workflow_id: str, workflow_instance_id: str, owner: Optional[str] = None
+    ) -> None:
+        entry = {
+            "workflow_id": workflow_id,
+            "workflow_instance_id": workflow_instance_id,
+            "status": RUN_RUNNING,
+            "started_at": self.clock(),
+            "finished_at": None,
+            "owner": owner,
+            "attached": [],
+        }
+        self.store.update(lambda state: state.setdefault("memoized_runs", {}).__setitem__(run_key, entry))
+
+    def abandon(self, run_key: str, owner: str) -> None:
+        """
+        Drop the reservation of `owner` after it has failed to spawn the instance.
+        """
+
+        def _abandon(state: dict) -> None:
+            runs = state.setdefault("memoized_runs", {})
+            entry = runs.get(run_key)
+            if entry is not None and entry["status"] == RUN_SPAWNING and entry["owner"] == owner:
+                del runs[run_key]
+
+        self.store.update(_abandon)
+
+    def record_finished(self, run_key: str, workflow_instance_id: str, succeeded: bool) -> None:
+        def _finish(state: dict) -> None:
+            runs = state.setdefault("memoized_runs", {})
+            entry = runs.get(run_key)
+            if (
+                entry is None
+                or entry["status"] == RUN_SPAWNING
+                or entry["workflow_instance_id"] != workflow_instance_id
+            ):
+                # the key has been taken by a newer run
+                return
+            if succeeded:
+                if entry["status"] == RUN_RUNNING:
+                    entry.update(status=RUN_SUCCEEDED, finished_at=self.clock())
+            else:
+                del runs[run_key]
+
+        self.store.update(_finish)
+
+    def detach(self, run_key: str, workflow_instance_id: str, attached: str) -> bool:
+        """
+        Returns True if the running instance has been released by the task which has started it and
+        `attached` was the last task attached to it: the entry is dropped and the caller should stop the instance.
+        """
+
+        def _detach(state: dict) -> bool:
+            runs = state.setdefault("memoized_runs", {})
+            entry = runs.get(run_key)
+            if (
+                entry is None
+                or entry["status"] == RUN_SPAWNING
+                or entry["workflow_instance_id"] != workflow_instance_id
+            ):
+                return False
+            entry["attached"] = [other for other in entry.get("attached", []) if other != attached]
+            if entry["status"] == RUN_RUNNING and entry.get("released") and not entry["attached"]:
+                del runs[run_key]
+                return True
+            return False
+
+        return self.store.update(_detach)
+
+    def release(self, run_key: str, workflow_instance_id: str) -> List[str]:
+        """
+        The task which has started the running instance is about to stop it: the entry is dropped,
+        unless other tasks are attached to the instance. Returns the attached tasks; if there are any,
+        the instance is left running for them, the entry is kept and marked as released, so the last
+        attached task to detach stops the instance.
+        """
+
+        def _release(state: dict) -> List[str]:
+            runs = state.setdefault("memoized_runs", {})
+            entry = runs.get(run_key)
+            if (
+                entry is None
+                or entry["status"] == RUN_SPAWNING
+                or entry["workflow_instance_id"] != workflow_instance_id
+            ):
+                return []
+            attached = list(entry.get("attached", []))
+            if attached:
+                entry.update(owner=None, released=True)
+            else:
+                del runs[run_key]
+            return attached
+
+        return self.store.update(_release)
+
+
+def open_run_memo(path: Optional[str], **kwargs) -> NirvanaRunMemo:
+    """
+    Memo shared through the state file at `path`, or a process-local one if `path` is empty.
+    """
+    store = JsonFileStateStore(path) if path else InMemoryStateStore()
+    return NirvanaRunMemo(store, **kwargs)
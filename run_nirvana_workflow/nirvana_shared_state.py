@@ -0,0 +1,85 @@
+import fcntl
+import json
+import logging
+import os
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SharedStateStore(ABC):
+    """
+    JSON-serializable state shared by tasks running on the same host.
+    """
+
+    @abstractmethod
+    def update(self, fn: Callable[[dict], T]) -> T:
+        """Call `fn` with the state under an exclusive lock, persist its changes, return its result."""
+
+    def read(self) -> dict:
+        return self.update(lambda state: json.loads(json.dumps(state)))
+
+
+class InMemoryStateStore(SharedStateStore):
+    """
+    Process-local stand-in of JsonFileStateStore (tests, dry runs).
+    """
+
+    def __init__(self, state: dict = None):
+        self._state = state if state is not None else {}
+        self._lock = threading.Lock()
+
+    def update(self, fn: Callable[[dict], T]) -> T:
+        with self._lock:
+            return fn(self._state)
+
+
+class JsonFileStateStore(SharedStateStore):
+    """
+    State in a JSON file guarded by `flock` on a sibling lock file; replaced atomically on write.
+    A missing or corrupted file is read as an empty state.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path) as fd:
+                state = json.load(fd)
+        except FileNotFoundError:
+            return {}
+        except ValueError as exc:
+            logger.warning("Shared state %s is corrupted, starting from scratch: %s", self.path, exc)
+            return {}
+        return state if isinstance(state, dict) else {}
+
+    def _dump(self, state: dict) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as tmp:
+                json.dump(state, tmp, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def update(self, fn: Callable[[dict], T]) -> T:
+        with open(self.path + ".lock", "a") as lock_fd:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX)
+            try:
+                state = self._load()
+                before = json.dumps(state, sort_keys=True)
+                result = fn(state)
+                if json.dumps(state, sort_keys=True) != before:
+                    self._dump(state)
+                return result
+            finally:
+                fcntl.flock(lock_fd, fcntl.LOCK_UN)
@@ -0,0 +1,158 @@
+import hashlib
+import json
+import logging
+import time
+import uuid
+from typing import Callable, List, Optional, Tuple
+
+from .nirvana_shared_state import InMemoryStateStore, JsonFileStateStore, SharedStateStore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TARGET_SIZE = 2
+DEFAULT_MAX_AGE = 6 * 3600
+# a reservation of a clone in flight expires if its refiller died
+DEFAULT_RESERVATION_TIMEOUT = 600
+
+
+class NirvanaWarmPool(object):
+    """
+    Pre-cloned, not started workflow instances shared by tasks on a host.
+
+    Instances are grouped by the key of the clone request (template, quota, target workflow...),
+    so a claimed instance is identical to a fresh clone. Claims and refills are atomic updates
+    of the shared store; clones are made outside of the lock with reservations, so concurrent
+    refillers do not overfill the pool. Instances older than `max_age` are discarded.
+    """
+
+    def __init__(
+        self,
+        store: SharedStateStore,
+        target_size: int = DEFAULT_TARGET_SIZE,
+        max_age: float = DEFAULT_MAX_AGE,
+        reservation_timeout: float = DEFAULT_RESERVATION_TIMEOUT,
+        clock: Callable[[], float] = time.time,
+    ):
+        if target_size < 0:
+            raise ValueError("target_size can't be negative")
+        self.store = store
+        self.target_size = target_size
+        self.max_age = max_age
+        self.reservation_timeout = reservation_timeout
+        self.clock = clock
+
+    @staticmethod
+    def key(clone_params: dict) -> str:
+        return hashlib.sha256(json.dumps(clone_params, sort_keys=True).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _pool(state: dict, key: str) -> dict:
+        return state.setdefault("warm_pools", {}).setdefault(key, {"instances": [], "reservations": {}})
+
+    def claim(self, key: str, discard: Optional[Callable[[str], None]] = None) -> Optional[str]:
+        """
+        Take the oldest fresh instance out of the pool, None if the pool is empty.
+        Stale instances taken out on the way are passed to `discard`.
+        """
+
+        def _claim(state: dict) -> Tuple[Optional[str], List[str]]:
+            pool = self._pool(state, key)
+            now = self.clock()
+            stale = []
+            while pool["instances"]:
+                instance = pool["instances"].pop(0)
+                if now - instance["created_at"] < self.max_age:
+                    return instance["instance_id"], stale
+                stale.append(instance["instance_id"])
+            return None, stale
+
+        instance_id, stale = self.store.update(_claim)
+        logger.info("Warm pool %s: %s", key[:12], "claimed {}".format(instance_id) if instance_id else "empty")
+        if stale:
+            logger.info("Warm pool %s: removed stale instances %s", key[:12], stale)
+        self._discard(stale, discard)
+        return instance_id
+
+    @staticmethod
+    def _discard(instance_ids: List[str], discard: Optional[Callable[[str], None]]) -> None:
+        if discard is None:
+            return
+        for instance_id in instance_ids:
+            try:
+                discard(instance_id)
+            except Exception as exc:
+                logger.warning("Failed to discard stale instance %s: %s", instance_id, exc)
+
+    def size(self, key: str) -> int:
+        return len(self.store.read().get("warm_pools", {}).get(key, {}).get("instances", []))
+
+    def collect_garbage(self, key: str) -> List[str]:
+        """
+        Remove stale instances and expired reservations, return ids of removed instances.
+        """
+
+        def _collect(state: dict) -> List[str]:
+            pool = self._pool(state, key)
+            now = self.clock()
+            stale = [i["instance_id"] for i in pool["instances"] if now - i["created_at"] >= self.max_age]
+            pool["instances"] = [i for i in pool["instances"] if now - i["created_at"] < self.max_age]
+            pool["reservations"] = {
+                token: reserved_at
+                for token, reserved_at in pool["reservations"].items()
+                if now - reserved_at < self.reservation_timeout
+            }
+            return stale
+
+        stale = self.store.update(_collect)
+        if stale:
+            logger.info("Warm pool %s: removed stale instances %s", key[:12], stale)
+        return stale
+
+    def refill(
+        self,
+        key: str,
+        clone: Callable[[], str],
+        discard: Optional[Callable[[str], None]] = None,
+    ) -> List[str]:
+        """
+        Clone instances up to `target_size` (counting clones in flight of other tasks).
+        Stale instances are passed to `discard`. Returns ids of the added instances.
+        """
+        self._discard(self.collect_garbage(key), discard)
+
+        def _reserve(state: dict) -> List[str]:
+            pool = self._pool(state, key)
+            deficit = self.target_size - len(pool["instances"]) - len(pool["reservations"])
+            tokens = [uuid.uuid4().hex for _ in range(max(deficit, 0))]
+            now = self.clock()
+            pool["reservations"].update({token: now for token in tokens})
+            return tokens
+
+        added = []
+        for token in self.store.update(_reserve):
+            instance_id = None
+            try:
+                instance_id = clone()
+            except Exception as exc:
+                logger.warning("Warm pool %s: failed to clone instance: %s", key[:12], exc)
+
+            def _publish(state: dict) -> None:
+                pool = self._pool(state, key)
+                pool["reservations"].pop(token, None)
+                if instance_id:
+                    pool["instances"].append({"instance_id": instance_id, "created_at": self.clock()})
+
+            self.store.update(_publish)
+            if instance_id:
+                added.append(instance_id)
+        if added:
+            logger.info("Warm pool %s: added %s", key[:12], added)
+        return added
+
+
+def open_warm_pool(path: Optional[str], **kwargs) -> NirvanaWarmPool:
+    """
+    Pool shared through the state file at `path`, or a process-local one if `path` is empty.
+    """
+    store = JsonFileStateStore(path) if path else InMemoryStateStore()
+    return NirvanaWarmPool(store, **kwargs)
@@ -0,0 +1,97 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_MAX_DEPTH = 10
+
+
+class BlockOutputs(NamedTuple):
+    workflow_instance_id: str
+    depth: int
+    block_guid: Optional[str]
+    block_code: Optional[str]
+    block_name: Optional[str]
+    outputs: Dict[str, str]  # endpoint -> directStoragePath
+
+    def to_dict(self) -> dict:
+        return self._asdict()
+
+
+def _block_key(workflow_instance_id: str, block: dict, position: int) -> str:
+    block_id = block.get("blockGuid") or block.get("blockCode") or "#{}".format(position)
+    return "{}/{}".format(workflow_instance_id, block_id)
+
+
+class NirvanaWorkflowTraversal(object):
+    """
+    Expands the tree of nested workflows (`innerWorkflowInstanceId` of block summaries)
+    level by level. Summaries and block results of every level are requested concurrently,
+    repeated instance ids are visited once. An instance whose requests fail is left out of the index
+    (with its nested workflows) and listed in `failed_instances`.
+    """
+
+    def __init__(self, client, max_workers: int = DEFAULT_MAX_WORKERS, max_depth: int = DEFAULT_MAX_DEPTH):
+        if max_workers <= 0:
+            raise ValueError("max_workers can't be non-positive")
+        self.client = client
+        self.max_workers = int(max_workers)
+        self.max_depth = int(max_depth)
+        self.failed_instances: List[str] = []
+
+    def _fetch(self, workflow_instance_id: str) -> Tuple[List[dict], List[dict]]:
+        params = dict(workflowInstanceId=workflow_instance_id)
+        try:
+            summary = self.client.make_request("getWorkflowSummary", params) or {}
+            block_results = self.client.make_request("getBlockResults", params) or []
+        except Exception as exc:
+            logger.warning("Failed to get block outputs of workflow instance %s: %s", workflow_instance_id, exc)
+            self.failed_instances.append(workflow_instance_id)
+            return [], []
+        return summary.get("blockSummaries") or [], block_results
+
+    def build_index(self, workflow_instance_id: str) -> Dict[str, BlockOutputs]:
+        """
+        Flat index: "<workflow instance id>/<block guid|code>" -> block outputs.
+        """
+        index: Dict[str, BlockOutputs] = {}
+        visited = set()
+        level = [workflow_instance_id]
+        depth = 0
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while level:
+                if depth > self.max_depth:
+                    logger.warning("Nested workflows deeper than %s are skipped: %s", self.max_depth, level)
+                    break
+                visited.update(level)
+                next_level = []
+                for instance_id, (summaries, block_results) in zip(level, executor.map(self._fetch, level)):
+                    summaries_by_guid = {s.get("blockGuid"): s for s in summaries if s.get("blockGuid")}
+                    for position, block in enumerate(block_results):
+                        summary = summaries_by_guid.get(block.get("blockGuid"), {})
+                        index[_block_key(instance_id, block, position)] = BlockOutputs(
+                            workflow_instance_id=instance_id,
+                            depth=depth,
+                            block_guid=block.get("blockGuid"),
+                            block_code=block.get("blockCode") or summary.get("blockCode"),
+                            block_name=block.get("blockName") or summary.get("blockName"),
+                            outputs={r["endpoint"]: r.get("directStoragePath") for r in block.get("results") or []},
+                        )
+                    for summary in summaries:
+                        inner_id = summary.get("innerWorkflowInstanceId")
+                        if inner_id and inner_id not in visited and inner_id not in next_level:
+                            next_level.append(inner_id)
+                level = next_level
+                depth += 1
+        return index
+
+
+def find_outputs(index: Dict[str, BlockOutputs], endpoint: str) -> List[Tuple[str, str]]:
+    """
+    (block key, storage path) of every block having the output endpoint, outer workflows first.
+    """
+    found = [(block.depth, key, block.outputs[endpoint]) for key, block in index.items() if endpoint in block.outputs]
+    return [(key, path) for _, key, path in sorted(found, key=lambda item: item[0])]
@@ -1,19 +1,28 @@
 # coding=utf-8
 import json
 import logging
+import os
 import re
 import sys
+import tempfile
 import time
 import uuid
 import html
-
-import yaml
+from typing import Any, List, NamedTuple, Optional, Tuple
 
 from sandbox import sdk2
 from sandbox.common import errors
 from sandbox.common.types import misc as ctm
 from sdg.ci.sandbox.utils.poll_frequency_manager.poll_frequency_manager import PollFrequencyManager
 from sdg.ci.sandbox.utils.poll_frequency_manager import poll_frequency_profile
+from sdg.ci.sandbox.utils.result_snapshot.resource_types import SdcTaskResultSnapshot
+from sdg.ci.sandbox.nirvana.nirvana_result_fetcher import (
+    DEFAULT_MAX_WORKERS,
+    LargeOutput,
+    NirvanaResultFetcher,
+    load_output_file,
+    make_resource_reference,
+)
 
 import requests
 from requests.adapters import HTTPAdapter
@@ -23,6 +32,11 @@ logger = logging.getLogger(__name__)
 
 SMART_BOTS_NIRVANA_SECRET_ID = "<REDACTED>"
 PROFILE_CHOICES = tuple(poll_frequency_profile.PollProfile.names())
+CIRCUIT_BREAKER_STATE_PATH = "/var/tmp/sdc_nirvana/circuit_breaker.json"
+WARM_POOL_STATE_PATH = "/var/tmp/sdc_nirvana/warm_pool.json"
+RUN_MEMO_STATE_PATH = "/var/tmp/sdc_nirvana/run_memo.json"
+# how long to wait for another task spawning a run with the same inputs
+RUN_MEMO_RESERVATION_WAIT = 30
 
 _CI_JOB_RE = re.compile(r"(?im)^\s*CI\s*job\s*:\s*(.+?)\s*$")
 _CI_LAUNCH_RE = re.compile(r"(?im)^\s*CI\s*launch\s*:\s*(.+?)\s*$")
@@ -31,10 +45,44 @@ _A_TAG_RE = re.compile(r'(?is)<a\b[^>]*href="([^"]+)"[^>]*>(.*?)</a>')
 _BR_RE = re.compile(r"(?i)<br\s*/?>")
 
 
+def parse_global_option(value):
+    """
+    Values of `nirvana_global_options` are YAML strings, values of `nirvana_global_options_list`
+    option sets are already typed JSON and are passed as is.
+    """
+    if not isinstance(value, str):
+        return value
+    # spawn-only dependency, poll ticks do not need it
+    import yaml
+
+    return yaml.safe_load(value)
+
+
+class NirvanaBatchCallResult(NamedTuple):
+    method: str
+    result: Any = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def unwrap(self) -> Any:
+        if self.error is not None:
+            raise Exception("{} failed: {}".format(self.method, self.error))
+        return self.result
+
+
 class NirvanaClient(object):
-    def __init__(self, oauth_token):
+    def __init__(self, oauth_token, pool_maxsize=DEFAULT_MAX_WORKERS, download_cache=None, hedging=None):
+        """
+        :type download_cache: sdg.ci.sandbox.nirvana.nirvana_download_cache.NirvanaDownloadCache
+        :type hedging: sdg.ci.sandbox.nirvana.nirvana_hedging.HedgedRequestExecutor
+        """
         self.url = "https://<INTERNAL_DOMAIN>/api/public/v1/"
         self.oauth_token = oauth_token
+        self.download_cache = download_cache
+        self.hedging = hedging
         self.session = requests.Session()
         self.session.headers["Authorization"] = "OAuth {}".format(self.oauth_token)
         self.session.headers["Content-Type"] = "application/json"
@@ -42,11 +90,29 @@ class NirvanaClient(object):
             total=5,
             backoff_factor=0.3,
         )
-        adapter = HTTPAdapter(max_retries=retry)
+        # connections are reused by concurrent downloads of workflow results
+        adapter = HTTPAdapter(max_retries=retry, pool_maxsize=pool_maxsize)
         self.session.mount("http://", adapter)
         self.session.mount("https://", adapter)
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        if self.hedging is not None:
+            self.hedging.close()
+        self.session.close()
+
     def download_resource(self, url):
+        if self.download_cache is not None:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                path = os.path.join(tmp_dir, "resource")
+                self.download_resource_to_file(url, path)
+                return load_output_file(path)
+
         response = self.session.get(url)
         response.raise_for_status()
         try:
@@ -54,11 +120,55 @@ class NirvanaClient(object):
         except (json.JSONDecodeError, ValueError):
             return response.text
 
+    def get_resource_validator(self, url):
+        """
+        ETag of the stored resource (None if the storage does not provide it or HEAD fails).
+        Costs a HEAD round trip per cached download; without an ETag the cache entry is keyed
+        by the storage path alone, which relies on storage paths being immutable.
+        """
+        try:
+            response = self.session.head(url, allow_redirects=True)
+            response.raise_for_status()
+        except requests.RequestException as exc:
+            logger.warning("Failed to get validator of %s: %s", url, exc)
+            return None
+        return response.headers.get("ETag")
+
+    def download_resource_to_file(self, url, path, chunk_size=1024 * 1024):
+        """
+        Stream the resource to `path` without loading it into memory, return its size.
+        """
+        if self.download_cache is not None:
+            return self.download_cache.fetch_to_file(
+                url,
+                path,
+                lambda storage_path, dest_path: self._stream_to_file(storage_path, dest_path, chunk_size),
+                validator=self.get_resource_validator(url),
+            )
+        return self._stream_to_file(url, path, chunk_size)
+
+    def _stream_to_file(self, url, path, chunk_size):
+        size = 0
+        with self.session.get(url, stream=True) as response:
+            response.raise_for_status()
+            with open(path, "wb") as fd:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    fd.write(chunk)
+                    size += len(chunk)
+        return size
+
     def make_request(self, url, params):
+        if self.hedging is not None:
+            # only idempotent read methods are hedged, the rest are called as is;
+            # attempts are bounded as well, so a stalled one does not outlive the call
+            return self.hedging.call(url, lambda: self._post_request(url, params, timeout=self.hedging.timeout))
+        return self._post_request(url, params)
+
+    def _post_request(self, url, params, timeout=None):
         logger.debug("Making request to {}. Params: {}".format(url, params))
         request_id = str(uuid.uuid4())
         jsondata = json.dumps({"jsonrpc": "2.0", "method": url, "id": request_id, "params": params})
-        response = self.session.post(self.url + url, data=jsondata, verify=False)
+        response = self.session.post(self.url + url, data=jsondata, verify=False, timeout=timeout)
         response.raise_for_status()
         response_content = response.json()
         logger.debug("Result: {}".format(response_content))
@@ -69,6 +179,43 @@ class NirvanaClient(object):
                 raise Exception("Unknown exception")
         return response_content["result"]
 
+    def make_batch_request(self, calls: List[Tuple[str, dict]]) -> List[NirvanaBatchCallResult]:
+        """
+        Send independent calls as one JSON-RPC 2.0 batch.
+        Results are returned in the order of `calls`; errors are reported per call, not raised.
+        The server may execute batched calls in any order, so calls must not depend on each other.
+        """
+        if not calls:
+            return []
+        request_ids = [str(uuid.uuid4()) for _ in calls]
+        batch = [
+            {"jsonrpc": "2.0", "method": method, "id": request_id, "params": params}
+            for request_id, (method, params) in zip(request_ids, calls)
+        ]
+        logger.debug("Making batch request: {}".format(batch))
+        response = self.session.post(self.url, data=json.dumps(batch), verify=False)
+        response.raise_for_status()
+        response_content = response.json()
+        logger.debug("Batch result: {}".format(response_content))
+
+        if not isinstance(response_content, list):
+            error = (response_content.get("error") or {}).get("message") if isinstance(response_content, dict) else None
+            error = str(error or "Unexpected batch response: {}".format(response_content))
+            return [NirvanaBatchCallResult(method, error=error) for method, _ in calls]
+
+        responses_by_id = {item.get("id"): item for item in response_content if isinstance(item, dict)}
+        results = []
+        for request_id, (method, _) in zip(request_ids, calls):
+            item = responses_by_id.get(request_id)
+            if item is None:
+                results.append(NirvanaBatchCallResult(method, error="No response for the call"))
+            elif "result" in item:
+                results.append(NirvanaBatchCallResult(method, result=item["result"]))
+            else:
+                error = (item.get("error") or {}).get("message") or "Unknown exception"
+                results.append(NirvanaBatchCallResult(method, error=str(error)))
+        return results
+
 
 class DryRunNirvanaClient(object):
     def __init__(self, iteration):
@@ -118,6 +265,15 @@ class DryRunNirvanaClient(object):
             "addCommentToWorkflowInstance": True,
         }
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        pass
+
     def download_resource(self, url):
         if url == "dry_run_result":
             return "passed"
@@ -145,6 +301,12 @@ class DryRunNirvanaClient(object):
 
         return {}
 
+    def download_resource_to_file(self, url, path):
+        data = self.download_resource(url)
+        with open(path, "w") as fd:
+            fd.write(data if isinstance(data, str) else json.dumps(data))
+        return os.path.getsize(path)
+
     def make_request(self, url, params):
         if url in self.mock_data:
             if url == "getExecutionState" and self.iteration > 1:
@@ -153,6 +315,15 @@ class DryRunNirvanaClient(object):
         else:
             raise Exception(f"No mock data available for URL: {url}")
 
+    def make_batch_request(self, calls: List[Tuple[str, dict]]) -> List[NirvanaBatchCallResult]:
+        results = []
+        for method, params in calls:
+            try:
+                results.append(NirvanaBatchCallResult(method, result=self.make_request(method, params)))
+            except Exception as exc:
+                results.append(NirvanaBatchCallResult(method, error=str(exc)))
+        return results
+
 
 class SdcRunNirvanaWorkflow(sdk2.Task):
     class Requirements(sdk2.Task.Requirements):
@@ -180,6 +351,23 @@ class SdcRunNirvanaWorkflow(sdk2.Task):
                 default=None,
             )
             nirvana_global_options = sdk2.parameters.Dict("Nirvana workflow global options")
+            fan_out = sdk2.parameters.Bool(
+                "Fan-out: run an instance per global options set",
+                description=(
+                    "All instances are spawned and polled by this task. Progress based polling, critical blocks, "
+                    "run reuse and the block outputs index are not supported in this mode"
+                ),
+                default=False,
+            )
+            with fan_out.value[True]:
+                nirvana_global_options_list = sdk2.parameters.JSON(
+                    "Global options sets",
+                    description="List of dicts, each one is applied over nirvana_global_options",
+                    default=[],
+                )
+                fan_out_parallelism = sdk2.parameters.Integer(
+                    "Max concurrent instance spawns", default=DEFAULT_MAX_WORKERS
+                )
             existing_workflow_instance_id = sdk2.parameters.String("Existing workflow instance id", default=None)
             stop_flow_on_terminate = sdk2.parameters.Bool("Stop Nirvana workflow on task termination")
             clone_to_new_workflow = sdk2.parameters.Bool(
@@ -190,7 +378,54 @@ class SdcRunNirvanaWorkflow(sdk2.Task):
             publish_nirvana_output = sdk2.parameters.Bool(
                 "Publish nirvana workflow results as output parameters", default=False
             )
+            with publish_nirvana_output.value[True]:
+                nirvana_output_endpoints = sdk2.parameters.List(
+                    "Output endpoints to publish", description="Empty list - publish all workflow outputs"
+                )
+                download_parallelism = sdk2.parameters.Integer(
+                    "Max concurrent downloads of workflow outputs", default=DEFAULT_MAX_WORKERS
+                )
+                inline_output_size_limit = sdk2.parameters.Integer(
+                    "Max size of output published inline (bytes)",
+                    description="Bigger outputs are streamed to resources and referenced in nirvana_results. "
+                    "0 - publish everything inline",
+                    default=0,
+                )
+                download_cache_dir = sdk2.parameters.String(
+                    "Host-wide download cache directory",
+                    description="Shared by tasks on the same host. Empty - do not cache downloads",
+                    default="",
+                )
+                download_cache_max_size = sdk2.parameters.Integer("Download cache size limit (MB)", default=2048)
             process_result = sdk2.parameters.Bool("Should process result", default=False)
+            with process_result.value[True]:
+                comparison_metrics = sdk2.parameters.Dict(
+                    "Metrics to compare between baseline and competitor",
+                    description="metric -> higher|lower (which is better). Empty - do not compare",
+                )
+                comparison_key = sdk2.parameters.String("Scene id column of result tables", default="scene_id")
+                comparison_exports_dir = sdk2.parameters.String(
+                    "Directory with local exports of result tables",
+                    description=(
+                        "Tables referenced by *_exec_info are read from <dir>/<cluster>/<table>.jsonl. "
+                        "Required if comparison metrics are set"
+                    ),
+                    default="",
+                )
+                comparison_top_regressions = sdk2.parameters.Integer("Worst regressions to publish", default=20)
+                comparison_resamples = sdk2.parameters.Integer(
+                    "Resamples for confidence intervals of metric deltas",
+                    description="Bootstrap intervals and permutation p-values of mean deltas. 0 - do not compute",
+                    default=0,
+                )
+                comparison_confidence = sdk2.parameters.Integer("Confidence level of intervals (%)", default=95)
+                comparison_seed = sdk2.parameters.Integer("Random seed of resampling", default=0)
+            publish_block_outputs_index = sdk2.parameters.Bool(
+                "Publish outputs of all blocks (including nested workflows) as output parameter", default=False
+            )
+            publish_result_snapshot = sdk2.parameters.Bool(
+                "Publish binary snapshot of the result as resource (for linked tasks)", default=False
+            )
             with clone_to_new_workflow.value[True]:
                 nirvana_project_id = sdk2.parameters.String(
                     "Project id", description="Will be given to the newly cloned workflow", required=False
@@ -208,6 +443,51 @@ class SdcRunNirvanaWorkflow(sdk2.Task):
         with sdk2.parameters.Group("Config") as config_block:
             wait_workflow_end = sdk2.parameters.Bool("Wait workflow end", default=True)
             dry_run = sdk2.parameters.Bool("Dry run", default=False)
+            pipeline_spawn_requests = sdk2.parameters.Bool(
+                "Pipeline independent spawn requests (JSON-RPC batch)", default=False
+            )
+            use_warm_pool = sdk2.parameters.Bool(
+                "Claim pre-cloned workflow instances from the host warm pool",
+                description="The pool is refilled by tasks after their workflows are started",
+                default=False,
+            )
+            with use_warm_pool.value[True]:
+                warm_pool_state_path = sdk2.parameters.String(
+                    "Warm pool state file (shared by tasks on the host)", default=WARM_POOL_STATE_PATH
+                )
+                warm_pool_size = sdk2.parameters.Integer("Pre-cloned instances per template and quota", default=2)
+                warm_pool_max_age = sdk2.parameters.Integer(
+                    "Max age of pre-cloned instance (seconds)", default=6 * 3600
+                )
+            memoize_runs = sdk2.parameters.Bool(
+                "Reuse runs with the same template and global options",
+                description=(
+                    "Attach to a running or succeeded instance with the same inputs instead of starting one. "
+                    "Attached tasks share the lifetime of the task which has started the instance: "
+                    "it stops the instance on termination unless other tasks are still attached to it"
+                ),
+                default=False,
+            )
+            with memoize_runs.value[True]:
+                run_memo_state_path = sdk2.parameters.String(
+                    "Run memo state file (shared by tasks on the host)", default=RUN_MEMO_STATE_PATH
+                )
+                run_memo_freshness = sdk2.parameters.Integer("Max age of reused run (seconds)", default=24 * 3600)
+                run_memo_salt = sdk2.parameters.String(
+                    "Extra run inputs",
+                    description="E.g. the commit hash the workflow inputs are built from",
+                    default="",
+                )
+            hedge_read_requests = sdk2.parameters.Bool(
+                "Hedge slow Nirvana read requests",
+                description="Send a second attempt of slow status/results requests, the first answer wins",
+                default=False,
+            )
+            with hedge_read_requests.value[True]:
+                hedge_latency_percentile = sdk2.parameters.Integer("Latency percentile to hedge after", default=95)
+                hedge_max_share = sdk2.parameters.Integer(
+                    "Max share of hedged requests (%, 0 - never hedge)", default=10
+                )
 
         with sdk2.parameters.Group("Polling parameters") as polling_parameters_block:
             poll_duration = sdk2.parameters.Integer(
@@ -230,6 +510,35 @@ class SdcRunNirvanaWorkflow(sdk2.Task):
                 default=None,
                 choices=PROFILE_CHOICES,
             )
+            progress_based_polling = sdk2.parameters.Bool(
+                "Schedule polls by predicted completion",
+                description="Uses workflow progress; the profile is used until the completion can be predicted",
+                default=False,
+            )
+            with progress_based_polling.value[True]:
+                eta_min_poll_freq = sdk2.parameters.Integer(
+                    "Min poll frequency near predicted completion (seconds)", default=60
+                )
+                eta_max_poll_freq = sdk2.parameters.Integer(
+                    "Max poll frequency far from predicted completion (seconds)", default=3600
+                )
+            critical_blocks = sdk2.parameters.List(
+                "Critical blocks",
+                description="Names, codes or guids of blocks (shell-style patterns allowed). The workflow is stopped "
+                "and the task fails as soon as one of them fails",
+            )
+            use_circuit_breaker = sdk2.parameters.Bool(
+                "Shared circuit breaker for status requests",
+                description="Tasks on the host stop polling degraded Nirvana until a single probe request succeeds",
+                default=False,
+            )
+            with use_circuit_breaker.value[True]:
+                circuit_breaker_state_path = sdk2.parameters.String(
+                    "Circuit breaker state file (shared by tasks on the host)", default=CIRCUIT_BREAKER_STATE_PATH
+                )
+                circuit_breaker_recovery_interval = sdk2.parameters.Integer(
+                    "Poll interval while the circuit breaker is open (seconds)", default=600
+                )
 
         with sdk2.parameters.Output(reset_on_restart=True):
             completion_status = sdk2.parameters.String("Task completion status")
@@ -237,8 +546,16 @@ class SdcRunNirvanaWorkflow(sdk2.Task):
             executed_workflow_id = sdk2.parameters.String("Executed workflow id")
             executed_workflow_url = sdk2.parameters.Url("Executed workflow")
             nirvana_results = sdk2.parameters.JSON("Nirvana workflow output")
+            fan_out_instances = sdk2.parameters.JSON("Fan-out instances summary")
+            comparison_summary = sdk2.parameters.JSON("Baseline vs competitor comparison")
+            nirvana_block_outputs = sdk2.parameters.JSON("Outputs of workflow blocks (including nested workflows)")
             runtime_parameters = sdk2.parameters.Dict("Collected runtime parameters")
             executed_workflow_badge = sdk2.parameters.Dict("Executed workflow badge")
+            result_snapshot = sdk2.parameters.Resource(
+                "Result snapshot resource",
+                resource_type=SdcTaskResultSnapshot,
+                required=False,
+            )
 
     def _read_nirvana_token_from_yav(self) -> str:
         nirvana_token_with_key = self.Parameters.nirvana_token_with_key
@@ -250,7 +567,61 @@ class SdcRunNirvanaWorkflow(sdk2.Task):
         nv_token = self._read_nirvana_token_from_yav()
         if self.Parameters.dry_run:
             return DryRunNirvanaClient(self.agentr.iteration)
-        return NirvanaClient(oauth_token=nv_token)
+        return NirvanaClient(
+            oauth_token=nv_token,
+            pool_maxsize=max(self.download_parallelism, self.fan_out_parallelism),
+            download_cache=self.get_download_cache(),
+            hedging=self.get_request_hedging(),
+        )
+
+    def get_request_hedging(self):
+        if not self.Parameters.hedge_read_requests:
+            return None
+
+        from sdg.ci.sandbox.nirvana.nirvana_hedging import HedgedRequestExecutor
+
+        state = self.Context.nirvana_hedging_state
+        return HedgedRequestExecutor(
+            percentile=float(self.Parameters.hedge_latency_percentile),
+            max_hedge_ratio=int(self.Parameters.hedge_max_share) / 100.0,
+            state=state if state is not ctm.NotExists else None,
+        )
+
+    def get_circuit_breaker(self):
+        if not self.Parameters.use_circuit_breaker:
+            return None
+
+        from sdg.ci.sandbox.nirvana.nirvana_circuit_breaker import open_circuit_breaker
+
+        # dry runs must not affect real tasks on the host
+        path = None if self.Parameters.dry_run else self.Parameters.circuit_breaker_state_path
+        return open_circuit_breaker(path, recovery_interval=int(self.Parameters.circuit_breaker_recovery_interval))
+
+    def save_request_hedging_state(self, client):
+        hedging = getattr(client, "hedging", None)
+        if hedging is None:
+            return
+        self.Context.nirvana_hedging_state = hedging.to_state()
+        logger.info("Nirvana request hedging stats: %s", hedging.stats)
+
+    def get_download_cache(self):
+        cache_dir = (self.Parameters.download_cache_dir or "").strip()
+        if not self.Parameters.publish_nirvana_output or not cache_dir:
+            return None
+
+        from sdg.ci.sandbox.nirvana.nirvana_download_cache import NirvanaDownloadCache
+
+        return NirvanaDownloadCache(cache_dir, max_bytes=int(self.Parameters.download_cache_max_size) * 1024 * 1024)
+
+    @property
+    def download_parallelism(self) -> int:
+        return max(int(self.Parameters.download_parallelism or DEFAULT_MAX_WORKERS), 1)
+
+    @property
+    def fan_out_parallelism(self) -> int:
+        if not self.Parameters.fan_out:
+            return 1
+        return max(int(self.Parameters.fan_out_parallelism or DEFAULT_MAX_WORKERS), 1)
 
     @staticmethod
     def build_sandbox_task_url(task_id: int) -> str:
@@ -285,7 +656,66 @@ class SdcRunNirvanaWorkflow(sdk2.Task):
         return None
 
     def process_result(self, nirvana_results):
-        pass
+        """
+        Returns the comparison summary (None if nothing is compared); fan-out collects it per instance.
+        """
+        if self.Parameters.comparison_metrics:
+            return self.compare_results(nirvana_results)
+        return None
+
+    def compare_results(self, nirvana_results):
+        """
+        Join baseline and competitor result tables by scene and publish per-metric deltas
+        (with confidence intervals if comparison_resamples is set).
+        """
+        from sdg.ci.sandbox.utils.experiment_statistics.confidence_intervals import delta_intervals
+        from sdg.ci.sandbox.utils.experiment_statistics.table_comparison import (
+            InMemoryTableStore,
+            LocalExportStore,
+            compare_tables,
+            parse_metric_specs,
+        )
+
+        baseline = nirvana_results.get("baseline_exec_info")
+        competitor = nirvana_results.get("competitor_exec_info")
+        if not isinstance(baseline, dict) or not isinstance(competitor, dict):
+            logger.warning("Workflow results have no baseline/competitor exec info, nothing to compare")
+            return None
+
+        resamples = int(self.Parameters.comparison_resamples or 0)
+        if self.Parameters.dry_run:
+            # dry run tables do not exist, compare empty stand-ins
+            store = InMemoryTableStore({(info["cluster"], info["table"]): [] for info in (baseline, competitor)})
+        else:
+            store = LocalExportStore(self.Parameters.comparison_exports_dir)
+        try:
+            result = compare_tables(
+                store.open(baseline["cluster"], baseline["table"]),
+                store.open(competitor["cluster"], competitor["table"]),
+                parse_metric_specs(self.Parameters.comparison_metrics),
+                key=self.Parameters.comparison_key or "scene_id",
+                top_regressions=int(self.Parameters.comparison_top_regressions),
+                collect_deltas=resamples > 0,
+            )
+        except (OSError, ValueError) as exc:
+            # the workflow has succeeded, a missing or malformed export only leaves the comparison out
+            logger.warning("Failed to read result tables, comparison is skipped: %s", exc)
+            self.set_info("Baseline vs competitor comparison is skipped: {}".format(exc))
+            return None
+        summary = result.summary()
+        if resamples > 0:
+            intervals = delta_intervals(
+                result.deltas,
+                confidence=int(self.Parameters.comparison_confidence) / 100,
+                resamples=resamples,
+                seed=int(self.Parameters.comparison_seed),
+            )
+            for metric, interval in intervals.items():
+                stats = summary["metrics"][metric]
+                stats["confidence_interval"] = interval.to_dict() if interval else None
+                stats["verdict"] = interval.verdict(stats["higher_is_better"]) if interval else None
+        self.Parameters.comparison_summary = summary
+        return summary
 
     def get_metadata_values(self) -> dict[str, str]:
         params = {
@@ -302,7 +732,7 @@ class SdcRunNirvanaWorkflow(sdk2.Task):
     def on_workflow_failed(self, execution_result, completion_status):
         raise errors.TaskFailure(completion_status)
 
-    def do_spawn_stage(self):
+    def do_spawn_stage(self, client):
         if self.Parameters.executed_workflow_instance_id:
             logger.info("Workflow already executed: %s", self.Parameters.executed_workflow_url)
             return
@@ -316,59 +746,44 @@ class SdcRunNirvanaWorkflow(sdk2.Task):
         )
         logger.info("Template workflow: %s", template_workflow_url)
 
-        nirvana_workflow_name = self.Parameters.nirvana_workflow_name
-        nirvana_project_id = self.Parameters.nirvana_project_id
-        clone_to_new_workflow = self.Parameters.clone_to_new_workflow
-
         executed_workflow_instance_id = self.Parameters.existing_workflow_instance_id
         executed_workflow_id = self.Parameters.target_workflow or template_workflow_id
-        if not executed_workflow_instance_id:
-            client = self.get_nirvana_client()
-            if clone_to_new_workflow:
-                executed_workflow_instance_id = client.make_request(
-                    "cloneWorkflowInstance",
-                    dict(
-                        workflowId=template_workflow_id,
-                        workflowInstanceId=template_workflow_instance_id,
-                        newName=nirvana_workflow_name,
-                        targetWorkflowId=self.Parameters.target_workflow,
-                        newProjectCode=nirvana_project_id if nirvana_project_id else None,
-                        newQuotaProjectId=self.Parameters.nirvana_quota,
-                    ),
-                )
-            else:
-                executed_workflow_instance_id = client.make_request(
-                    "cloneWorkflowInstance",
-                    dict(
-                        workflowId=template_workflow_id,
-                        workflowInstanceId=template_workflow_instance_id,
-                        newQuotaProjectId=self.Parameters.nirvana_quota,
-                    ),
+        run_memo = self.get_run_memo() if not executed_workflow_instance_id else None
+        if run_memo is not None:
+            from sdg.ci.sandbox.nirvana.nirvana_run_memo import RUN_SPAWNING
+
+            self.Context.run_key = self.get_run_key()
+            memoized_run = run_memo.lookup(self.Context.run_key, attach=str(self.id), reserve=str(self.id))
+            if memoized_run is not None and memoized_run["status"] == RUN_SPAWNING:
+                logger.info("Run with the same inputs is being spawned by task %s, waiting", memoized_run["owner"])
+                raise sdk2.WaitTime(RUN_MEMO_RESERVATION_WAIT)
+            if memoized_run is not None:
+                executed_workflow_id = memoized_run["workflow_id"]
+                executed_workflow_instance_id = memoized_run["workflow_instance_id"]
+                self.Context.attached_to_memoized_run = True
+                self.set_info(
+                    "Attached to {} run with the same inputs: {}".format(
+                        memoized_run["status"],
+                        SdcRunNirvanaWorkflow.build_workflow_url(executed_workflow_id, executed_workflow_instance_id),
+                    )
                 )
 
-            global_options = self.Parameters.nirvana_global_options
-            if global_options:
-                client.make_request(
-                    "setGlobalParameters",
-                    dict(
-                        workflowId=executed_workflow_id,
-                        workflowInstanceId=executed_workflow_instance_id,
-                        params=[
-                            dict(parameter=key, value=yaml.safe_load(value)) for key, value in global_options.items()
-                        ],
-                    ),
+        if not executed_workflow_instance_id:
+            warm_pool = self.get_warm_pool()
+            try:
+                executed_workflow_instance_id = self.spawn_workflow_instance(
+                    client, executed_workflow_id, self.Parameters.nirvana_global_options, warm_pool=warm_pool
                 )
-
-            client.make_request(
-                "startWorkflow", dict(workflowId=executed_workflow_id, workflowInstanceId=executed_workflow_instance_id)
-            )
-
-            comment = self.build_workflow_instance_comment()
-            client.make_request(
-                "addCommentToWorkflowInstance",
-                dict(workflowInstanceId=executed_workflow_instance_id, comment=comment),
-            )
-            logger.info("Added workflow instance comment to %s", executed_workflow_instance_id)
+            except Exception:
+                if run_memo is not None:
+                    run_memo.abandon(self.Context.run_key, str(self.id))
+                raise
+            if run_memo is not None:
+                run_memo.record_started(
+                    self.Context.run_key, executed_workflow_id, executed_workflow_instance_id, owner=str(self.id)
+                )
+            if warm_pool is not None:
+                self.refill_warm_pool(client, warm_pool)
 
         exec_workflow_url = SdcRunNirvanaWorkflow.build_workflow_url(
             workflow_id=executed_workflow_id, workflow_instance_id=executed_workflow_instance_id
@@ -385,36 +800,246 @@ class SdcRunNirvanaWorkflow(sdk2.Task):
             status="SUCCESSFUL",
         )
 
+    def get_run_memo(self):
+        if not self.Parameters.memoize_runs:
+            return None
+
+        from sdg.ci.sandbox.nirvana.nirvana_run_memo import open_run_memo
+
+        # dry run instances are fake, they must not be reused by real tasks
+        path = None if self.Parameters.dry_run else self.Parameters.run_memo_state_path
+        return open_run_memo(path, freshness=int(self.Parameters.run_memo_freshness))
+
+    def get_run_key(self):
+        from sdg.ci.sandbox.nirvana.nirvana_run_memo import canonical_run_key
+
+        global_options = self.Parameters.nirvana_global_options or {}
+        return canonical_run_key(
+            self.Parameters.nirvana_workflow_id,
+            self.Parameters.nirvana_workflow_instance_id,
+            {key: parse_global_option(value) for key, value in global_options.items()},
+            salt=self.Parameters.run_memo_salt,
+        )
+
+    def record_memoized_run(self, succeeded):
+        run_key = self.Context.run_key
+        if not self.Parameters.memoize_runs or run_key is ctm.NotExists:
+            return
+        self.get_run_memo().record_finished(run_key, self.Parameters.executed_workflow_instance_id, succeeded)
+
+    def release_memoized_run(self):
+        """
+        Drop the memo entry of the run this task has started before stopping it.
+        Returns tasks attached to the run: the run is left to them and must not be stopped.
+        """
+        run_key = self.Context.run_key
+        if not self.Parameters.memoize_runs or run_key is ctm.NotExists:
+            return []
+        return self.get_run_memo().release(run_key, self.Parameters.executed_workflow_instance_id)
+
+    def detach_from_memoized_run(self):
+        """
+        Returns True if the task which has started the run has left it to the attached tasks
+        and this task was the last of them: the run must be stopped by this task.
+        """
+        run_key = self.Context.run_key
+        if not self.Parameters.memoize_runs or run_key is ctm.NotExists:
+            return False
+        return self.get_run_memo().detach(run_key, self.Parameters.executed_workflow_instance_id, str(self.id))
+
+    def get_clone_params(self):
+        template_workflow_id = self.Parameters.nirvana_workflow_id
+        template_workflow_instance_id = self.Parameters.nirvana_workflow_instance_id or None
+        nirvana_project_id = self.Parameters.nirvana_project_id
+        if self.Parameters.clone_to_new_workflow:
+            return dict(
+                workflowId=template_workflow_id,
+                workflowInstanceId=template_workflow_instance_id,
+                newName=self.Parameters.nirvana_workflow_name,
+                targetWorkflowId=self.Parameters.target_workflow,
+                newProjectCode=nirvana_project_id if nirvana_project_id else None,
+                newQuotaProjectId=self.Parameters.nirvana_quota,
+            )
+        return dict(
+            workflowId=template_workflow_id,
+            workflowInstanceId=template_workflow_instance_id,
+            newQuotaProjectId=self.Parameters.nirvana_quota,
+        )
+
+    def get_warm_pool(self):
+        if not self.Parameters.use_warm_pool:
+            return None
+
+        from sdg.ci.sandbox.nirvana.nirvana_warm_pool import open_warm_pool
+
+        # dry run clones are fake, they must not get into the shared pool
+        path = None if self.Parameters.dry_run else self.Parameters.warm_pool_state_path
+        return open_warm_pool(
+            path, target_size=int(self.Parameters.warm_pool_size), max_age=int(self.Parameters.warm_pool_max_age)
+        )
+
+    def refill_warm_pool(self, client, warm_pool):
+        """
+        Called after the workflow is started, so cloning does not delay it.
+        """
+        clone_params = self.get_clone_params()
+        try:
+            warm_pool.refill(
+                warm_pool.key(clone_params),
+                clone=lambda: client.make_request("cloneWorkflowInstance", clone_params),
+                discard=lambda instance_id: self.mark_stale_warm_pool_instance(client, instance_id),
+            )
+        except Exception as exc:
+            logger.warning("Failed to refill warm pool: %s", exc)
+
+    @staticmethod
+    def mark_stale_warm_pool_instance(client, instance_id):
+        """
+        Stale instances were never started, they are only commented, so they can be told apart from runs.
+        """
+        client.make_request(
+            "addCommentToWorkflowInstance",
+            dict(workflowInstanceId=instance_id, comment="Stale instance, removed from the warm pool"),
+        )
+
+    def spawn_workflow_instance(self, client, executed_workflow_id, global_options, comment=None, warm_pool=None):
+        """
+        Clone the template (or claim a pre-cloned instance from the warm pool), set global options,
+        start the instance and comment it. Returns the instance id.
+        """
+        clone_params = self.get_clone_params()
+        executed_workflow_instance_id = None
+        if warm_pool is not None:
+            executed_workflow_instance_id = warm_pool.claim(
+                warm_pool.key(clone_params),
+                discard=lambda instance_id: self.mark_stale_warm_pool_instance(client, instance_id),
+            )
+        if not executed_workflow_instance_id:
+            executed_workflow_instance_id = client.make_request("cloneWorkflowInstance", clone_params)
+
+        set_global_parameters_call = None
+        if global_options:
+            set_global_parameters_call = (
+                "setGlobalParameters",
+                dict(
+                    workflowId=executed_workflow_id,
+                    workflowInstanceId=executed_workflow_instance_id,
+                    params=[
+                        dict(parameter=key, value=parse_global_option(value)) for key, value in global_options.items()
+                    ],
+                ),
+            )
+        start_workflow_call = (
+            "startWorkflow",
+            dict(workflowId=executed_workflow_id, workflowInstanceId=executed_workflow_instance_id),
+        )
+        add_comment_call = (
+            "addCommentToWorkflowInstance",
+            dict(
+                workflowInstanceId=executed_workflow_instance_id,
+                comment=comment if comment is not None else self.build_workflow_instance_comment(),
+            ),
+        )
+
+        if self.Parameters.pipeline_spawn_requests:
+            # startWorkflow has to see global parameters, so only the comment is pipelined with it
+            if set_global_parameters_call:
+                client.make_request(*set_global_parameters_call)
+            for call_result in client.make_batch_request([start_workflow_call, add_comment_call]):
+                call_result.unwrap()
+        else:
+            for call in (set_global_parameters_call, start_workflow_call, add_comment_call):
+                if call:
+                    client.make_request(*call)
+        logger.info("Added workflow instance comment to %s", executed_workflow_instance_id)
+        return executed_workflow_instance_id
+
+    def do_fan_out_spawn_stage(self, client):
+        if self.Context.fan_out_instances is not ctm.NotExists:
+            logger.info("Fan-out instances already spawned")
+            return
+
+        from sdg.ci.sandbox.nirvana.nirvana_fan_out import spawn_instances
+
+        executed_workflow_id = self.Parameters.target_workflow or self.Parameters.nirvana_workflow_id
+        base_options = dict(self.Parameters.nirvana_global_options or {})
+        option_sets = [dict(base_options, **(options or {})) for options in self.Parameters.nirvana_global_options_list]
+        if not option_sets:
+            raise errors.TaskFailure("Fan-out requires non-empty nirvana_global_options_list")
+
+        # the comment is the same for all instances, read the task description once
+        comment = self.build_workflow_instance_comment()
+        warm_pool = self.get_warm_pool()
+        instances = spawn_instances(
+            option_sets,
+            lambda options: self.spawn_workflow_instance(
+                client, executed_workflow_id, options, comment=comment, warm_pool=warm_pool
+            ),
+            max_workers=self.fan_out_parallelism,
+        )
+        if warm_pool is not None:
+            self.refill_warm_pool(client, warm_pool)
+        self.Context.fan_out_instances = [instance.to_dict() for instance in instances]
+        self.Parameters.executed_workflow_id = executed_workflow_id
+        self.Parameters.executed_workflow_url = SdcRunNirvanaWorkflow.build_workflow_url(executed_workflow_id)
+
     def on_execution_tick(self):
         pass
 
+    def on_enqueue(self):
+        if self.Parameters.fan_out:
+            unsupported = [
+                name
+                for name in ("progress_based_polling", "critical_blocks", "memoize_runs", "publish_block_outputs_index")
+                if getattr(self.Parameters, name)
+            ]
+            if unsupported:
+                raise errors.TaskFailure("Not supported in fan-out mode: {}".format(", ".join(unsupported)))
+        if self.Parameters.process_result and self.Parameters.comparison_metrics:
+            self.validate_comparison_metrics()
+            if not self.Parameters.dry_run and not self.Parameters.comparison_exports_dir:
+                raise errors.TaskFailure("comparison_exports_dir is required to compare results by comparison_metrics")
+
+    def validate_comparison_metrics(self):
+        from sdg.ci.sandbox.utils.experiment_statistics.table_comparison import parse_metric_specs
+
+        try:
+            parse_metric_specs(self.Parameters.comparison_metrics)
+        except ValueError as exc:
+            raise errors.TaskFailure("Invalid comparison_metrics: {}".format(exc))
+
     def on_execute(self):
         started_at = self.Context.started_at
         if started_at is ctm.NotExists:
             self.Context.started_at = time.time()
 
-        client = self.get_nirvana_client()
+        # closing the client stops its request hedging threads, so they do not outlive the tick
+        with self.get_nirvana_client() as client:
+            self.execute_with_client(client)
+
+    def execute_with_client(self, client):
+        if self.Parameters.fan_out:
+            with self.memoize_stage.spawn_stage(commit_on_entrance=False):
+                self.do_fan_out_spawn_stage(client)
+
+            with self.memoize_stage.poll_stage(sys.maxsize):
+                self.do_fan_out_poll_stage(client)
+            return
 
         with self.memoize_stage.spawn_stage(commit_on_entrance=False):
-            self.do_spawn_stage()
+            self.do_spawn_stage(client)
 
         with self.memoize_stage.poll_stage(sys.maxsize):
             exec_workflow_url = self.Parameters.executed_workflow_url
             executed_workflow_id = self.Parameters.executed_workflow_id
             executed_workflow_instance_id = self.Parameters.executed_workflow_instance_id
             need_to_fail = False
+            critical_failure = None
+            critical_blocks = self.get_critical_blocks()
+            circuit_breaker = self.get_circuit_breaker()
+            status_client = circuit_breaker.guard(client) if circuit_breaker is not None else client
 
-            if self.Parameters.dry_run:
-                profile = poll_frequency_profile.PollProfile.DRY_RUN.value
-            else:
-                profile = poll_frequency_profile.effective_profile(
-                    name=self.Parameters.poll_freq_profile,
-                    initial_poll_freq=self.Parameters.initial_poll_freq,
-                    poll_freq=int(self.Parameters.poll_freq),
-                    transition_duration=int(self.Parameters.transition_duration),
-                    tags=self.Parameters.tags,
-                )
-
+            profile = self.get_poll_profile()
             final_poll_freq = profile.final_poll_freq
             transition_duration = profile.transition_duration
             initial_poll_freq = profile.initial_poll_freq
@@ -429,6 +1054,7 @@ class SdcRunNirvanaWorkflow(sdk2.Task):
                         execution_result = "timeout"
                         break
 
+                progress = None
                 try:
                     # https://<INTERNAL_DOMAIN>/nirvana/components/api/#getexecutionstatestatusvypolnenijaworkflow
                     get_execution_state_args = {}
@@ -436,7 +1062,18 @@ class SdcRunNirvanaWorkflow(sdk2.Task):
                         get_execution_state_args["workflowInstanceId"] = executed_workflow_instance_id
                     else:
                         get_execution_state_args["workflowId"] = executed_workflow_id
-                    progress = dict(client.make_request("getExecutionState", get_execution_state_args))
+                    if critical_blocks:
+                        progress, failed_blocks = self.check_critical_blocks(
+                            status_client, critical_blocks, get_execution_state_args
+                        )
+                        if failed_blocks:
+                            critical_failure = failed_blocks[0]
+                            self.stop_on_critical_failure(client, failed_blocks)
+                            need_to_fail = True
+                            execution_result = critical_failure.result
+                            break
+                    else:
+                        progress = dict(status_client.make_request("getExecutionState", get_execution_state_args))
                     logger.info("Workflow %s progress info: %s", exec_workflow_url, progress)
                     if progress["status"] == "completed":
                         execution_result = progress["result"]
@@ -457,11 +1094,27 @@ class SdcRunNirvanaWorkflow(sdk2.Task):
                     initial_poll_freq,
                     final_poll_freq,
                 )
+                if self.Parameters.progress_based_polling:
+                    current_poll_freq = self.calculate_eta_await_time(progress) or current_poll_freq
+                if circuit_breaker is not None:
+                    current_poll_freq = max(current_poll_freq, int(circuit_breaker.retry_after()))
 
+                self.save_request_hedging_state(client)
                 logger.debug(f"current_poll_freq: {current_poll_freq}")
                 raise sdk2.WaitTime(current_poll_freq)
 
+            self.save_request_hedging_state(client)
+            # a timed out run is not a failed one, on_workflow_timeout has already released it
+            if self.Parameters.wait_workflow_end and execution_result != "timeout":
+                self.record_memoized_run(succeeded=not need_to_fail)
             if need_to_fail:
+                if critical_failure is not None:
+                    self.Parameters.completion_status = "Critical block {} has failed (result: {}). See {}".format(
+                        critical_failure.title,
+                        critical_failure.result,
+                        exec_workflow_url,
+                    )
+                    raise errors.TaskFailure(self.Parameters.completion_status)
                 if execution_result:
                     self.Parameters.completion_status = "Workflow has been ended with status {}. See {}".format(
                         execution_result,
@@ -473,26 +1126,284 @@ class SdcRunNirvanaWorkflow(sdk2.Task):
                 self.on_workflow_failed(execution_result, self.Parameters.completion_status)
 
             if self.Parameters.publish_nirvana_output:
-                nirvana_results = {}
-                result_params = dict(
-                    client.make_request(
-                        "getWorkflowResults",
-                        dict(workflowId=executed_workflow_id, workflowInstanceId=executed_workflow_instance_id),
-                    )
-                )["results"]
-                for result_param in result_params:
-                    resource_url = result_param["directStoragePath"]
-                    resource_name = result_param["endpoint"]
-                    resource_data = client.download_resource(resource_url)
-                    nirvana_results.update({resource_name: resource_data})
+                nirvana_results, self.Context.nirvana_download_timings = self.fetch_workflow_results(
+                    client, executed_workflow_id, executed_workflow_instance_id
+                )
+                self.save_download_cache_stats(client)
 
                 self.Parameters.nirvana_results = nirvana_results
+                if self.Parameters.publish_result_snapshot:
+                    self.setup_result_snapshot(nirvana_results)
 
                 if self.Parameters.process_result:
                     self.process_result(nirvana_results)
 
                 self.Parameters.completion_status = "success"
 
+            # the workflow has succeeded and its results are published, the index is optional
+            if self.Parameters.publish_block_outputs_index and executed_workflow_instance_id:
+                self.setup_block_outputs_index(client, executed_workflow_instance_id)
+
+    def get_critical_blocks(self):
+        from sdg.ci.sandbox.nirvana.nirvana_critical_blocks import CriticalBlocks
+
+        return CriticalBlocks(self.Parameters.critical_blocks or [])
+
+    def check_critical_blocks(self, client, critical_blocks, execution_state_args):
+        """
+        Execution state and failed critical blocks by one batch of getExecutionState and getWorkflowSummary.
+        Nested workflows are not expanded: critical blocks are looked up in the top-level summary.
+        """
+        state_result, summary_result = client.make_batch_request(
+            [("getExecutionState", execution_state_args), ("getWorkflowSummary", execution_state_args)]
+        )
+        progress = dict(state_result.unwrap())
+        if not summary_result.ok:
+            logger.warning("Failed to execute GetWorkflowSummary: %s", summary_result.error)
+            return progress, []
+        return progress, critical_blocks.find_failed(summary_result.result)
+
+    def stop_on_critical_failure(self, client, failed_blocks):
+        self.Context.critical_block_failures = [failure.to_dict() for failure in failed_blocks]
+        if self.Context.attached_to_memoized_run is True:
+            logger.info("Workflow is shared with the task which has started it, not stopping it")
+            return
+        try:
+            client.make_request("stopWorkflow", dict(workflowInstanceId=self.Parameters.executed_workflow_instance_id))
+            logger.info("Workflow has been stopped after critical block failure")
+        except Exception as exc:
+            logger.warning("Failed to stop workflow after critical block failure: %s", exc)
+
+    def calculate_eta_await_time(self, progress):
+        """
+        Wait time by the completion estimate fitted over progress of previous ticks, None if unknown yet.
+        """
+        from sdg.ci.sandbox.nirvana.nirvana_progress import extract_execution_progress
+        from sdg.ci.sandbox.utils.poll_frequency_manager.completion_estimator import CompletionEstimator
+
+        samples = self.Context.completion_samples
+        estimator = CompletionEstimator(samples if samples is not ctm.NotExists else None)
+        now = time.time()
+        fraction = extract_execution_progress(progress) if progress else None
+        if fraction is not None:
+            estimator.add(now, fraction)
+            self.Context.completion_samples = estimator.to_list()
+
+        remaining_time = estimator.remaining_time(now)
+        if remaining_time is None:
+            return None
+        await_time = PollFrequencyManager.calculate_eta_await_time(
+            remaining_time,
+            min_poll_freq=max(int(self.Parameters.eta_min_poll_freq), 1),
+            max_poll_freq=max(int(self.Parameters.eta_max_poll_freq), int(self.Parameters.eta_min_poll_freq), 1),
+        )
+        logger.info(
+            "Workflow progress %s, predicted completion in %d s, next poll in %d s",
+            fraction,
+            remaining_time,
+            await_time,
+        )
+        return await_time
+
+    def get_poll_profile(self):
+        if self.Parameters.dry_run:
+            return poll_frequency_profile.PollProfile.DRY_RUN.value
+        return poll_frequency_profile.effective_profile(
+            name=self.Parameters.poll_freq_profile,
+            initial_poll_freq=self.Parameters.initial_poll_freq,
+            poll_freq=int(self.Parameters.poll_freq),
+            transition_duration=int(self.Parameters.transition_duration),
+            tags=self.Parameters.tags,
+        )
+
+    def do_fan_out_poll_stage(self, client):
+        """
+        One getExecutionState batch for all running instances per tick; the task fails
+        after all instances are finished if any of them has failed.
+        """
+        from sdg.ci.sandbox.nirvana import nirvana_fan_out
+
+        instances = [nirvana_fan_out.FanOutInstance.from_dict(item) for item in self.Context.fan_out_instances]
+        profile = self.get_poll_profile()
+        circuit_breaker = self.get_circuit_breaker()
+        status_client = circuit_breaker.guard(client) if circuit_breaker is not None else client
+
+        while self.Parameters.wait_workflow_end and not all(instance.finished for instance in instances):
+            poll_duration = int(self.Parameters.poll_duration)
+            if poll_duration > 0 and time.time() - self.Context.started_at > poll_duration:
+                self.set_info("Fan-out instances had timed out.")
+                self.cancel_workflow_instance()
+                instances = nirvana_fan_out.mark_timed_out(instances)
+                break
+
+            instances = nirvana_fan_out.sweep_execution_states(status_client, instances)
+            self.Context.fan_out_instances = [instance.to_dict() for instance in instances]
+            self.Parameters.fan_out_instances = nirvana_fan_out.summarize(instances)
+            if all(instance.finished for instance in instances):
+                break
+
+            self.on_execution_tick()
+            current_poll_freq = PollFrequencyManager.calculate_await_time(
+                time.time() - self.Context.started_at,
+                profile.transition_duration,
+                profile.initial_poll_freq,
+                profile.final_poll_freq,
+            )
+            if circuit_breaker is not None:
+                current_poll_freq = max(current_poll_freq, int(circuit_breaker.retry_after()))
+            self.save_request_hedging_state(client)
+            logger.debug(f"current_poll_freq: {current_poll_freq}")
+            raise sdk2.WaitTime(current_poll_freq)
+
+        self.save_request_hedging_state(client)
+        self.Context.fan_out_instances = [instance.to_dict() for instance in instances]
+        summary = nirvana_fan_out.summarize(instances)
+        self.Parameters.fan_out_instances = summary
+
+        if self.Parameters.publish_nirvana_output:
+            self.publish_fan_out_results(client, instances, summary)
+
+        if summary["failed"]:
+            self.Parameters.completion_status = "{} of {} fan-out instances have failed: {}".format(
+                summary["failed"],
+                summary["total"],
+                ", ".join(
+                    "#{} {} ({})".format(f["index"], f["workflow_instance_id"] or "", f["result"] or f["error"])
+                    for f in summary["failures"]
+                ),
+            )
+            raise errors.TaskFailure(self.Parameters.completion_status)
+        self.Parameters.completion_status = "success"
+
+    def publish_fan_out_results(self, client, instances, summary):
+        """
+        Results of succeeded instances, published the same way as the results of a single instance.
+        An instance whose results can not be fetched or processed is listed in the summary
+        (`result_failures`); it does not fail the task.
+        """
+        nirvana_results = []
+        download_timings = {}
+        comparison_summaries = {}
+        summary["result_failures"] = []
+        for instance in instances:
+            if not instance.succeeded:
+                continue
+            entry = {
+                "index": instance.index,
+                "workflow_instance_id": instance.workflow_instance_id,
+                "global_options": instance.global_options,
+                "results": None,
+            }
+            try:
+                entry["results"], download_timings[instance.workflow_instance_id] = self.fetch_workflow_results(
+                    client, self.Parameters.executed_workflow_id, instance.workflow_instance_id
+                )
+                if self.Parameters.process_result:
+                    comparison_summaries[str(instance.index)] = self.process_result(entry["results"])
+            except Exception as exc:
+                logger.warning("Failed to publish results of fan-out instance #%s: %s", instance.index, exc)
+                summary["result_failures"].append(
+                    {"index": instance.index, "workflow_instance_id": instance.workflow_instance_id, "error": str(exc)}
+                )
+            nirvana_results.append(entry)
+
+        self.Context.nirvana_download_timings = download_timings
+        self.save_download_cache_stats(client)
+        self.Parameters.fan_out_instances = summary
+        self.Parameters.nirvana_results = nirvana_results
+        if comparison_summaries:
+            self.Parameters.comparison_summary = comparison_summaries
+        if summary["result_failures"]:
+            self.set_info(
+                "Results of fan-out instances {} are not published".format(
+                    ", ".join("#{}".format(failure["index"]) for failure in summary["result_failures"])
+                )
+            )
+        if self.Parameters.publish_result_snapshot:
+            self.setup_result_snapshot(nirvana_results, fan_out_instances=summary)
+
+    def setup_block_outputs_index(self, client, workflow_instance_id):
+        from sdg.ci.sandbox.nirvana.nirvana_workflow_traversal import NirvanaWorkflowTraversal
+
+        traversal = NirvanaWorkflowTraversal(client, max_workers=self.download_parallelism)
+        try:
+            index = traversal.build_index(workflow_instance_id)
+        except Exception as exc:
+            logger.warning("Failed to collect block outputs of workflow %s: %s", workflow_instance_id, exc)
+            self.set_info("Block outputs index is not published: {}".format(exc))
+            return
+        if traversal.failed_instances:
+            self.set_info(
+                "Block outputs of workflow instances {} are missing from the index".format(
+                    ", ".join(traversal.failed_instances)
+                )
+            )
+        self.Parameters.nirvana_block_outputs = {key: block.to_dict() for key, block in index.items()}
+        logger.info("Collected outputs of %s blocks of workflow %s", len(index), workflow_instance_id)
+
+    def fetch_workflow_results(self, client, workflow_id, workflow_instance_id):
+        """
+        Outputs of a succeeded instance (large ones published as resources) and their download timings.
+        """
+        result_params = dict(
+            client.make_request(
+                "getWorkflowResults", dict(workflowId=workflow_id, workflowInstanceId=workflow_instance_id)
+            )
+        )["results"]
+        inline_size_limit = int(self.Parameters.inline_output_size_limit or 0)
+        fetcher = NirvanaResultFetcher(
+            client,
+            endpoints=self.Parameters.nirvana_output_endpoints,
+            max_workers=self.download_parallelism,
+            inline_size_limit=inline_size_limit if inline_size_limit > 0 else None,
+        )
+        return self.publish_large_outputs(fetcher.fetch(result_params), workflow_instance_id), fetcher.timings
+
+    def save_download_cache_stats(self, client):
+        if getattr(client, "download_cache", None) is not None:
+            self.Context.nirvana_download_cache_stats = client.download_cache.stats
+            logger.info("Download cache stats: %s", client.download_cache.stats)
+
+    def publish_large_outputs(self, nirvana_results, workflow_instance_id):
+        """
+        Replace outputs streamed to disk with references to Sandbox resources.
+        """
+        from sdg.ci.sandbox.nirvana.nirvana_resource_types import SdcNirvanaWorkflowOutput
+
+        published = {}
+        for endpoint, value in nirvana_results.items():
+            if not isinstance(value, LargeOutput):
+                published[endpoint] = value
+                continue
+            resource = SdcNirvanaWorkflowOutput(
+                self,
+                "Nirvana workflow output {}".format(endpoint),
+                value.path,
+                endpoint=endpoint,
+                workflow_instance_id=workflow_instance_id,
+            )
+            sdk2.ResourceData(resource).ready()
+            published[endpoint] = make_resource_reference(endpoint, resource.id, value.size)
+            logger.info("Output %s published as resource %s", endpoint, resource.id)
+        return published
+
+    def setup_result_snapshot(self, nirvana_results, **extra_sections):
+        from sdg.ci.sandbox.utils.result_snapshot.resource_types import publish_snapshot_resource
+
+        sections = {
+            "workflow": {
+                "workflow_id": self.Parameters.executed_workflow_id,
+                "workflow_instance_id": self.Parameters.executed_workflow_instance_id,
+                "workflow_url": self.Parameters.executed_workflow_url,
+            },
+            "nirvana_results": nirvana_results,
+        }
+        sections.update(extra_sections)
+        title = self.Parameters.executed_workflow_instance_id or self.Parameters.executed_workflow_id
+        self.Parameters.result_snapshot = publish_snapshot_resource(
+            self, sections, "Nirvana workflow {} result snapshot".format(title)
+        )
+
     def on_exception(self):
         self.Parameters.completion_status = "exception"
 
@@ -524,10 +1435,35 @@ class SdcRunNirvanaWorkflow(sdk2.Task):
         self.cancel_workflow_instance()
 
     def cancel_workflow_instance(self):
+        attached = self.Context.attached_to_memoized_run is True
+        left_to_this_task = attached and self.detach_from_memoized_run()
         if not self.Parameters.stop_flow_on_terminate:
             return
+        if self.Parameters.fan_out:
+            from sdg.ci.sandbox.nirvana.nirvana_fan_out import FanOutInstance
+
+            stored = self.Context.fan_out_instances
+            instances = [FanOutInstance.from_dict(item) for item in stored] if stored is not ctm.NotExists else []
+            running = [i.workflow_instance_id for i in instances if not i.finished and i.workflow_instance_id]
+            if running:
+                calls = [("stopWorkflow", dict(workflowInstanceId=instance_id)) for instance_id in running]
+                with self.get_nirvana_client() as client:
+                    call_results = client.make_batch_request(calls)
+                for call_result in call_results:
+                    if not call_result.ok:
+                        logger.warning("Failed to stop fan-out instance: %s", call_result.error)
+                logger.info("Fan-out workflow instances have been stopped: %s", running)
+            return
+        if attached and not left_to_this_task:
+            logger.info("Workflow is shared with the task which has started it, not stopping it")
+            return
+        attached_tasks = self.release_memoized_run()
+        if attached_tasks:
+            logger.info("Workflow is shared with attached tasks %s, not stopping it", attached_tasks)
+            return
         executed_workflow_instance_id = self.Parameters.executed_workflow_instance_id
-        self.get_nirvana_client().make_request("stopWorkflow", dict(workflowInstanceId=executed_workflow_instance_id))
+        with self.get_nirvana_client() as client:
+            client.make_request("stopWorkflow", dict(workflowInstanceId=executed_workflow_instance_id))
         logger.info("Workflow has been stopped.")
 
     @property
@@ -0,0 +1,63 @@
+import json
+
+import requests_mock
+
+from sdg.ci.sandbox.nirvana.sdc_run_nirvana_workflow import DryRunNirvanaClient, NirvanaClient
+
+
+def _reply_out_of_order(request, context):
+    calls = json.loads(request.body)
+    replies = []
+    for call in reversed(calls):
+        if call["method"] == "startWorkflow":
+            replies.append({"jsonrpc": "2.0", "id": call["id"], "error": {"message": "quota exceeded"}})
+        else:
+            replies.append({"jsonrpc": "2.0", "id": call["id"], "result": call["method"]})
+    return replies
+
+
+def test_batch_results_are_matched_by_id():
+    client = NirvanaClient(oauth_token="<REDACTED>")
+    with requests_mock.Mocker() as m:
+        m.post(client.url, json=_reply_out_of_order)
+        results = client.make_batch_request(
+            [("setGlobalParameters", {}), ("startWorkflow", {}), ("addCommentToWorkflowInstance", {})]
+        )
+
+    assert [r.method for r in results] == ["setGlobalParameters", "startWorkflow", "addCommentToWorkflowInstance"]
+    assert results[0].ok and results[0].result == "setGlobalParameters"
+    assert not results[1].ok and results[1].error == "quota exceeded"
+    assert results[2].unwrap() == "addCommentToWorkflowInstance"
+
+
+def test_batch_missing_response_is_reported():
+    client = NirvanaClient(oauth_token="<REDACTED>")
+    with requests_mock.Mocker() as m:
+        m.post(client.url, json=[])
+        results = client.make_batch_request([("startWorkflow", {})])
+
+    assert results[0].error == "No response for the call"
+
+
+def test_batch_non_list_response_fails_every_call():
+    client = NirvanaClient(oauth_token="<REDACTED>")
+    with requests_mock.Mocker() as m:
+        m.post(client.url, json={"jsonrpc": "2.0", "id": None, "error": {"message": "batch is not supported"}})
+        results = client.make_batch_request([("startWorkflow", {}), ("addCommentToWorkflowInstance", {})])
+
+    assert [r.error for r in results] == ["batch is not supported"] * 2
+
+
+def test_empty_batch_makes_no_request():
+    client = NirvanaClient(oauth_token="<REDACTED>")
+    with requests_mock.Mocker() as m:
+        assert client.make_batch_request([]) == []
+        assert not m.called
+
+
+def test_dry_run_batch():
+    client = DryRunNirvanaClient(iteration=1)
+    results = client.make_batch_request([("startWorkflow", {}), ("unknownMethod", {})])
+
+    assert results[0].unwrap() is True
+    assert "No mock data available" in results[1].error
@@ -0,0 +1,146 @@
+import pytest
+
+from sdg.ci.sandbox.nirvana.nirvana_circuit_breaker import (
+    STATE_CLOSED,
+    STATE_HALF_OPEN,
+    STATE_OPEN,
+    CircuitBreakerOpen,
+    NirvanaCircuitBreaker,
+)
+from sdg.ci.sandbox.nirvana.nirvana_shared_state import InMemoryStateStore, JsonFileStateStore
+from sdg.ci.sandbox.nirvana.sdc_run_nirvana_workflow import NirvanaBatchCallResult
+
+
+class _Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _fail():
+    raise Exception("503 Service Unavailable")
+
+
+def _breaker(store, clock, **kwargs):
+    kwargs.setdefault("failure_threshold", 3)
+    kwargs.setdefault("recovery_interval", 600)
+    kwargs.setdefault("probe_timeout", 60)
+    return NirvanaCircuitBreaker(store, clock=clock, **kwargs)
+
+
+def test_opens_after_consecutive_failures_and_is_shared():
+    store, clock = InMemoryStateStore(), _Clock()
+    breaker = _breaker(store, clock)
+    for _ in range(3):
+        with pytest.raises(Exception, match="503"):
+            breaker.call(_fail)
+
+    other_task = _breaker(store, clock)
+    assert other_task.state == STATE_OPEN
+    with pytest.raises(CircuitBreakerOpen) as exc_info:
+        other_task.call(lambda: "state")
+    assert exc_info.value.retry_after == 600
+
+
+def test_success_resets_failure_counter():
+    store, clock = InMemoryStateStore(), _Clock()
+    breaker = _breaker(store, clock)
+    for _ in range(2):
+        with pytest.raises(Exception):
+            breaker.call(_fail)
+    breaker.call(lambda: "state")
+    with pytest.raises(Exception):
+        breaker.call(_fail)
+    assert breaker.state == STATE_CLOSED
+
+
+def test_slow_calls_open_the_breaker():
+    breaker = _breaker(InMemoryStateStore(), _Clock(), slow_call_threshold=1.0)
+    for _ in range(3):
+        breaker.record_success(latency=5.0)
+    assert breaker.state == STATE_OPEN
+
+
+def test_single_probe_closes_the_breaker():
+    store, clock = InMemoryStateStore(), _Clock()
+    prober, other_task = _breaker(store, clock), _breaker(store, clock)
+    for _ in range(3):
+        prober.record_failure()
+
+    clock.now += 600
+    assert prober.allow_request()
+    assert prober.state == STATE_HALF_OPEN
+    assert not other_task.allow_request()
+    assert other_task.retry_after() == 60
+
+    prober.record_success(latency=0.1)
+    assert other_task.state == STATE_CLOSED
+    assert other_task.allow_request()
+
+
+def test_failed_probe_reopens_and_stale_probe_is_taken_over():
+    store, clock = InMemoryStateStore(), _Clock()
+    prober, other_task = _breaker(store, clock), _breaker(store, clock)
+    for _ in range(3):
+        prober.record_failure()
+
+    clock.now += 600
+    with pytest.raises(Exception):
+        prober.call(_fail)
+    assert prober.state == STATE_OPEN and prober.retry_after() == 600
+
+    clock.now += 600
+    assert prober.allow_request()
+    clock.now += 61
+    assert other_task.allow_request()
+    # a late answer of the stale probe does not change the state
+    prober.record_success(latency=0.1)
+    assert other_task.state == STATE_HALF_OPEN
+
+
+def test_guarded_client_and_file_store(tmp_path):
+    class _Client(object):
+        url = "https://nirvana"
+
+        def make_request(self, method, params):
+            raise Exception("timeout")
+
+    store, clock = JsonFileStateStore(str(tmp_path / "breaker.json")), _Clock()
+    client = _breaker(store, clock, failure_threshold=1).guard(_Client())
+    with pytest.raises(Exception, match="timeout"):
+        client.make_request("getExecutionState", {})
+    with pytest.raises(CircuitBreakerOpen):
+        client.make_request("getExecutionState", {})
+    assert client.url == "https://nirvana"
+    assert JsonFileStateStore(str(tmp_path / "breaker.json")).read()["circuit_breakers"]["nirvana"]["state"] == "open"
+
+
+def test_batch_with_every_call_failed_is_a_failure():
+    class _Client(object):
+        def __init__(self):
+            self.errors = ["503", "503"]
+
+        def make_batch_request(self, calls):
+            return [
+                NirvanaBatchCallResult(method, result=None, error=error)
+                for (method, _), error in zip(calls, self.errors)
+            ]
+
+    store, clock, backend = InMemoryStateStore(), _Clock(), _Client()
+    breaker = _breaker(store, clock, failure_threshold=2)
+    client = breaker.guard(backend)
+    calls = [("getExecutionState", {}), ("getWorkflowSummary", {})]
+
+    assert [r.error for r in client.make_batch_request(calls)] == ["503", "503"]
+    backend.errors = [None, "no summary"]
+    assert client.make_batch_request(calls)[0].ok
+    assert breaker.state == STATE_CLOSED
+
+    backend.errors = ["503", "503"]
+    client.make_batch_request(calls)
+    client.make_batch_request(calls)
+    assert breaker.state == STATE_OPEN
+    with pytest.raises(CircuitBreakerOpen):
+        client.make_batch_request(calls)
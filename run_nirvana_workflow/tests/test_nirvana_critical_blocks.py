@@ -0,0 +1,46 @@
+from sdg.ci.sandbox.nirvana.nirvana_critical_blocks import CriticalBlocks
+
+
+def _block(name, code, status, result, guid=None):
+    return {
+        "blockGuid": guid or "guid-" + name,
+        "blockCode": code,
+        "blockName": name,
+        "executionState": {"status": status, "result": result},
+    }
+
+
+SUMMARY = {
+    "blockSummaries": [
+        _block("build simulator", "build", "completed", "failure"),
+        _block("run scenes shard 1", "simulate", "completed", "failure"),
+        _block("run scenes shard 2", "simulate", "running", "undefined"),
+        _block("upload metrics", "upload", "completed", "success"),
+        _block("notify", "notify", "completed", "failure"),
+    ]
+}
+
+
+def test_patterns_match_name_code_and_guid():
+    assert [f.block_name for f in CriticalBlocks(["run scenes *"]).find_failed(SUMMARY)] == ["run scenes shard 1"]
+    assert [f.title for f in CriticalBlocks(["build"]).find_failed(SUMMARY)] == ["build simulator"]
+    assert [f.block_guid for f in CriticalBlocks(["guid-notify"]).find_failed(SUMMARY)] == ["guid-notify"]
+
+
+def test_only_completed_non_success_blocks_fail():
+    failed = CriticalBlocks(["*shard*", "upload*"]).find_failed(SUMMARY)
+
+    assert [(f.block_name, f.result) for f in failed] == [("run scenes shard 1", "failure")]
+
+
+def test_empty_patterns_and_summaries():
+    assert not CriticalBlocks(["", "  "])
+    assert CriticalBlocks([" build "]).patterns == ["build"]
+    assert CriticalBlocks(["*"]).find_failed(None) == []
+    assert CriticalBlocks(["*"]).find_failed({"blockSummaries": [{"innerWorkflowInstanceId": "id"}]}) == []
+
+
+def test_flat_block_state_is_supported():
+    summary = {"blockSummaries": [{"blockCode": "simulate", "status": "completed", "result": "cancel"}]}
+
+    assert [f.result for f in CriticalBlocks(["simulate"]).find_failed(summary)] == ["cancel"]
@@ -0,0 +1,85 @@
+import os
+
+import pytest
+
+from sdg.ci.sandbox.nirvana.nirvana_download_cache import NirvanaDownloadCache
+
+
+class _Storage(object):
+    def __init__(self):
+        self.downloads = 0
+
+    def download_to_file(self, storage_path, dest_path):
+        self.downloads += 1
+        data = (storage_path * 100).encode()
+        with open(dest_path, "wb") as fd:
+            fd.write(data)
+        return len(data)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return NirvanaDownloadCache(str(tmp_path / "cache"), max_bytes=10 * 1024)
+
+
+def test_second_download_is_served_from_cache(cache, tmp_path):
+    storage = _Storage()
+    first = cache.fetch_to_file("path/a", str(tmp_path / "a1"), storage.download_to_file, validator="etag1")
+    second = cache.fetch_to_file("path/a", str(tmp_path / "a2"), storage.download_to_file, validator="etag1")
+
+    assert first == second == 600
+    assert storage.downloads == 1
+    assert (tmp_path / "a1").read_bytes() == (tmp_path / "a2").read_bytes()
+    assert cache.stats == {"hits": 1, "misses": 1, "evictions": 0}
+
+
+def test_validator_change_invalidates_entry(cache, tmp_path):
+    storage = _Storage()
+    cache.fetch_to_file("path/a", str(tmp_path / "a1"), storage.download_to_file, validator="etag1")
+    cache.fetch_to_file("path/a", str(tmp_path / "a2"), storage.download_to_file, validator="etag2")
+
+    assert storage.downloads == 2
+    assert cache.stats["misses"] == 2
+
+
+def test_lru_eviction(tmp_path):
+    cache = NirvanaDownloadCache(str(tmp_path / "cache"), max_bytes=1500)
+    storage = _Storage()
+    for name in ("path/a", "path/b"):
+        cache.fetch_to_file(name, str(tmp_path / "out"), storage.download_to_file)
+    os.utime(cache._blob_path(cache.key("path/a")), (1, 1))  # "path/a" is the least recently used
+    cache.fetch_to_file("path/c", str(tmp_path / "out"), storage.download_to_file)
+
+    assert cache.stats["evictions"] == 1
+    assert cache.get("path/a", str(tmp_path / "out")) is None
+    assert cache.get("path/b", str(tmp_path / "out")) == 600
+
+
+def test_broken_entry_is_a_miss(cache, tmp_path):
+    storage = _Storage()
+    cache.fetch_to_file("path/a", str(tmp_path / "out"), storage.download_to_file)
+    with open(cache._blob_path(cache.key("path/a")), "ab") as fd:
+        fd.write(b"garbage")
+
+    assert cache.get("path/a", str(tmp_path / "out")) is None
+
+
+def test_corrupted_entry_is_removed(cache, tmp_path):
+    storage = _Storage()
+    cache.fetch_to_file("path/a", str(tmp_path / "out"), storage.download_to_file)
+    blob_path = cache._blob_path(cache.key("path/a"))
+    with open(blob_path, "r+b") as fd:
+        # same size, different content
+        first = fd.read(1)
+        fd.seek(0)
+        fd.write(bytes([first[0] ^ 0xFF]))
+
+    assert cache.get("path/a", str(tmp_path / "out")) is None
+    assert not os.path.exists(blob_path)
+    cache.fetch_to_file("path/a", str(tmp_path / "out"), storage.download_to_file)
+    assert cache.get("path/a", str(tmp_path / "out")) is not None
+
+
+def test_invalid_size_limit(tmp_path):
+    with pytest.raises(ValueError):
+        NirvanaDownloadCache(str(tmp_path), max_bytes=0)
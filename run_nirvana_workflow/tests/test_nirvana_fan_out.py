@@ -0,0 +1,82 @@
+import threading
+
+from sdg.ci.sandbox.nirvana import nirvana_fan_out
+from sdg.ci.sandbox.nirvana.sdc_run_nirvana_workflow import NirvanaBatchCallResult, parse_global_option
+
+
+class _SweepClient(object):
+    def __init__(self, states):
+        self.states = states
+        self.batches = []
+
+    def make_batch_request(self, calls):
+        self.batches.append(calls)
+        results = []
+        for method, params in calls:
+            state = self.states[params["workflowInstanceId"]]
+            if isinstance(state, Exception):
+                results.append(NirvanaBatchCallResult(method, error=str(state)))
+            else:
+                results.append(NirvanaBatchCallResult(method, result=state))
+        return results
+
+
+def test_spawn_instances_concurrently_and_records_failures():
+    barrier = threading.Barrier(3, timeout=5)
+
+    def spawn_one(options):
+        barrier.wait()
+        if options["variant"] == "broken":
+            raise Exception("quota exceeded")
+        return "instance-{}".format(options["variant"])
+
+    instances = nirvana_fan_out.spawn_instances(
+        [{"variant": "a"}, {"variant": "broken"}, {"variant": "b"}], spawn_one, max_workers=3
+    )
+
+    assert [i.workflow_instance_id for i in instances] == ["instance-a", None, "instance-b"]
+    assert instances[1].status == nirvana_fan_out.STATUS_SPAWN_FAILED
+    assert instances[1].error == "quota exceeded"
+    assert not instances[0].finished
+
+
+def test_sweep_requests_running_instances_in_one_batch():
+    instances = [
+        nirvana_fan_out.FanOutInstance(0, {}, "done"),
+        nirvana_fan_out.FanOutInstance(1, {}, "running"),
+        nirvana_fan_out.FanOutInstance(2, {}, "flaky"),
+        nirvana_fan_out.FanOutInstance(3, {}, status=nirvana_fan_out.STATUS_SPAWN_FAILED, error="boom"),
+    ]
+    client = _SweepClient(
+        {
+            "done": {"status": "completed", "result": "success"},
+            "running": {"status": "running", "result": "undefined"},
+            "flaky": Exception("timeout"),
+        }
+    )
+
+    instances = nirvana_fan_out.sweep_execution_states(client, instances)
+
+    assert len(client.batches) == 1
+    assert [params["workflowInstanceId"] for _, params in client.batches[0]] == ["done", "running", "flaky"]
+    assert instances[0].succeeded
+    assert not instances[1].finished and not instances[2].finished
+
+    client.states["running"] = {"status": "completed", "result": "failure"}
+    instances = nirvana_fan_out.sweep_execution_states(client, instances)
+    assert [params["workflowInstanceId"] for _, params in client.batches[1]] == ["running", "flaky"]
+
+    summary = nirvana_fan_out.summarize(nirvana_fan_out.mark_timed_out(instances))
+    assert summary["total"] == 4 and summary["succeeded"] == 1 and summary["running"] == 0
+    assert [(f["index"], f["result"]) for f in summary["failures"]] == [(1, "failure"), (2, "timeout"), (3, None)]
+
+
+def test_instance_round_trips_through_context():
+    instance = nirvana_fan_out.FanOutInstance(1, {"seed": "1"}, "instance", result="success")
+    assert nirvana_fan_out.FanOutInstance.from_dict(instance.to_dict()) == instance
+
+
+def test_typed_option_values_are_not_parsed():
+    assert parse_global_option("seed: 1") == {"seed": 1}
+    assert parse_global_option("1") == 1
+    assert [parse_global_option(value) for value in (1, True, ["a", 2], None)] == [1, True, ["a", 2], None]
@@ -0,0 +1,145 @@
+import threading
+import time
+
+import pytest
+
+from sdg.ci.sandbox.nirvana.nirvana_hedging import HedgedRequestExecutor, percentile
+
+
+class _SlowFirstCall(object):
+    def __init__(self, first_delay, other_delay=0.0):
+        self.first_delay = first_delay
+        self.other_delay = other_delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.calls += 1
+            attempt = self.calls
+        time.sleep(self.first_delay if attempt == 1 else self.other_delay)
+        return attempt
+
+
+def test_percentile():
+    assert percentile([], 95) is None
+    assert percentile([3, 1, 2], 50) == 2
+    assert percentile(range(1, 101), 95) == 95
+
+
+def test_slow_read_is_hedged_and_second_answer_wins():
+    hedging = HedgedRequestExecutor(initial_delay=0.05)
+    fn = _SlowFirstCall(first_delay=1.0)
+    try:
+        started = time.monotonic()
+        assert hedging.call("getExecutionState", fn) == 2
+        assert time.monotonic() - started < 0.5
+        assert hedging.stats["hedged"] == 1 and hedging.stats["hedge_wins"] == 1
+    finally:
+        hedging.close()
+
+
+def test_write_methods_are_never_hedged():
+    hedging = HedgedRequestExecutor(initial_delay=0.01)
+    fn = _SlowFirstCall(first_delay=0.1)
+    try:
+        assert hedging.call("startWorkflow", fn) == 1
+        assert fn.calls == 1
+        assert hedging.stats["requests"] == 0
+    finally:
+        hedging.close()
+
+
+def test_hedge_volume_is_capped():
+    hedging = HedgedRequestExecutor(initial_delay=0.01, max_hedge_ratio=0.1)
+    try:
+        for _ in range(3):
+            hedging.call("getBlockResults", _SlowFirstCall(first_delay=0.05, other_delay=0.05))
+        assert hedging.stats["requests"] == 3
+        assert hedging.stats["hedged"] == 1
+    finally:
+        hedging.close()
+
+
+def test_zero_ratio_never_hedges():
+    hedging = HedgedRequestExecutor(initial_delay=0.01, max_hedge_ratio=0.0)
+    fn = _SlowFirstCall(first_delay=0.05)
+    try:
+        assert hedging.call("getExecutionState", fn) == 1
+        assert fn.calls == 1
+        assert hedging.stats["hedged"] == 0
+    finally:
+        hedging.close()
+
+
+def test_failed_attempt_falls_back_to_hedge():
+    attempts = []
+
+    def fn():
+        attempts.append(1)
+        if len(attempts) == 1:
+            time.sleep(0.1)
+            raise Exception("node is down")
+        return "ok"
+
+    hedging = HedgedRequestExecutor(initial_delay=0.01)
+    try:
+        assert hedging.call("getWorkflowResults", fn) == "ok"
+    finally:
+        hedging.close()
+
+
+def test_errors_are_raised_when_every_attempt_fails():
+    def fn():
+        raise Exception("boom")
+
+    hedging = HedgedRequestExecutor()
+    try:
+        with pytest.raises(Exception, match="boom"):
+            hedging.call("getWorkflowSummary", fn)
+    finally:
+        hedging.close()
+
+
+def test_delay_follows_percentile_and_state_round_trips():
+    hedging = HedgedRequestExecutor(percentile=90, min_samples=10, initial_delay=5.0)
+    try:
+        assert hedging.delay() == 5.0
+        for _ in range(10):
+            hedging.call("getExecutionState", lambda: None)
+        assert hedging.delay() < 1.0
+        restored = HedgedRequestExecutor(state=hedging.to_state())
+        assert restored.to_state() == hedging.to_state()
+        restored.close()
+    finally:
+        hedging.close()
+
+
+def test_call_is_bounded_by_timeout():
+    hedging = HedgedRequestExecutor(initial_delay=0.01, max_hedge_ratio=0.0, timeout=0.2)
+    fn = _SlowFirstCall(first_delay=2.0, other_delay=2.0)
+    try:
+        started = time.monotonic()
+        with pytest.raises(TimeoutError):
+            hedging.call("getExecutionState", fn)
+        assert time.monotonic() - started < 1.0
+    finally:
+        hedging.close()
+
+
+def test_close_cancels_queued_attempts():
+    started = threading.Event()
+    release = threading.Event()
+
+    def blocked():
+        started.set()
+        release.wait(5)
+
+    with HedgedRequestExecutor(max_workers=1) as hedging:
+        running = hedging._submit(blocked)
+        queued = hedging._submit(blocked)
+        assert started.wait(5)
+    release.set()
+
+    assert queued.cancelled()
+    running.result(timeout=5)
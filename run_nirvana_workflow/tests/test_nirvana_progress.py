@@ -0,0 +1,19 @@
+import pytest
+
+from sdg.ci.sandbox.nirvana.nirvana_progress import extract_execution_progress
+
+
+@pytest.mark.parametrize(
+    "payload, expected",
+    [
+        ({"status": "running", "progress": 0.25}, 0.25),
+        ({"status": "running", "progress": 40}, 0.4),
+        ({"status": "running", "completedBlocks": 3, "totalBlocks": 12}, 0.25),
+        ({"status": "running", "completedBlocksCount": 5, "blocksCount": 5}, 1.0),
+        ({"status": "running", "completedBlocks": 3, "totalBlocks": 0}, None),
+        ({"status": "running", "progress": True}, None),
+        ({"status": "waiting"}, None),
+    ],
+)
+def test_extract_execution_progress(payload, expected):
+    assert extract_execution_progress(payload) == expected
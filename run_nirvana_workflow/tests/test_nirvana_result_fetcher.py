@@ -0,0 +1,97 @@
+import threading
+import time
+
+import pytest
+
+from sdg.ci.sandbox.nirvana.nirvana_result_fetcher import (
+    LargeOutput,
+    NirvanaResultFetcher,
+    is_resource_reference,
+    make_resource_reference,
+)
+from sdg.ci.sandbox.nirvana.sdc_run_nirvana_workflow import DryRunNirvanaClient
+
+
+def _result_params():
+    return DryRunNirvanaClient(iteration=1).make_request("getWorkflowResults", {})["results"]
+
+
+def test_fetch_all_endpoints():
+    results = NirvanaResultFetcher(DryRunNirvanaClient(iteration=1)).fetch(_result_params())
+
+    assert set(results) == {"experiment_url", "baseline_exec_info", "result", "competitor_exec_info", "dashboard_link"}
+    assert results["result"] == "passed"
+
+
+def test_fetch_selected_endpoints_only():
+    fetcher = NirvanaResultFetcher(DryRunNirvanaClient(iteration=1), endpoints=["result", "experiment_url", "missing"])
+    results = fetcher.fetch(_result_params())
+
+    assert set(results) == {"result", "experiment_url"}
+    assert set(fetcher.timings) == {"result", "experiment_url"}
+
+
+class _SlowClient(object):
+    def __init__(self, delay):
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def download_resource(self, url):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        return url
+
+
+def test_downloads_are_concurrent_and_bounded():
+    client = _SlowClient(delay=0.05)
+    params = [{"endpoint": f"e{i}", "directStoragePath": f"p{i}"} for i in range(8)]
+
+    results = NirvanaResultFetcher(client, max_workers=3).fetch(params)
+
+    assert results == {f"e{i}": f"p{i}" for i in range(8)}
+    assert client.max_active == 3
+
+
+def test_download_error_is_raised():
+    class _FailingClient(object):
+        def download_resource(self, url):
+            raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        NirvanaResultFetcher(_FailingClient()).fetch([{"endpoint": "e", "directStoragePath": "p"}])
+
+
+def test_invalid_max_workers():
+    with pytest.raises(ValueError):
+        NirvanaResultFetcher(DryRunNirvanaClient(iteration=1), max_workers=0)
+
+
+def test_streaming_keeps_small_outputs_inline(tmp_path):
+    fetcher = NirvanaResultFetcher(
+        DryRunNirvanaClient(iteration=1),
+        endpoints=["result", "baseline_exec_info"],
+        inline_size_limit=20,
+        download_dir=str(tmp_path),
+    )
+    results = fetcher.fetch(_result_params())
+
+    assert results["result"] == "passed"
+    large = results["baseline_exec_info"]
+    assert isinstance(large, LargeOutput)
+    assert large.size > 20
+    with open(large.path) as fd:
+        assert "dry-run-cluster" in fd.read()
+    assert [p.name for p in tmp_path.iterdir()] == ["baseline_exec_info"]
+
+
+def test_resource_reference():
+    ref = make_resource_reference("result", 42, 1024)
+    assert is_resource_reference(ref)
+    assert not is_resource_reference({"resource_id": 42})
+    assert not is_resource_reference("passed")
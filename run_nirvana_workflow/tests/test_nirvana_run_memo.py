@@ -0,0 +1,120 @@
+from sdg.ci.sandbox.nirvana.nirvana_run_memo import (
+    RUN_RUNNING,
+    RUN_SPAWNING,
+    RUN_SUCCEEDED,
+    NirvanaRunMemo,
+    canonical_run_key,
+)
+from sdg.ci.sandbox.nirvana.nirvana_shared_state import InMemoryStateStore, JsonFileStateStore
+
+
+class _Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_run_key_is_canonical():
+    key = canonical_run_key("template", None, {"seed": 1, "scenes": ["a", "b"]}, salt="deadbeef")
+    assert key == canonical_run_key("template", "", {" scenes": ["a", "b"], "seed": 1}, salt="deadbeef")
+    assert key != canonical_run_key("template", None, {"seed": 2, "scenes": ["a", "b"]}, salt="deadbeef")
+    assert key != canonical_run_key("template", None, {"seed": 1, "scenes": ["a", "b"]}, salt="cafebabe")
+    assert key != canonical_run_key("template", "instance", {"seed": 1, "scenes": ["a", "b"]}, salt="deadbeef")
+
+
+def test_running_and_succeeded_runs_are_reused(tmp_path):
+    clock = _Clock()
+    memo = NirvanaRunMemo(JsonFileStateStore(str(tmp_path / "memo.json")), freshness=3600, clock=clock)
+    assert memo.lookup("key") is None
+
+    memo.record_started("key", "workflow", "instance")
+    other_task = NirvanaRunMemo(JsonFileStateStore(str(tmp_path / "memo.json")), freshness=3600, clock=clock)
+    assert other_task.lookup("key")["status"] == RUN_RUNNING
+
+    clock.now += 3000
+    memo.record_finished("key", "instance", succeeded=True)
+    entry = other_task.lookup("key")
+    assert entry["status"] == RUN_SUCCEEDED and entry["workflow_instance_id"] == "instance"
+
+    # an attached task finishing later does not extend freshness
+    clock.now += 3000
+    other_task.record_finished("key", "instance", succeeded=True)
+    clock.now += 601
+    assert memo.lookup("key") is None
+
+
+def test_failed_runs_are_forgotten():
+    memo = NirvanaRunMemo(InMemoryStateStore())
+    memo.record_started("key", "workflow", "instance")
+    memo.record_finished("key", "instance", succeeded=False)
+    assert memo.lookup("key") is None
+
+
+def test_result_of_replaced_run_is_ignored():
+    memo = NirvanaRunMemo(InMemoryStateStore())
+    memo.record_started("key", "workflow", "old")
+    memo.record_started("key", "workflow", "new")
+    memo.record_finished("key", "old", succeeded=False)
+    assert memo.lookup("key")["workflow_instance_id"] == "new"
+
+
+def test_run_with_attached_tasks_is_not_released():
+    memo = NirvanaRunMemo(InMemoryStateStore())
+    memo.record_started("key", "workflow", "instance")
+    assert memo.lookup("key", attach="task-2")["attached"] == ["task-2"]
+    assert memo.lookup("key", attach="task-2")["attached"] == ["task-2"]
+
+    assert memo.release("key", "instance") == ["task-2"]
+    assert memo.lookup("key")["workflow_instance_id"] == "instance"
+
+    memo.detach("key", "instance", "task-2")
+    assert memo.release("key", "instance") == []
+    assert memo.lookup("key") is None
+
+
+def test_last_attached_task_stops_released_run():
+    memo = NirvanaRunMemo(InMemoryStateStore())
+    memo.record_started("key", "workflow", "instance", owner="task-1")
+    memo.lookup("key", attach="task-2")
+    memo.lookup("key", attach="task-3")
+    assert memo.detach("key", "instance", "task-2") is False
+
+    assert memo.release("key", "instance") == ["task-3"]
+    assert memo.lookup("key")["owner"] is None
+    assert memo.detach("key", "instance", "task-3") is True
+    assert memo.lookup("key") is None
+
+
+def test_missing_key_is_reserved_by_lookup():
+    clock = _Clock()
+    memo = NirvanaRunMemo(InMemoryStateStore(), clock=clock, reservation_timeout=600)
+    assert memo.lookup("key", attach="task-1", reserve="task-1") is None
+    entry = memo.lookup("key", attach="task-2", reserve="task-2")
+    assert entry["status"] == RUN_SPAWNING and entry["owner"] == "task-1"
+    # the spawner re-entering its stage keeps the reservation
+    assert memo.lookup("key", attach="task-1", reserve="task-1") is None
+    assert memo.release("key", None) == []
+
+    memo.record_started("key", "workflow", "instance", owner="task-1")
+    assert memo.lookup("key", attach="task-2", reserve="task-2")["attached"] == ["task-2"]
+
+
+def test_reservation_is_abandoned_or_expires():
+    clock = _Clock()
+    memo = NirvanaRunMemo(InMemoryStateStore(), clock=clock, reservation_timeout=600)
+    assert memo.lookup("key", reserve="task-1") is None
+    memo.abandon("key", "task-1")
+    assert memo.lookup("key", reserve="task-2") is None
+
+    clock.now += 601
+    assert memo.lookup("key", reserve="task-3") is None
+    assert memo.lookup("key", reserve="task-2")["owner"] == "task-3"
+
+
+def test_succeeded_runs_are_not_attached_to():
+    memo = NirvanaRunMemo(InMemoryStateStore())
+    memo.record_started("key", "workflow", "instance")
+    memo.record_finished("key", "instance", succeeded=True)
+    assert memo.lookup("key", attach="task-2")["attached"] == []
@@ -0,0 +1,36 @@
+import multiprocessing
+
+from sdg.ci.sandbox.nirvana.nirvana_shared_state import InMemoryStateStore, JsonFileStateStore
+
+
+def _increment(path, times):
+    store = JsonFileStateStore(path)
+    for _ in range(times):
+        store.update(lambda state: state.__setitem__("counter", state.get("counter", 0) + 1))
+
+
+def test_file_store_updates_are_atomic_across_processes(tmp_path):
+    path = str(tmp_path / "state" / "shared.json")
+    processes = [multiprocessing.Process(target=_increment, args=(path, 50)) for _ in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    assert JsonFileStateStore(path).read() == {"counter": 200}
+
+
+def test_file_store_survives_corrupted_file(tmp_path):
+    path = tmp_path / "shared.json"
+    path.write_text("{not json")
+    store = JsonFileStateStore(str(path))
+
+    assert store.read() == {}
+    assert store.update(lambda state: state.setdefault("key", "value")) == "value"
+    assert JsonFileStateStore(str(path)).read() == {"key": "value"}
+
+
+def test_read_returns_a_copy():
+    store = InMemoryStateStore({"items": [1]})
+    store.read()["items"].append(2)
+    assert store.read() == {"items": [1]}
@@ -0,0 +1,86 @@
+import itertools
+
+from sdg.ci.sandbox.nirvana.nirvana_shared_state import InMemoryStateStore, JsonFileStateStore
+from sdg.ci.sandbox.nirvana.nirvana_warm_pool import NirvanaWarmPool
+
+CLONE_PARAMS = {"workflowId": "template", "workflowInstanceId": None, "newQuotaProjectId": "default"}
+
+
+class _Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _cloner(prefix="clone"):
+    counter = itertools.count()
+    return lambda: "{}-{}".format(prefix, next(counter))
+
+
+def test_key_depends_on_clone_params_only():
+    assert NirvanaWarmPool.key(dict(CLONE_PARAMS)) == NirvanaWarmPool.key(dict(reversed(list(CLONE_PARAMS.items()))))
+    assert NirvanaWarmPool.key(CLONE_PARAMS) != NirvanaWarmPool.key(dict(CLONE_PARAMS, newQuotaProjectId="other"))
+
+
+def test_refill_and_claim_in_fifo_order(tmp_path):
+    pool = NirvanaWarmPool(JsonFileStateStore(str(tmp_path / "pool.json")), target_size=2)
+    key = pool.key(CLONE_PARAMS)
+
+    assert pool.claim(key) is None
+    assert pool.refill(key, _cloner()) == ["clone-0", "clone-1"]
+    assert pool.refill(key, _cloner("extra")) == []
+
+    other_task = NirvanaWarmPool(JsonFileStateStore(str(tmp_path / "pool.json")), target_size=2)
+    assert other_task.claim(key) == "clone-0"
+    assert pool.claim(key) == "clone-1"
+    assert pool.claim(key) is None
+
+
+def test_reservations_prevent_overfill():
+    store = InMemoryStateStore()
+    pool = NirvanaWarmPool(store, target_size=2)
+    key = pool.key(CLONE_PARAMS)
+    nested = []
+
+    def slow_clone():
+        # another task refills while this clone is in flight
+        if not nested:
+            nested.append(pool.refill(key, _cloner("nested")))
+        return "outer"
+
+    added = pool.refill(key, slow_clone)
+    assert nested == [[]]
+    assert added == ["outer", "outer"]
+    assert pool.size(key) == 2
+
+
+def test_failed_clone_releases_reservation():
+    pool = NirvanaWarmPool(InMemoryStateStore(), target_size=1)
+    key = pool.key(CLONE_PARAMS)
+
+    def broken_clone():
+        raise Exception("quota exceeded")
+
+    assert pool.refill(key, broken_clone) == []
+    assert pool.refill(key, _cloner()) == ["clone-0"]
+
+
+def test_stale_instances_are_discarded():
+    clock = _Clock()
+    pool = NirvanaWarmPool(InMemoryStateStore(), target_size=1, max_age=3600, clock=clock)
+    key = pool.key(CLONE_PARAMS)
+    pool.refill(key, _cloner("old"))
+
+    clock.now += 3600
+    discarded = []
+    assert pool.claim(key, discard=discarded.append) is None
+    assert discarded == ["old-0"]
+
+    pool.refill(key, _cloner("old"))
+    clock.now += 3600
+    discarded = []
+    assert pool.refill(key, _cloner("new"), discard=discarded.append) == ["new-0"]
+    assert discarded == ["old-0"]
+    assert pool.claim(key) == "new-0"
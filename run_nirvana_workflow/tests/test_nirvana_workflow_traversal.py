@@ -0,0 +1,84 @@
+import threading
+
+from sdg.ci.sandbox.nirvana.nirvana_workflow_traversal import NirvanaWorkflowTraversal, find_outputs
+from sdg.ci.sandbox.nirvana.sdc_run_nirvana_workflow import DryRunNirvanaClient
+
+
+class _TreeClient(object):
+    """root -> (inner-a, inner-b), inner-a -> inner-b (repeated), inner-b -> leaf"""
+
+    TREE = {"root": ["inner-a", "inner-b"], "inner-a": ["inner-b"], "inner-b": ["leaf"], "leaf": []}
+
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def make_request(self, method, params):
+        instance_id = params["workflowInstanceId"]
+        with self._lock:
+            self.calls.append((method, instance_id))
+        if method == "getWorkflowSummary":
+            return {
+                "blockSummaries": [
+                    {
+                        "blockGuid": f"{instance_id}-sub-{inner}",
+                        "blockCode": "subworkflow",
+                        "innerWorkflowInstanceId": inner,
+                    }
+                    for inner in self.TREE[instance_id]
+                ]
+                + [{"blockGuid": f"{instance_id}-op", "blockCode": "operation", "blockName": f"op {instance_id}"}]
+            }
+        return [
+            {
+                "blockGuid": f"{instance_id}-op",
+                "results": [{"endpoint": "link", "directStoragePath": f"{instance_id}/link"}],
+            }
+        ]
+
+
+def test_nested_workflows_are_expanded_once():
+    client = _TreeClient()
+    index = NirvanaWorkflowTraversal(client).build_index("root")
+
+    assert set(index) == {"root/root-op", "inner-a/inner-a-op", "inner-b/inner-b-op", "leaf/leaf-op"}
+    assert sorted(client.calls) == sorted(
+        (m, i) for i in client.TREE for m in ("getWorkflowSummary", "getBlockResults")
+    )
+    assert index["leaf/leaf-op"].depth == 2
+    assert index["root/root-op"].block_name == "op root"
+    assert index["root/root-op"].block_code == "operation"
+
+
+def test_find_outputs_outer_first():
+    index = NirvanaWorkflowTraversal(_TreeClient()).build_index("root")
+    found = find_outputs(index, "link")
+
+    assert found[0] == ("root/root-op", "root/link")
+    assert found[-1] == ("leaf/leaf-op", "leaf/link")
+    assert find_outputs(index, "missing") == []
+
+
+def test_max_depth():
+    index = NirvanaWorkflowTraversal(_TreeClient(), max_depth=0).build_index("root")
+    assert set(index) == {"root/root-op"}
+
+
+def test_dry_run_self_reference_terminates():
+    index = NirvanaWorkflowTraversal(DryRunNirvanaClient(iteration=1)).build_index("dry_run_instance_id")
+
+    assert find_outputs(index, "link") == [("dry_run_instance_id/#0", "dry_run_ov_link")]
+
+
+def test_failing_instance_is_skipped():
+    class _FlakyClient(_TreeClient):
+        def make_request(self, method, params):
+            if params["workflowInstanceId"] == "inner-b" and method == "getBlockResults":
+                raise Exception("503 Service Unavailable")
+            return super().make_request(method, params)
+
+    traversal = NirvanaWorkflowTraversal(_FlakyClient())
+    index = traversal.build_index("root")
+
+    assert set(index) == {"root/root-op", "inner-a/inner-a-op"}
+    assert traversal.failed_instances == ["inner-b"]
@@ -1,5 +1,8 @@
+import hashlib
+import uuid
 from abc import ABC, abstractmethod
-from typing import Any, Optional, Union
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Sequence, Union
 
 from infra.utils.network.url_util import urljoin
 
@@ -10,6 +13,8 @@ OV_STATUS_OUTDATED = "outdated"
 OV_STATUS_WRONG = "wrong"
 OV_STATUS_FAILED = "failed"
 
+OV_DEFAULT_MAX_WORKERS = 8
+
 OV_DEFAULT_HOST_URL = "https://<INTERNAL_DOMAIN>/rest/offline_viewer"
 
 
@@ -18,6 +23,50 @@ def make_ui_link_prefix(rest_url: str) -> str:
     return rest_url.replace("/rest/offline_viewer", "/offline-viewer")
 
 
+class ExperimentProgress(NamedTuple):
+    """
+    Status and scene counters summed over the runs of an experiment.
+    """
+
+    status: Optional[str]
+    runs: int = 0
+    scenes_total: int = 0
+    scenes_simulated: int = 0
+    scenes_failure: int = 0
+    scenes_dropped: int = 0
+
+    @classmethod
+    def from_experiment(cls, experiment: Mapping[str, Any]) -> "ExperimentProgress":
+        runs = experiment.get("metrics_runs") or []
+        return cls(
+            status=experiment.get("status"),
+            runs=len(runs),
+            **{
+                counter: sum(int(run.get(counter) or 0) for run in runs)
+                for counter in ("scenes_total", "scenes_simulated", "scenes_failure", "scenes_dropped")
+            },
+        )
+
+    @property
+    def scenes_done(self) -> int:
+        return self.scenes_simulated + self.scenes_failure + self.scenes_dropped
+
+    @property
+    def fraction(self) -> Optional[float]:
+        """Share of finished scenes, None while runs have not reported their totals."""
+        if self.scenes_total <= 0:
+            return None
+        return min(self.scenes_done / self.scenes_total, 1.0)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self._asdict(), fraction=self.fraction)
+
+
+def make_idempotency_key(prefix: str, *parts: Any) -> str:
+    """Key of one object of a bulk registration; the same prefix and parts give the same key."""
+    return hashlib.sha256("/".join(str(part) for part in (prefix,) + parts).encode("utf-8")).hexdigest()
+
+
 class BaseOfflineViewerClient(ABC):
     """
     A common interface for Offline Viewer clients (real and dry-run).
@@ -25,6 +74,11 @@ class BaseOfflineViewerClient(ABC):
 
     EXPERIMENT_PATHNAME = "metrics_experiment"
     RUN_PATHNAME = "metrics_run"
+    EXPERIMENT_STATUS_FIELDS = ("id", "status")
+    EXPERIMENT_PROGRESS_FIELDS = EXPERIMENT_STATUS_FIELDS + tuple(
+        f"metrics_runs.{field}"
+        for field in ("id", "scenes_total", "scenes_simulated", "scenes_failure", "scenes_dropped")
+    )
 
     @abstractmethod
     def create_experiment(
@@ -48,6 +102,75 @@ class BaseOfflineViewerClient(ABC):
     ) -> Any:
         raise NotImplementedError
 
+    def _create_experiment_once(self, idempotency_key: str, **experiment: Any) -> Any:
+        """
+        create_experiment which is not repeated for the same key. Clients which can't
+        pass the key to the server create the experiment as is.
+        """
+        return self.create_experiment(**experiment)
+
+    def _create_run_once(self, idempotency_key: str, **run: Any) -> Any:
+        """
+        create_run which is not repeated for the same key (see _create_experiment_once).
+        """
+        return self.create_run(**run)
+
+    def _create_experiment_with_runs_bulk(
+        self, idempotency_key: str, experiment: Mapping[str, Any], runs: Sequence[Mapping[str, Any]]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Experiment and its runs in one request: {"experiment": ..., "runs": [...]},
+        None if the server does not support it.
+        """
+        return None
+
+    def create_runs(
+        self,
+        experiment_id: Union[int, str],
+        runs: Sequence[Mapping[str, Any]],
+        max_workers: int = OV_DEFAULT_MAX_WORKERS,
+        idempotency_prefix: Optional[str] = None,
+    ) -> List[Any]:
+        """
+        Register runs (dicts of create_run arguments) concurrently, results are in the order of `runs`.
+        Every run is sent with its own idempotency key, so retried requests do not create duplicates;
+        after a failure the call can be repeated with the same `idempotency_prefix`.
+        """
+        runs = list(runs)
+        if not runs:
+            return []
+        prefix = idempotency_prefix or uuid.uuid4().hex
+
+        def _create(index: int) -> Any:
+            key = make_idempotency_key(prefix, "run", experiment_id, index)
+            return self._create_run_once(key, **dict(runs[index], experiment_id=experiment_id))
+
+        with ThreadPoolExecutor(max_workers=max(min(max_workers, len(runs)), 1)) as executor:
+            return list(executor.map(_create, range(len(runs))))
+
+    def create_experiment_with_runs(
+        self,
+        runs: Sequence[Mapping[str, Any]],
+        max_workers: int = OV_DEFAULT_MAX_WORKERS,
+        idempotency_prefix: Optional[str] = None,
+        **experiment: Any,
+    ) -> Dict[str, Any]:
+        """
+        Register an experiment (create_experiment arguments) with its runs:
+        in one request if the server supports it, otherwise the runs are created by create_runs.
+        Returns {"experiment": ..., "runs": [...]}.
+        """
+        prefix = idempotency_prefix or uuid.uuid4().hex
+        runs = list(runs)
+        created = self._create_experiment_with_runs_bulk(make_idempotency_key(prefix, "bulk"), experiment, runs)
+        if created is not None:
+            return created
+        exp = self._create_experiment_once(make_idempotency_key(prefix, "experiment"), **experiment)
+        return {
+            "experiment": exp,
+            "runs": self.create_runs(exp["id"], runs, max_workers=max_workers, idempotency_prefix=prefix),
+        }
+
     @abstractmethod
     def update_run(
         self,
@@ -70,6 +193,40 @@ class BaseOfflineViewerClient(ABC):
     def get_experiment(self, exp_id: Union[int, str]) -> Any:
         raise NotImplementedError
 
+    def get_experiment_status(self, exp_id: Union[int, str]) -> Optional[str]:
+        """
+        Status of the experiment without its runs (cheap enough for polling).
+        Clients without a lightweight request fall back to the full experiment.
+        """
+        return self.get_experiment(exp_id).get("status")
+
+    def get_experiment_progress(self, exp_id: Union[int, str]) -> ExperimentProgress:
+        """
+        Status and scene counters of the experiment runs, without the rest of the runs.
+        Clients without a lightweight request fall back to the full experiment.
+        """
+        return ExperimentProgress.from_experiment(self.get_experiment(exp_id))
+
+    def get_experiments_statuses(
+        self, exp_ids: Sequence[Union[int, str]], max_workers: int = OV_DEFAULT_MAX_WORKERS
+    ) -> Dict[Union[int, str], Union[Optional[str], Exception]]:
+        """
+        Statuses of several experiments requested concurrently:
+        exp_id -> status, or the exception if the request has failed.
+        """
+        exp_ids = list(exp_ids)
+        if not exp_ids:
+            return {}
+
+        def _status(exp_id: Union[int, str]) -> Union[Optional[str], Exception]:
+            try:
+                return self.get_experiment_status(exp_id)
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=max(min(max_workers, len(exp_ids)), 1)) as executor:
+            return dict(zip(exp_ids, executor.map(_status, exp_ids)))
+
     @abstractmethod
     def ui_link_prefix(self) -> str:
         """
@@ -0,0 +1,60 @@
+import logging
+from typing import Dict, Iterable, Optional
+
+from infra.clients.base_offline_viewer_client import BaseOfflineViewerClient
+
+logger = logging.getLogger(__name__)
+
+IN_PROGRESS_STATUSES = ("enqueued", "pending", "running")
+SUCCESS_STATUSES = ("success", "ready")
+
+VERDICT_SUCCESS = "success"
+VERDICT_FAILURE = "failure"
+VERDICT_TIMEOUT = "timeout"
+
+
+def initial_states(exp_ids: Iterable[str]) -> Dict[str, dict]:
+    """
+    States of watched experiments: exp_id -> {status, finished_at}. Stored in the task context between ticks.
+    """
+    return {exp_id: {"status": None, "finished_at": None} for exp_id in exp_ids}
+
+
+def sweep_statuses(
+    client: BaseOfflineViewerClient, states: Dict[str, dict], now: float, max_workers: int
+) -> Dict[str, dict]:
+    """
+    Statuses of all experiments not finished yet are requested in one concurrent sweep;
+    finished experiments are not requested anymore, a failed request leaves its experiment pending.
+    """
+    pending = [exp_id for exp_id, state in states.items() if state["finished_at"] is None]
+    statuses = client.get_experiments_statuses(pending, max_workers=max(int(max_workers or 1), 1))
+    for exp_id, status in statuses.items():
+        if isinstance(status, Exception):
+            logger.warning("Failed to get status of experiment %s: %s", exp_id, status)
+            continue
+        states[exp_id]["status"] = status
+        if status and status not in IN_PROGRESS_STATUSES:
+            states[exp_id]["finished_at"] = now
+    return states
+
+
+def aggregate_verdict(states: Dict[str, dict]) -> Optional[str]:
+    """
+    None until all experiments are finished, then success if all of them have succeeded.
+    """
+    if any(state["finished_at"] is None for state in states.values()):
+        return None
+    if all(state["status"] in SUCCESS_STATUSES for state in states.values()):
+        return VERDICT_SUCCESS
+    return VERDICT_FAILURE
+
+
+def watch_verdict(states: Dict[str, dict], started_at: float, now: float, poll_duration: int) -> Optional[str]:
+    """
+    Aggregate verdict, or timeout if experiments are still running after `poll_duration` (0 - unlimited).
+    """
+    verdict = aggregate_verdict(states)
+    if verdict is None and poll_duration > 0 and now - started_at > poll_duration:
+        return VERDICT_TIMEOUT
+    return verdict
@@ -1,30 +1,47 @@
-from typing import Any, Dict, Mapping, Optional, Union
+import threading
+from typing import Any, Dict, Mapping, Optional, Sequence, Union
 
 from core.infra.network import session
 from infra.clients import base_offline_viewer_client as ov_base
 from infra.utils.network.url_util import urljoin
 
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+BULK_PATHNAME = "bulk"
+# responses of servers without the bulk registration endpoint
+BULK_UNSUPPORTED_STATUSES = (404, 405, 501)
+
 
 class OfflineViewerClient(ov_base.BaseOfflineViewerClient):
     def __init__(self, offline_viewer_host_url: Optional[str] = None):
         self._session = None
+        self._bulk_supported: Optional[bool] = None
+        self._session_lock = threading.Lock()
         self._ov_host_url = offline_viewer_host_url or ov_base.OV_DEFAULT_HOST_URL
 
     @property
     def session(self):
-        if self._session is None:
-            self._session = session.RequestsSessionWithTimeoutsAndRetries(
-                status_forcelist=(500, 502, 503, 504),
-                allowed_methods=("GET", "PUT", "POST", "DELETE", "PATCH"),
-                retries=7,
-                backoff_factor=1.2,
-                backoff_max=60,
-            )
+        # requests of get_experiments_statuses are sent from several threads
+        with self._session_lock:
+            if self._session is None:
+                self._session = session.RequestsSessionWithTimeoutsAndRetries(
+                    status_forcelist=(500, 502, 503, 504),
+                    allowed_methods=("GET", "PUT", "POST", "DELETE", "PATCH"),
+                    retries=7,
+                    backoff_factor=1.2,
+                    backoff_max=60,
+                )
         return self._session
 
     def _clear_nones(self, data: Mapping[str, Any]) -> Dict[str, Any]:
         return {k: v for k, v in data.items() if v is not None}
 
+    def _headers(self, idempotency_key: Optional[str] = None) -> Dict[str, str]:
+        headers = {"Content-Type": "application/json"}
+        if idempotency_key:
+            # retries of the request (including the ones of the session) carry the same key
+            headers[IDEMPOTENCY_KEY_HEADER] = idempotency_key
+        return headers
+
     def create_experiment(
         self,
         name: Optional[str] = None,
@@ -33,8 +50,9 @@ class OfflineViewerClient(ov_base.BaseOfflineViewerClient):
         dataset: Optional[str] = None,
         author: Optional[str] = None,
         attributes: Optional[Any] = None,
+        idempotency_key: Optional[str] = None,
     ) -> Any:
-        headers = {"Content-Type": "application/json"}
+        headers = self._headers(idempotency_key)
 
         data = {
             "name": name,
@@ -69,8 +87,9 @@ class OfflineViewerClient(ov_base.BaseOfflineViewerClient):
         commit_hash: Optional[str] = None,
         commit_date: Optional[int] = None,
         attributes: Optional[Any] = None,
+        idempotency_key: Optional[str] = None,
     ) -> Any:
-        headers = {"Content-Type": "application/json"}
+        headers = self._headers(idempotency_key)
 
         data = {
             "status": ov_base.OV_STATUS_ENQUEUED,
@@ -96,6 +115,42 @@ class OfflineViewerClient(ov_base.BaseOfflineViewerClient):
         except Exception as e:
             raise Exception(f'Cannot create ov run for experiment "{experiment_id}": {e}') from e
 
+    def _create_experiment_once(self, idempotency_key: str, **experiment: Any) -> Any:
+        return self.create_experiment(idempotency_key=idempotency_key, **experiment)
+
+    def _create_run_once(self, idempotency_key: str, **run: Any) -> Any:
+        return self.create_run(idempotency_key=idempotency_key, **run)
+
+    def _create_experiment_with_runs_bulk(
+        self, idempotency_key: str, experiment: Mapping[str, Any], runs: Sequence[Mapping[str, Any]]
+    ) -> Optional[Dict[str, Any]]:
+        if self._bulk_supported is False:
+            return None
+
+        data = self._clear_nones(experiment)
+        data["metrics_runs"] = [self._clear_nones(dict(run, status=ov_base.OV_STATUS_ENQUEUED)) for run in runs]
+
+        try:
+            resp = self.session.post(
+                url=urljoin(
+                    self._ov_host_url,
+                    self.EXPERIMENT_PATHNAME,
+                    BULK_PATHNAME,
+                    "",
+                ),
+                headers=self._headers(idempotency_key),
+                json=data,
+            )
+            if resp.status_code in BULK_UNSUPPORTED_STATUSES:
+                self._bulk_supported = False
+                return None
+            resp.raise_for_status()
+            exp = resp.json()
+        except Exception as e:
+            raise Exception(f"Cannot create ov experiment with {len(runs)} runs: {e}") from e
+        self._bulk_supported = True
+        return {"experiment": exp, "runs": exp.get("metrics_runs", [])}
+
     def update_run(
         self,
         run_id: Union[int, str],
@@ -170,5 +225,43 @@ class OfflineViewerClient(ov_base.BaseOfflineViewerClient):
         except Exception as e:
             raise Exception(f"Cannot get ov experiment: {e}") from e
 
+    def get_experiment_status(self, exp_id: Union[int, str]) -> Optional[str]:
+        headers = {"Content-Type": "application/json"}
+
+        try:
+            # field projection: the experiment is returned without metrics_runs
+            resp = self.session.get(
+                url=urljoin(
+                    self._ov_host_url,
+                    self.EXPERIMENT_PATHNAME,
+                    str(exp_id),
+                ),
+                headers=headers,
+                params={"fields": ",".join(self.EXPERIMENT_STATUS_FIELDS)},
+            )
+            resp.raise_for_status()
+            return resp.json().get("status")
+        except Exception as e:
+            raise Exception(f"Cannot get ov experiment status: {e}") from e
+
+    def get_experiment_progress(self, exp_id: Union[int, str]) -> ov_base.ExperimentProgress:
+        headers = {"Content-Type": "application/json"}
+
+        try:
+            # field projection: only the scene counters of metrics_runs are returned
+            resp = self.session.get(
+                url=urljoin(
+                    self._ov_host_url,
+                    self.EXPERIMENT_PATHNAME,
+                    str(exp_id),
+                ),
+                headers=headers,
+                params={"fields": ",".join(self.EXPERIMENT_PROGRESS_FIELDS)},
+            )
+            resp.raise_for_status()
+            return ov_base.ExperimentProgress.from_experiment(resp.json())
+        except Exception as e:
+            raise Exception(f"Cannot get ov experiment progress: {e}") from e
+
     def ui_link_prefix(self) -> str:
         return ov_base.make_ui_link_prefix(self._ov_host_url)
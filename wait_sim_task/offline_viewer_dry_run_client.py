@@ -1,7 +1,8 @@
+import threading
 import time
 
 from dataclasses import dataclass, field
-from typing import Any, Dict, Optional, Union
+from typing import Any, Dict, Mapping, Optional, Sequence, Union
 
 from infra.clients import base_offline_viewer_client as ov_base
 
@@ -52,6 +53,10 @@ class OfflineViewerDryRunClient(ov_base.BaseOfflineViewerClient):
         self._ov_host_url = offline_viewer_host_url or ov_base.OV_DEFAULT_HOST_URL
         self._experiments: Dict[Union[int, str], _DryRunExperiment] = {}
         self._runs: Dict[Union[int, str], _DryRunRun] = {}
+        # idempotency key -> created object, as the server would deduplicate retries
+        self._created_by_key: Dict[str, Any] = {}
+        # bulk registration creates runs from several threads
+        self._lock = threading.RLock()
         self._experiment_id_counter = 10_000
         self._run_id_counter = 20_000
         self._default_status = default_status
@@ -62,12 +67,14 @@ class OfflineViewerDryRunClient(ov_base.BaseOfflineViewerClient):
         return ov_base.make_ui_link_prefix(self._ov_host_url)
 
     def _next_experiment_id(self) -> int:
-        self._experiment_id_counter += 1
-        return self._experiment_id_counter
+        with self._lock:
+            self._experiment_id_counter += 1
+            return self._experiment_id_counter
 
     def _next_run_id(self) -> int:
-        self._run_id_counter += 1
-        return self._run_id_counter
+        with self._lock:
+            self._run_id_counter += 1
+            return self._run_id_counter
 
     def create_experiment(
         self,
@@ -109,6 +116,30 @@ class OfflineViewerDryRunClient(ov_base.BaseOfflineViewerClient):
         self._runs[run_id] = run
         return self._run_to_dict(run)
 
+    def _create_experiment_once(self, idempotency_key: str, **experiment: Any) -> Any:
+        with self._lock:
+            if idempotency_key not in self._created_by_key:
+                self._created_by_key[idempotency_key] = self.create_experiment(**experiment)
+            return self._created_by_key[idempotency_key]
+
+    def _create_run_once(self, idempotency_key: str, **run: Any) -> Any:
+        with self._lock:
+            if idempotency_key not in self._created_by_key:
+                self._created_by_key[idempotency_key] = self.create_run(**run)
+            return self._created_by_key[idempotency_key]
+
+    def _create_experiment_with_runs_bulk(
+        self, idempotency_key: str, experiment: Mapping[str, Any], runs: Sequence[Mapping[str, Any]]
+    ) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if idempotency_key not in self._created_by_key:
+                exp = self.create_experiment(**experiment)
+                self._created_by_key[idempotency_key] = {
+                    "experiment": exp,
+                    "runs": [self.create_run(**dict(run, experiment_id=exp["id"])) for run in runs],
+                }
+            return self._created_by_key[idempotency_key]
+
     def _update_fields_if_not_none(self, run: _DryRunRun, **kwargs: Any) -> None:
         for field_name, value in kwargs.items():
             if value is not None:
@@ -148,6 +179,12 @@ class OfflineViewerDryRunClient(ov_base.BaseOfflineViewerClient):
         return self._run_to_dict(run)
 
     def get_experiment(self, exp_id: Union[int, str]) -> Any:
+        return self._experiment_to_dict(self._poll_experiment(exp_id))
+
+    def get_experiment_status(self, exp_id: Union[int, str]) -> Optional[str]:
+        return self._poll_experiment(exp_id).status
+
+    def _poll_experiment(self, exp_id: Union[int, str]) -> _DryRunExperiment:
         exp = self._experiments.get(exp_id)
 
         if exp is None:
@@ -160,14 +197,14 @@ class OfflineViewerDryRunClient(ov_base.BaseOfflineViewerClient):
             self._experiments[exp_id] = exp
 
         if exp.status in {ov_base.OV_STATUS_READY, "success", ov_base.OV_STATUS_FAILED}:
-            return self._experiment_to_dict(exp)
+            return exp
 
         if self._iter < self._finalize_on_iter:
             exp.status = "running"
-            return self._experiment_to_dict(exp)
+            return exp
 
         exp.status = self._default_status
-        return self._experiment_to_dict(exp)
+        return exp
 
     def _experiment_to_dict(self, exp: _DryRunExperiment) -> Dict[str, Any]:
         return {
@@ -179,7 +216,9 @@ class OfflineViewerDryRunClient(ov_base.BaseOfflineViewerClient):
             "author": exp.author,
             "attributes": exp.attributes,
             "status": exp.status,
-            "metrics_runs": [],
+            "metrics_runs": [
+                self._run_to_dict(run) for run in list(self._runs.values()) if run.experiment_id == exp.id
+            ],
             "dry_run": True,
         }
 
@@ -0,0 +1,162 @@
+import atexit
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Union
+
+from infra.clients import base_offline_viewer_client as ov_base
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_INTERVAL = 10.0
+DEFAULT_MAX_PENDING = 100
+
+# of two statuses merged into one update the higher one is sent
+STATUS_PRIORITY = {
+    ov_base.OV_STATUS_ENQUEUED: 0,
+    ov_base.OV_STATUS_RUNNING: 1,
+    ov_base.OV_STATUS_READY: 2,
+    "success": 2,
+    ov_base.OV_STATUS_OUTDATED: 2,
+    ov_base.OV_STATUS_WRONG: 3,
+    ov_base.OV_STATUS_FAILED: 3,
+}
+_UNKNOWN_STATUS_PRIORITY = 1
+
+
+def merge_run_updates(older: Dict[str, Any], newer: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    One update equivalent to `older` followed by `newer`: the latest values win,
+    except the status which is the one of the higher priority.
+    """
+    merged = dict(older)
+    for name, value in newer.items():
+        if value is None:
+            continue
+        if name == "status" and merged.get("status") is not None:
+            older_priority = STATUS_PRIORITY.get(merged["status"], _UNKNOWN_STATUS_PRIORITY)
+            if older_priority > STATUS_PRIORITY.get(value, _UNKNOWN_STATUS_PRIORITY):
+                continue
+        merged[name] = value
+    return merged
+
+
+class BufferedRunUpdater(object):
+    """
+    Write-behind `update_run` of an Offline Viewer client.
+
+    Updates are merged per run and sent by a background thread every `flush_interval` seconds,
+    or as soon as `max_pending` runs have pending updates. Failed updates are merged back and
+    retried by the next flush. Pending updates are flushed on `close`, which is also called
+    at interpreter exit.
+    """
+
+    def __init__(
+        self,
+        client: ov_base.BaseOfflineViewerClient,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        max_pending: int = DEFAULT_MAX_PENDING,
+    ):
+        if flush_interval <= 0:
+            raise ValueError("flush_interval must be positive")
+        if max_pending <= 0:
+            raise ValueError("max_pending must be positive")
+        self.client = client
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: Dict[Union[int, str], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        # serializes flushes, so updates of a run are sent in order
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="ov-run-updater", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def __enter__(self) -> "BufferedRunUpdater":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def update_run(
+        self,
+        run_id: Union[int, str],
+        status: Optional[str] = None,
+        pulsar_instance: Optional[str] = None,
+        attributes: Optional[Any] = None,
+        scenes_total: Optional[int] = None,
+        scenes_dropped: Optional[int] = None,
+        scenes_failure: Optional[int] = None,
+        scenes_simulated: Optional[int] = None,
+    ) -> None:
+        """
+        Same arguments as `BaseOfflineViewerClient.update_run`; nothing is returned, the update is sent later.
+        """
+        update = dict(
+            status=status,
+            pulsar_instance=pulsar_instance,
+            attributes=attributes,
+            scenes_total=scenes_total,
+            scenes_dropped=scenes_dropped,
+            scenes_failure=scenes_failure,
+            scenes_simulated=scenes_simulated,
+        )
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Run updater is closed")
+            self._pending[run_id] = merge_run_updates(self._pending.get(run_id, {}), update)
+            if len(self._pending) >= self.max_pending:
+                self._wakeup.set()
+
+    def flush(self) -> List[Union[int, str]]:
+        """
+        Send pending updates, return ids of runs whose updates have failed (they stay pending).
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            failed = {}
+            for run_id, update in batch.items():
+                try:
+                    self.client.update_run(run_id, **update)
+                except Exception as e:
+                    logger.warning("Failed to update ov run %s: %s", run_id, e)
+                    failed[run_id] = update
+            if failed:
+                with self._lock:
+                    for run_id, update in failed.items():
+                        self._pending[run_id] = merge_run_updates(update, self._pending.get(run_id, {}))
+            if batch:
+                logger.debug("Flushed updates of %s ov runs, %s failed", len(batch), len(failed))
+            return list(failed)
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            with self._lock:
+                if self._closed:
+                    return
+            self.flush()
+
+    def close(self) -> List[Union[int, str]]:
+        """
+        Stop the background thread and flush pending updates; returns ids of runs which could not be updated.
+        """
+        with self._lock:
+            if self._closed:
+                return list(self._pending)
+            self._closed = True
+        self._wakeup.set()
+        self._thread.join()
+        atexit.unregister(self.close)
+        failed = self.flush()
+        if failed:
+            logger.error("Updates of ov runs %s are lost", failed)
+        return failed
@@ -1,10 +1,14 @@
 import sys
 import time
 import json
+import logging
+from typing import Optional
 
 from infra.clients.offline_viewer_client import OfflineViewerClient
 from infra.clients.offline_viewer_dry_run_client import OfflineViewerDryRunClient
 from infra.clients.base_offline_viewer_client import BaseOfflineViewerClient
+from infra.clients import experiment_watcher
+from infra.clients.experiment_watcher import IN_PROGRESS_STATUSES, SUCCESS_STATUSES, VERDICT_SUCCESS
 from sandbox import sdk2
 from sandbox.common import errors
 from sandbox.common.types import misc as ctm
@@ -12,7 +16,8 @@ from sandbox.projects.sdc.common.requests_util import session, log_helper
 
 from sdg.ci.sandbox.utils.poll_frequency_manager.poll_frequency_manager import PollFrequencyManager
 from sdg.ci.sandbox.utils.poll_frequency_manager import poll_frequency_profile
-from sdg.ci.sandbox.utils.sandbox_button_generator.generator import Generator
+
+logger = logging.getLogger(__name__)
 
 SEARCH_URL = "https://<INTERNAL_DOMAIN>/rest/offline_viewer/metrics_experiment_verdict/{exp_id}"
 EXPERIMENT_URL = "https://<INTERNAL_DOMAIN>/offline-viewer/experiment/{exp_id}"
@@ -30,8 +35,43 @@ class SdcWaitSimExperiment(sdk2.Task):
 
     class Parameters(sdk2.Task.Parameters):
         with sdk2.parameters.Group("Experiment parameters") as experiment_parameters_block:
-            experiment_id = sdk2.parameters.String("Experiment id", required=True)
+            experiment_id = sdk2.parameters.String(
+                "Experiment id", description="Required unless experiment_ids are watched", required=False
+            )
+            experiment_ids = sdk2.parameters.List(
+                "Experiment ids to watch",
+                description="Watcher mode: all experiments are polled by this task, experiment_id is ignored",
+            )
+            watch_parallelism = sdk2.parameters.Integer("Max concurrent status requests of the watcher", default=8)
             publish_verdict = sdk2.parameters.Bool("Publish verdict", default=False)
+            with publish_verdict.value[True]:
+                verdict_deltas_export = sdk2.parameters.String(
+                    "Local export of per-scene metric deltas (JSON lines)",
+                    description="One column of deltas per metric. Empty - publish the verdict without intervals",
+                    default="",
+                )
+                verdict_metrics = sdk2.parameters.Dict(
+                    "Metrics of the export", description="metric -> higher|lower (which is better)"
+                )
+                verdict_resamples = sdk2.parameters.Integer("Resamples for confidence intervals", default=1000)
+                verdict_confidence = sdk2.parameters.Integer("Confidence level of intervals (%)", default=95)
+                verdict_seed = sdk2.parameters.Integer("Random seed of resampling", default=0)
+            decide_early = sdk2.parameters.Bool(
+                "Decide early by sequential test of scene failures",
+                description="SPRT over failure counts of running experiment runs passes or fails the task "
+                "before the experiment is finished. On early accept experiment_state holds the progress of the runs "
+                "and verdict confidence intervals are not published",
+                default=False,
+            )
+            with decide_early.value[True]:
+                acceptable_failure_rate = sdk2.parameters.Float("Acceptable scene failure rate", default=0.01)
+                unacceptable_failure_rate = sdk2.parameters.Float("Unacceptable scene failure rate", default=0.03)
+                early_decision_alpha = sdk2.parameters.Float(
+                    "Chance to reject an acceptable candidate (alpha)", default=0.05
+                )
+                early_decision_beta = sdk2.parameters.Float(
+                    "Chance to accept an unacceptable candidate (beta)", default=0.05
+                )
 
         with sdk2.parameters.Group("Polling parameters") as polling_parameters_block:
             poll_duration = sdk2.parameters.Integer(
@@ -54,6 +94,11 @@ class SdcWaitSimExperiment(sdk2.Task):
                 default=poll_frequency_profile.PollProfile.MEDIUM.name,
                 choices=PROFILE_CHOICES,
             )
+            progress_based_polling = sdk2.parameters.Bool(
+                "Schedule polls by predicted completion",
+                description="Uses scene counters of experiment runs; polls stay within the profile frequencies",
+                default=False,
+            )
 
         with sdk2.parameters.Group("Config") as config_block:
             dry_run = sdk2.parameters.Bool("Dry run", default=False)
@@ -61,6 +106,10 @@ class SdcWaitSimExperiment(sdk2.Task):
         with sdk2.parameters.Output:
             experiment_state = sdk2.parameters.String("Experiment state")
             experiment_url_badge = sdk2.parameters.Dict("Experiment url badge")
+            experiment_states = sdk2.parameters.JSON("States of watched experiments")
+            aggregate_verdict = sdk2.parameters.String("Aggregate verdict of watched experiments")
+            verdict_confidence_intervals = sdk2.parameters.JSON("Confidence intervals of metric deltas")
+            early_decision = sdk2.parameters.JSON("Sequential test statistics of the early decision")
 
     def get_exp_state(self):
         if self.Parameters.publish_verdict and self._session is not None:
@@ -72,7 +121,21 @@ class SdcWaitSimExperiment(sdk2.Task):
             response_json = self._ov_client.get_experiment(exp_id=self.Parameters.experiment_id)
         return response_json
 
+    def get_exp_status(self):
+        """
+        Status only, without runs and verdict payload: polling ticks do not need them.
+        """
+        return self._ov_client.get_experiment_status(exp_id=self.Parameters.experiment_id)
+
+    def get_exp_progress(self):
+        """
+        Status and scene counters of the runs, for polling by predicted completion.
+        """
+        return self._ov_client.get_experiment_progress(exp_id=self.Parameters.experiment_id)
+
     def on_prepare(self):
+        # full experiment state, fetched once on completion and reused for rendering
+        self._exp_state = None
         if self.Parameters.dry_run:
             self._session = None
             self._ov_client: BaseOfflineViewerClient = OfflineViewerDryRunClient(
@@ -82,12 +145,29 @@ class SdcWaitSimExperiment(sdk2.Task):
             self._session = session.create_session()
             self._ov_client: BaseOfflineViewerClient = OfflineViewerClient()
 
+        if self.watched_experiment_ids:
+            return
+        if not self.Parameters.experiment_id:
+            raise errors.TaskFailure("Either experiment_id or experiment_ids must be set")
+        if self.Parameters.publish_verdict and self.Parameters.verdict_deltas_export:
+            self.validate_verdict_metrics()
+        if self.Parameters.decide_early:
+            self.validate_early_decision()
         self.Parameters.experiment_url_badge = self._create_experiment_url_badge(
             module="SDG", url=self.get_experiment_url(), text="Experiment URL", status="SUCCESSFUL"
         )
 
+    @property
+    def watched_experiment_ids(self) -> list[str]:
+        return [str(exp_id).strip() for exp_id in self.Parameters.experiment_ids or [] if str(exp_id).strip()]
+
     def _render_results(self) -> None:
-        exp_state = self.get_exp_state()
+        if self.watched_experiment_ids:
+            self.add_watched_experiments_block()
+            return
+        exp_state = getattr(self, "_exp_state", None)
+        if exp_state is None:
+            exp_state = self.get_exp_state()
         self.add_links_block(exp_state)
         self.add_experiment_results_block(exp_state)
 
@@ -98,6 +178,9 @@ class SdcWaitSimExperiment(sdk2.Task):
         self._render_results()
 
     def add_links_block(self, exp_state: dict) -> None:
+        # finalize-only dependency, poll ticks do not need it
+        from sdg.ci.sandbox.utils.sandbox_button_generator.generator import Generator
+
         ic_task_ids, ic_task_urls = self.get_ic_task_urls(exp_state)
         links_names = ["Simulator task URL"] + ic_task_ids
         links_values = [self.get_experiment_url()] + ic_task_urls
@@ -105,6 +188,20 @@ class SdcWaitSimExperiment(sdk2.Task):
         links_report = Generator(links_names, title, links_values).generate_report()
         self.set_info(links_report, do_escape=False)
 
+    def add_watched_experiments_block(self) -> None:
+        states = self.Context.watched_experiments
+        if states is ctm.NotExists:
+            return
+        rows = "".join(
+            '<tr><td><a href="{}">{}</a></td><td>{}</td></tr>'.format(
+                EXPERIMENT_URL.format(exp_id=exp_id), exp_id, state["status"] or "unknown"
+            )
+            for exp_id, state in states.items()
+        )
+        verdict = self.Parameters.aggregate_verdict or "pending"
+        message = f"<h3>Watched experiments ({verdict}):</h3><table>{rows}</table>"
+        self.set_info(message, do_escape=False)
+
     def add_experiment_results_block(self, exp_state: dict) -> None:
         message = f"<h3>Experiment state:</h3><code>{json.dumps(exp_state, indent=4)}</code>"
         self.set_info(message, do_escape=False)
@@ -120,6 +217,73 @@ class SdcWaitSimExperiment(sdk2.Task):
         ic_task_urls = [SIM_TASK_URL.format(task_id=ic_task_id) for ic_task_id in ic_task_ids]
         return ic_task_ids, ic_task_urls
 
+    def validate_verdict_metrics(self) -> None:
+        from sdg.ci.sandbox.utils.experiment_statistics.table_comparison import parse_metric_specs
+
+        if not self.Parameters.verdict_metrics:
+            raise errors.TaskFailure("verdict_metrics are required to read verdict_deltas_export")
+        try:
+            parse_metric_specs(self.Parameters.verdict_metrics)
+        except ValueError as exc:
+            raise errors.TaskFailure("Invalid verdict_metrics: {}".format(exc))
+
+    def get_failure_rate_sprt(self):
+        from sdg.ci.sandbox.utils.experiment_statistics.sequential_test import FailureRateSprt
+
+        return FailureRateSprt(
+            acceptable_rate=float(self.Parameters.acceptable_failure_rate),
+            unacceptable_rate=float(self.Parameters.unacceptable_failure_rate),
+            alpha=float(self.Parameters.early_decision_alpha),
+            beta=float(self.Parameters.early_decision_beta),
+        )
+
+    def validate_early_decision(self) -> None:
+        try:
+            self.get_failure_rate_sprt()
+        except ValueError as exc:
+            raise errors.TaskFailure("Invalid early decision parameters: {}".format(exc))
+
+    def publish_confidence_intervals(self) -> dict:
+        """
+        Bootstrap intervals and permutation p-values of mean per-scene deltas, so a verdict
+        can be told apart from noise. The experiment is over by then, so an unreadable export
+        only leaves the intervals out (None per metric).
+        """
+        from sdg.ci.sandbox.utils.experiment_statistics.confidence_intervals import delta_intervals, read_deltas
+        from sdg.ci.sandbox.utils.experiment_statistics.table_comparison import (
+            InMemoryTableSource,
+            JsonLinesTableSource,
+            parse_metric_specs,
+        )
+
+        specs = parse_metric_specs(self.Parameters.verdict_metrics or {})
+        if self.Parameters.dry_run:
+            source = InMemoryTableSource([])
+        else:
+            source = JsonLinesTableSource(self.Parameters.verdict_deltas_export)
+        try:
+            deltas = read_deltas(source, [spec.name for spec in specs])
+        except (OSError, ValueError) as exc:
+            logger.warning("Failed to read deltas from %s: %s", self.Parameters.verdict_deltas_export, exc)
+            self.set_info("Confidence intervals are not published: {}".format(exc))
+            deltas = {}
+        intervals = delta_intervals(
+            deltas,
+            confidence=int(self.Parameters.verdict_confidence) / 100,
+            resamples=int(self.Parameters.verdict_resamples),
+            seed=int(self.Parameters.verdict_seed),
+        )
+        published = {}
+        for spec in specs:
+            interval = intervals.get(spec.name)
+            if interval is None and deltas:
+                logger.warning("No finite deltas of metric %s in the export", spec.name)
+            published[spec.name] = (
+                dict(interval.to_dict(), verdict=interval.verdict(spec.higher_is_better)) if interval else None
+            )
+        self.Parameters.verdict_confidence_intervals = published
+        return published
+
     def get_experiment_url(self) -> str:
         return EXPERIMENT_URL.format(exp_id=self.Parameters.experiment_id)
 
@@ -129,6 +293,10 @@ class SdcWaitSimExperiment(sdk2.Task):
             self.Context.started_at = time.time()
 
         with self.memoize_stage.poll_stage(sys.maxsize):
+            if self.watched_experiment_ids:
+                self.do_watch_poll_stage()
+                return
+
             poll_duration = int(self.Parameters.poll_duration)
 
             if poll_duration > 0:
@@ -138,32 +306,137 @@ class SdcWaitSimExperiment(sdk2.Task):
                     self.Parameters.experiment_state = TIMEOUT_OUTPUT
                     raise errors.TaskFailure("Poll duration limit reached (treat as timeout)")
 
-            exp_state = self.get_exp_state()
-            status = exp_state.get("status")
-
-            if not status or status in ["enqueued", "pending", "running"]:
-                profile = poll_frequency_profile.effective_profile(
-                    name=self.Parameters.poll_freq_profile,
-                    initial_poll_freq=self.Parameters.initial_poll_freq,
-                    poll_freq=int(self.Parameters.poll_freq),
-                    transition_duration=int(self.Parameters.transition_duration),
-                    tags=self.Parameters.tags,
-                )
+            progress = None
+            if self.Parameters.progress_based_polling or self.Parameters.decide_early:
+                progress = self.get_exp_progress()
+                status = progress.status
+            else:
+                status = self.get_exp_status()
+            if status and status not in IN_PROGRESS_STATUSES:
+                exp_state = self.get_exp_state()
+                status = exp_state.get("status")
+
+            if not status or status in IN_PROGRESS_STATUSES:
+                if self.Parameters.decide_early and self.make_early_decision(progress):
+                    return
+                raise sdk2.WaitTime(self.get_poll_freq(progress if self.Parameters.progress_based_polling else None))
 
-                elapsed_transition_time = time.time() - self.Context.started_at
+            self._exp_state = exp_state
+            self.Parameters.experiment_state = exp_state
+            if self.Parameters.publish_verdict and self.Parameters.verdict_deltas_export:
+                self.publish_confidence_intervals()
+            if status not in SUCCESS_STATUSES:
+                raise errors.TaskFailure("Experiment ended with non-success state")
 
-                current_poll_freq = PollFrequencyManager.calculate_await_time(
-                    elapsed_transition_time,
-                    profile.transition_duration,
-                    profile.initial_poll_freq,
-                    profile.final_poll_freq,
+    def make_early_decision(self, progress) -> bool:
+        """
+        Sequential test of failure counts of the runs: True if the candidate is accepted,
+        fails the task if it is rejected, False while the counts are not conclusive.
+        Dropped scenes are not counted.
+        """
+        from sdg.ci.sandbox.utils.experiment_statistics.sequential_test import DECISION_REJECT
+
+        sprt = self.get_failure_rate_sprt()
+        decision = sprt.decide(
+            failures=progress.scenes_failure, scenes=progress.scenes_simulated + progress.scenes_failure
+        )
+        self.Parameters.early_decision = dict(decision.to_dict(), scenes_total=progress.scenes_total)
+        logger.info("Early decision: %s", decision)
+        if decision.decision == DECISION_REJECT:
+            raise errors.TaskFailure(
+                "Scene failure rate {:.4f} ({} of {}) is above acceptable {} (sequential test)".format(
+                    decision.failure_rate,
+                    decision.failures,
+                    decision.scenes,
+                    sprt.acceptable_rate,
                 )
+            )
+        if decision.final:
+            # the experiment is still running: its progress stands for the state, verdict intervals
+            # need the deltas export of the finished experiment and are not published
+            self.Parameters.experiment_state = dict(progress.to_dict(), early_decision=decision.decision)
+        return decision.final
 
-                raise sdk2.WaitTime(current_poll_freq)
+    def get_poll_freq(self, progress=None) -> int:
+        profile = poll_frequency_profile.effective_profile(
+            name=self.Parameters.poll_freq_profile,
+            initial_poll_freq=self.Parameters.initial_poll_freq,
+            poll_freq=int(self.Parameters.poll_freq),
+            transition_duration=int(self.Parameters.transition_duration),
+            tags=self.Parameters.tags,
+        )
 
-            self.Parameters.experiment_state = exp_state
-            if status not in ["success", "ready"]:
-                raise errors.TaskFailure("Experiment ended with non-success state")
+        elapsed_transition_time = time.time() - self.Context.started_at
+
+        current_poll_freq = PollFrequencyManager.calculate_await_time(
+            elapsed_transition_time,
+            profile.transition_duration,
+            profile.initial_poll_freq,
+            profile.final_poll_freq,
+        )
+        if progress is not None:
+            current_poll_freq = self.calculate_eta_await_time(progress, profile) or current_poll_freq
+        return current_poll_freq
+
+    def calculate_eta_await_time(self, progress, profile) -> Optional[int]:
+        """
+        Wait time by the completion estimate fitted over scene throughput of previous ticks,
+        bounded by the profile frequencies; None if unknown yet.
+        """
+        from sdg.ci.sandbox.utils.poll_frequency_manager.completion_estimator import CompletionEstimator
+
+        samples = self.Context.completion_samples
+        estimator = CompletionEstimator(samples if samples is not ctm.NotExists else None)
+        now = time.time()
+        if progress.fraction is not None:
+            estimator.add(now, progress.fraction)
+            self.Context.completion_samples = estimator.to_list()
+
+        remaining_time = estimator.remaining_time(now)
+        if remaining_time is None:
+            return None
+        await_time = PollFrequencyManager.calculate_eta_await_time(
+            remaining_time,
+            min_poll_freq=min(profile.initial_poll_freq, profile.final_poll_freq),
+            max_poll_freq=max(profile.initial_poll_freq, profile.final_poll_freq),
+        )
+        logger.info(
+            "Scenes done %s of %s, predicted completion in %d s, next poll in %d s",
+            progress.scenes_done,
+            progress.scenes_total,
+            remaining_time,
+            await_time,
+        )
+        return await_time
+
+    def do_watch_poll_stage(self) -> None:
+        """
+        Statuses of all experiments not finished yet are requested in one concurrent sweep per tick;
+        finished experiments are not polled anymore.
+        """
+        states = self.Context.watched_experiments
+        if states is ctm.NotExists:
+            states = experiment_watcher.initial_states(self.watched_experiment_ids)
+
+        now = time.time()
+        states = experiment_watcher.sweep_statuses(
+            self._ov_client, states, now, max_workers=self.Parameters.watch_parallelism
+        )
+        self.Context.watched_experiments = states
+        self.Parameters.experiment_states = states
+
+        verdict = experiment_watcher.watch_verdict(
+            states, self.Context.started_at, now, poll_duration=int(self.Parameters.poll_duration)
+        )
+        if verdict is None:
+            raise sdk2.WaitTime(self.get_poll_freq())
+        if verdict == experiment_watcher.VERDICT_TIMEOUT:
+            self.Context.is_timeout = True
+
+        self.Parameters.aggregate_verdict = verdict
+        if verdict != VERDICT_SUCCESS:
+            failed = [exp_id for exp_id, state in states.items() if state["status"] not in SUCCESS_STATUSES]
+            raise errors.TaskFailure(f"Watched experiments ended with {verdict}: {', '.join(failed)}")
 
     def _create_experiment_url_badge(self, module: str, url: str, text: str, status: str) -> dict:
         return {"id": "experiment_url_badge", "module": module, "url": url, "text": text, "status": status}
@@ -0,0 +1,75 @@
+from infra.clients import base_offline_viewer_client as ov_base
+from infra.clients import experiment_watcher
+from infra.clients.offline_viewer_dry_run_client import OfflineViewerDryRunClient
+
+
+class _RecordingClient(OfflineViewerDryRunClient):
+    def __init__(self, broken=(), **kwargs):
+        super().__init__(**kwargs)
+        self.broken = set(broken)
+        self.polled = []
+
+    def get_experiment_status(self, exp_id):
+        self.polled.append(exp_id)
+        if exp_id in self.broken:
+            raise Exception("unavailable")
+        return super().get_experiment_status(exp_id)
+
+
+def test_finished_experiments_are_not_polled_again():
+    client = _RecordingClient(finalize_on_iteration=1, current_iteration=1)
+    states = experiment_watcher.initial_states(["exp-1", "exp-2"])
+    states["exp-1"] = {"status": ov_base.OV_STATUS_FAILED, "finished_at": 100.0}
+
+    states = experiment_watcher.sweep_statuses(client, states, now=200.0, max_workers=2)
+
+    assert client.polled == ["exp-2"]
+    assert states["exp-1"] == {"status": ov_base.OV_STATUS_FAILED, "finished_at": 100.0}
+    assert states["exp-2"] == {"status": ov_base.OV_STATUS_READY, "finished_at": 200.0}
+
+
+def test_failed_request_keeps_experiment_pending():
+    client = _RecordingClient(broken=["exp-2"], finalize_on_iteration=1, current_iteration=1)
+    states = experiment_watcher.sweep_statuses(
+        client, experiment_watcher.initial_states(["exp-1", "exp-2"]), now=100.0, max_workers=2
+    )
+
+    assert states["exp-2"] == {"status": None, "finished_at": None}
+    assert experiment_watcher.aggregate_verdict(states) is None
+
+    client.broken.clear()
+    states = experiment_watcher.sweep_statuses(client, states, now=200.0, max_workers=2)
+    assert states["exp-2"]["finished_at"] == 200.0
+    assert experiment_watcher.aggregate_verdict(states) == experiment_watcher.VERDICT_SUCCESS
+
+
+def test_running_experiments_time_out():
+    client = OfflineViewerDryRunClient(finalize_on_iteration=2, current_iteration=1)
+    states = experiment_watcher.sweep_statuses(
+        client, experiment_watcher.initial_states(["exp-1"]), now=100.0, max_workers=1
+    )
+
+    assert experiment_watcher.watch_verdict(states, started_at=0.0, now=100.0, poll_duration=0) is None
+    assert experiment_watcher.watch_verdict(states, started_at=0.0, now=100.0, poll_duration=300) is None
+    assert (
+        experiment_watcher.watch_verdict(states, started_at=0.0, now=301.0, poll_duration=300)
+        == experiment_watcher.VERDICT_TIMEOUT
+    )
+
+
+def test_verdict_is_failure_if_any_experiment_has_not_succeeded():
+    ready = OfflineViewerDryRunClient(finalize_on_iteration=1, current_iteration=1)
+    failed = OfflineViewerDryRunClient(
+        default_status=ov_base.OV_STATUS_FAILED, finalize_on_iteration=1, current_iteration=1
+    )
+    states = experiment_watcher.initial_states(["exp-1", "exp-2"])
+    experiment_watcher.sweep_statuses(ready, {"exp-1": states["exp-1"]}, now=100.0, max_workers=1)
+    assert experiment_watcher.aggregate_verdict(states) is None
+
+    experiment_watcher.sweep_statuses(failed, {"exp-2": states["exp-2"]}, now=100.0, max_workers=1)
+    assert experiment_watcher.aggregate_verdict(states) == experiment_watcher.VERDICT_FAILURE
+    # a finished verdict wins over the timeout
+    assert (
+        experiment_watcher.watch_verdict(states, started_at=0.0, now=1000.0, poll_duration=300)
+        == experiment_watcher.VERDICT_FAILURE
+    )
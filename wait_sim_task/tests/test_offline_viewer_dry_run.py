@@ -143,3 +143,93 @@ def test_get_run_unknown_raises(client: OfflineViewerDryRunClient):
     with pytest.raises(Exception) as exc:
         client.get_run("non-existing-id")
     assert "DryRun OV: run 'non-existing-id' not found" in str(exc.value)
+
+
+def test_get_experiment_status_follows_experiment_lifecycle():
+    client = OfflineViewerDryRunClient(finalize_on_iteration=2, current_iteration=1)
+    assert client.get_experiment_status("exp-5") == "running"
+
+    client._iter = 2
+    assert client.get_experiment_status("exp-5") == ov_base.OV_STATUS_READY
+    assert client.get_experiment("exp-5")["status"] == ov_base.OV_STATUS_READY
+
+
+def test_get_experiments_statuses_reports_failures_per_experiment():
+    class _Client(OfflineViewerDryRunClient):
+        def get_experiment_status(self, exp_id):
+            if exp_id == "broken":
+                raise Exception("unavailable")
+            return super().get_experiment_status(exp_id)
+
+    client = _Client(finalize_on_iteration=1, current_iteration=1)
+    statuses = client.get_experiments_statuses(["exp-6", "broken", "exp-7"], max_workers=2)
+
+    assert list(statuses) == ["exp-6", "broken", "exp-7"]
+    assert statuses["exp-6"] == statuses["exp-7"] == ov_base.OV_STATUS_READY
+    assert isinstance(statuses["broken"], Exception)
+    assert client.get_experiments_statuses([]) == {}
+
+
+def test_create_experiment_with_runs_in_one_request(client: OfflineViewerDryRunClient):
+    runs = [{"commit_hash": f"hash{i}", "commit_date": i} for i in range(20)]
+    created = client.create_experiment_with_runs(runs, idempotency_prefix="release-1", name="Commit range")
+
+    assert created["experiment"]["name"] == "Commit range"
+    assert [run["commit_hash"] for run in created["runs"]] == [f"hash{i}" for i in range(20)]
+    assert {run["experiment_id"] for run in created["runs"]} == {created["experiment"]["id"]}
+
+    retried = client.create_experiment_with_runs(runs, idempotency_prefix="release-1", name="Commit range")
+    assert retried == created
+    assert len(client._runs) == 20
+
+
+def test_create_runs_concurrently_without_duplicates_on_retry(client: OfflineViewerDryRunClient):
+    runs = [{"commit_hash": f"hash{i}", "attributes": {"dataset": i % 3}} for i in range(50)]
+    created = client.create_runs("exp-8", runs, max_workers=8, idempotency_prefix="setup")
+
+    assert [run["commit_hash"] for run in created] == [f"hash{i}" for i in range(50)]
+    assert len({run["id"] for run in created}) == 50
+
+    assert client.create_runs("exp-8", runs, idempotency_prefix="setup") == created
+    assert len(client._runs) == 50
+    assert len(client.create_runs("exp-8", runs[:2])) == 2
+    assert client.create_runs("exp-8", []) == []
+
+
+def test_bulk_registration_falls_back_to_pipelined_creation():
+    class _NoBulkClient(OfflineViewerDryRunClient):
+        def _create_experiment_with_runs_bulk(self, idempotency_key, experiment, runs):
+            return None
+
+    client = _NoBulkClient()
+    created = client.create_experiment_with_runs([{"commit_hash": "a"}, {"commit_hash": "b"}], dataset="d")
+
+    assert created["experiment"]["dataset"] == "d"
+    assert [run["experiment_id"] for run in created["runs"]] == [created["experiment"]["id"]] * 2
+
+
+def test_experiment_progress_sums_scene_counters_of_runs(client: OfflineViewerDryRunClient):
+    exp_id = client.create_experiment(name="Progress")["id"]
+    first = client.create_run(experiment_id=exp_id)["id"]
+    second = client.create_run(experiment_id=exp_id)["id"]
+    client.create_run(experiment_id="other", attributes={"scenes": 1})
+
+    assert client.get_experiment_progress(exp_id).fraction is None
+
+    client.update_run(first, scenes_total=100, scenes_simulated=40, scenes_failure=5, scenes_dropped=5)
+    client.update_run(second, scenes_total=300, scenes_simulated=50)
+    progress = client.get_experiment_progress(exp_id)
+
+    assert progress.status == ov_base.OV_STATUS_READY
+    assert (progress.runs, progress.scenes_total, progress.scenes_done) == (2, 400, 100)
+    assert progress.fraction == pytest.approx(0.25)
+    assert progress.to_dict()["scenes_failure"] == 5
+
+
+def test_experiment_progress_from_partial_payload():
+    progress = ov_base.ExperimentProgress.from_experiment(
+        {"status": "running", "metrics_runs": [{"id": 1, "scenes_total": None}, {"id": 2, "scenes_total": 10}]}
+    )
+
+    assert progress == ov_base.ExperimentProgress(status="running", runs=2, scenes_total=10)
+    assert ov_base.ExperimentProgress.from_experiment({}).fraction is None
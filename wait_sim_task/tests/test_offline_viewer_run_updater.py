@@ -0,0 +1,81 @@
+import threading
+
+import pytest
+
+from infra.clients import base_offline_viewer_client as ov_base
+from infra.clients.offline_viewer_dry_run_client import OfflineViewerDryRunClient
+from infra.clients.offline_viewer_run_updater import BufferedRunUpdater, merge_run_updates
+
+
+class _RecordingClient(OfflineViewerDryRunClient):
+    def __init__(self, failures=0):
+        super().__init__()
+        self.calls = []
+        self.failures = failures
+        self.sent = threading.Event()
+
+    def update_run(self, run_id, **kwargs):
+        self.calls.append((run_id, {k: v for k, v in kwargs.items() if v is not None}))
+        self.sent.set()
+        if self.failures:
+            self.failures -= 1
+            raise Exception("service unavailable")
+        return super().update_run(run_id, **kwargs)
+
+
+def test_merge_keeps_latest_counters_and_highest_status():
+    merged = merge_run_updates(
+        {"status": ov_base.OV_STATUS_RUNNING, "scenes_simulated": 10, "scenes_total": 100},
+        {"status": ov_base.OV_STATUS_ENQUEUED, "scenes_simulated": 20, "scenes_failure": None},
+    )
+    assert merged == {"status": ov_base.OV_STATUS_RUNNING, "scenes_simulated": 20, "scenes_total": 100}
+
+    assert merge_run_updates(merged, {"status": ov_base.OV_STATUS_FAILED})["status"] == ov_base.OV_STATUS_FAILED
+
+
+def test_updates_are_coalesced_per_run():
+    client = _RecordingClient()
+    run_a = client.create_run(experiment_id="exp")["id"]
+    run_b = client.create_run(experiment_id="exp")["id"]
+
+    with BufferedRunUpdater(client, flush_interval=3600) as updater:
+        for simulated in range(1, 101):
+            updater.update_run(run_a, status=ov_base.OV_STATUS_RUNNING, scenes_simulated=simulated)
+        updater.update_run(run_b, scenes_total=5)
+        updater.update_run(run_a, status=ov_base.OV_STATUS_READY, scenes_failure=2)
+        assert client.calls == []
+
+    assert client.calls == [
+        (run_a, {"status": ov_base.OV_STATUS_READY, "scenes_simulated": 100, "scenes_failure": 2}),
+        (run_b, {"scenes_total": 5}),
+    ]
+    assert client.get_run(run_a)["scenes_simulated"] == 100
+    with pytest.raises(RuntimeError):
+        updater.update_run(run_a, scenes_total=1)
+
+
+def test_size_threshold_triggers_background_flush():
+    client = _RecordingClient()
+    run_ids = [client.create_run(experiment_id="exp")["id"] for _ in range(3)]
+    updater = BufferedRunUpdater(client, flush_interval=3600, max_pending=3)
+    try:
+        for run_id in run_ids:
+            updater.update_run(run_id, scenes_total=10)
+        assert client.sent.wait(5)
+    finally:
+        updater.close()
+
+    assert sorted(run_id for run_id, _ in client.calls) == sorted(run_ids)
+
+
+def test_failed_updates_are_retried_with_newer_values():
+    client = _RecordingClient(failures=1)
+    run_id = client.create_run(experiment_id="exp")["id"]
+    updater = BufferedRunUpdater(client, flush_interval=3600)
+
+    updater.update_run(run_id, status=ov_base.OV_STATUS_RUNNING, scenes_simulated=1)
+    assert updater.flush() == [run_id]
+    updater.update_run(run_id, scenes_simulated=2)
+    assert updater.close() == []
+
+    assert client.calls[-1] == (run_id, {"status": ov_base.OV_STATUS_RUNNING, "scenes_simulated": 2})